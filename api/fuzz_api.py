@@ -179,3 +179,20 @@ async def delete_primitive(
     """
     fuzzing_controller.delete_primitive(user_id, group_name, case_name, primitive_name)
     return "删除成功"
+
+
+@router.get("/runs/{run_id}/signatures", name="查询应答签名")
+async def get_response_signatures(
+    run_id: str,
+    user_id = Depends(get_user_id),
+    fuzzing_controller: FuzzingController = Depends(get_fuzzing_controller),
+) -> dict:
+    """
+    查询一次模糊测试中出现的应答签名：各签名的出现次数、首次产生该签名的测试用例编号以及完整应答帧。
+
+    :param run_id: 模糊测试标识。
+    :param user_id: 用户 id，需在数据库中存在。
+    :param fuzzing_controller: 模糊测试控制器类实例。
+    :return: 签名统计信息以及各签名。
+    """
+    return fuzzing_controller.get_response_signatures(run_id)
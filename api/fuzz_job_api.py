@@ -0,0 +1,125 @@
+"""
+后台模糊测试任务 fastapi 接口。
+
+任务在工作进程中执行，各接口只登记任务或修改任务状态，立即返回任务 id 与状态。
+"""
+from fastapi import APIRouter, Depends, Query
+from api.fuzz_api import get_user_id
+from controller.fuzz_job_controller import FuzzJobController
+from schema.fuzz_job_schema import FuzzJobCreate, FuzzJobInfo
+from services.fuzz_jobs import get_job_manager
+
+
+router = APIRouter(prefix="/fuzz/jobs", tags=["后台模糊测试任务"])
+
+
+def get_fuzz_job_controller():
+    """
+    获取一个 FuzzJobController 类对象，所有请求共用本进程的任务管理器。
+
+    :return: FuzzJobController 实例。
+    """
+    return FuzzJobController(get_job_manager())
+
+
+@router.post("", response_model=FuzzJobInfo, name="提交模糊测试任务")
+async def submit_job(
+    job: FuzzJobCreate,
+    user_id: int = Depends(get_user_id),
+    controller: FuzzJobController = Depends(get_fuzz_job_controller),
+) -> dict:
+    """
+    提交一个后台模糊测试任务，对 job.ip:job.port 执行 job.function 的第 start 到 end 个变异。
+    任务先排队，有空闲的工作进程时开始执行。
+
+    :param job: 任务参数。
+    :param user_id: 有效的用户 id。
+    :param controller: 任务控制器类实例。
+    :return: 任务状态，其中 job_id 用于后续查询与控制。
+    """
+    return controller.submit(user_id, job)
+
+
+@router.get("", response_model=list[FuzzJobInfo], name="列出模糊测试任务")
+async def list_jobs(
+    status: str | None = Query(default=None, pattern="^(queued|running|paused|completed|failed|cancelled)$"),
+    user_id: int = Depends(get_user_id),
+    controller: FuzzJobController = Depends(get_fuzz_job_controller),
+) -> list[dict]:
+    """
+    按提交顺序列出当前用户的任务。
+
+    :param status: 只列出该状态的任务，默认列出全部。
+    :param user_id: 有效的用户 id。
+    :param controller: 任务控制器类实例。
+    :return: 任务状态列表。
+    """
+    return controller.list_jobs(user_id, status)
+
+
+@router.get("/{job_id}", response_model=FuzzJobInfo, name="查询模糊测试任务")
+async def get_job(
+    job_id: str,
+    user_id: int = Depends(get_user_id),
+    controller: FuzzJobController = Depends(get_fuzz_job_controller),
+) -> dict:
+    """
+    查询一个任务的状态、已执行的测试用例数，任务结束后还包括失败用例与耗时等结果。
+
+    :param job_id: 任务 id。
+    :param user_id: 有效的用户 id。
+    :param controller: 任务控制器类实例。
+    :return: 任务状态。
+    """
+    return controller.get_job(user_id, job_id)
+
+
+@router.post("/{job_id}/pause", response_model=FuzzJobInfo, name="暂停模糊测试任务")
+async def pause_job(
+    job_id: str,
+    user_id: int = Depends(get_user_id),
+    controller: FuzzJobController = Depends(get_fuzz_job_controller),
+) -> dict:
+    """
+    暂停一个正在运行的任务，当前测试用例结束后生效，暂停期间仍占用工作进程。
+
+    :param job_id: 任务 id。
+    :param user_id: 有效的用户 id。
+    :param controller: 任务控制器类实例。
+    :return: 任务状态。
+    """
+    return controller.pause(user_id, job_id)
+
+
+@router.post("/{job_id}/resume", response_model=FuzzJobInfo, name="恢复模糊测试任务")
+async def resume_job(
+    job_id: str,
+    user_id: int = Depends(get_user_id),
+    controller: FuzzJobController = Depends(get_fuzz_job_controller),
+) -> dict:
+    """
+    恢复一个暂停的任务。
+
+    :param job_id: 任务 id。
+    :param user_id: 有效的用户 id。
+    :param controller: 任务控制器类实例。
+    :return: 任务状态。
+    """
+    return controller.resume(user_id, job_id)
+
+
+@router.post("/{job_id}/cancel", response_model=FuzzJobInfo, name="取消模糊测试任务")
+async def cancel_job(
+    job_id: str,
+    user_id: int = Depends(get_user_id),
+    controller: FuzzJobController = Depends(get_fuzz_job_controller),
+) -> dict:
+    """
+    取消一个任务：排队中的任务不再执行，运行中或暂停的任务终止其工作进程，已写入的结果数据库保留。
+
+    :param job_id: 任务 id。
+    :param user_id: 有效的用户 id。
+    :param controller: 任务控制器类实例。
+    :return: 任务状态。
+    """
+    return controller.cancel(user_id, job_id)
@@ -0,0 +1,20 @@
+"""
+模糊测试指标 fastapi 接口，供本机的 Prometheus 抓取。
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from services.fuzz_metrics import CONTENT_TYPE, metrics_service
+
+
+router = APIRouter(tags=["模糊测试指标"])
+
+
+@router.get("/metrics", name="模糊测试指标", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """
+    以 Prometheus 文本格式返回本进程中所有模糊测试会话以及 /fuzz/jobs 后台任务的指标：测试用例数与速率、超时数、重连次数、
+    新颖应答数、目标往返时延分位数以及工作线程利用率。
+
+    :return: Prometheus 文本格式的指标。
+    """
+    return PlainTextResponse(metrics_service.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,87 @@
+"""
+后台模糊测试任务控制器类。
+"""
+from fastapi import HTTPException, status
+from exceptions.fuzz_job_error import JobNotExistError, JobStateError
+from schema.fuzz_job_schema import FuzzJobCreate
+from services.fuzz_jobs import FuzzJobManager
+
+
+class FuzzJobController:
+    """
+    后台模糊测试任务后端，只修改任务状态，不等待模糊测试。
+    """
+
+    def __init__(self, manager: FuzzJobManager):
+        self.manager = manager
+
+    def submit(self, user_id: int, job: FuzzJobCreate) -> dict:
+        """
+        提交一个任务。
+
+        :param user_id: 用户 id。
+        :param job: 任务参数。
+        :raises HTTPException: 功能不存在、变异规则不合法或编号区间为空时抛出 HTTP 422 异常。
+        :raises HTTPException: 任务管理器已关闭时抛出 HTTP 503 异常。
+        :return: 任务状态。
+        """
+        try:
+            return self.manager.submit(user_id=user_id, **job.model_dump()).to_dict()
+        except ValueError as e:
+            raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)) from e
+        except JobStateError as e:
+            raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)) from e
+
+    def list_jobs(self, user_id: int, job_status: str | None = None) -> list[dict]:
+        """
+        列出用户提交的任务。
+
+        :param user_id: 用户 id。
+        :param job_status: 只列出该状态的任务，默认为 None 表示全部。
+        """
+        return [job.to_dict() for job in self.manager.jobs(user_id, job_status)]
+
+    def _call(self, action, user_id: int, job_id: str) -> dict:
+        try:
+            if self.manager.get(job_id).user_id != user_id:
+                raise JobNotExistError(job_id)
+            return action(job_id).to_dict()
+        except JobNotExistError as e:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="任务不存在") from e
+        except JobStateError as e:
+            raise HTTPException(status.HTTP_409_CONFLICT, detail=str(e)) from e
+
+    def get_job(self, user_id: int, job_id: str) -> dict:
+        """
+        查询一个任务。
+
+        :raises HTTPException: 任务不存在或不属于该用户时抛出 HTTP 404 异常。
+        """
+        return self._call(self.manager.get, user_id, job_id)
+
+    def pause(self, user_id: int, job_id: str) -> dict:
+        """
+        暂停一个正在运行的任务。
+
+        :raises HTTPException: 任务不存在或不属于该用户时抛出 HTTP 404 异常。
+        :raises HTTPException: 任务不在运行中时抛出 HTTP 409 异常。
+        """
+        return self._call(self.manager.pause, user_id, job_id)
+
+    def resume(self, user_id: int, job_id: str) -> dict:
+        """
+        恢复一个暂停的任务。
+
+        :raises HTTPException: 任务不存在或不属于该用户时抛出 HTTP 404 异常。
+        :raises HTTPException: 任务未暂停时抛出 HTTP 409 异常。
+        """
+        return self._call(self.manager.resume, user_id, job_id)
+
+    def cancel(self, user_id: int, job_id: str) -> dict:
+        """
+        取消一个排队、运行或暂停的任务。
+
+        :raises HTTPException: 任务不存在或不属于该用户时抛出 HTTP 404 异常。
+        :raises HTTPException: 任务已经结束时抛出 HTTP 409 异常。
+        """
+        return self._call(self.manager.cancel, user_id, job_id)
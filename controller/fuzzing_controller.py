@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from services.fuzzing_services import FuzzingService
 from exceptions.database_error import DatabaseError, GroupNotExistError
+from services.fuzzing_case_gen.s7_communication.s7_signature import get_run
 
 
 class FuzzingController:
@@ -178,6 +179,45 @@ class FuzzingController:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="用例不存在")
         return case.id
     
+    def get_response_signatures(self, run_id: str) -> dict:
+        """
+        查询一次模糊测试的应答签名。模糊测试仍在本进程中运行时返回内存索引中的计数，
+        同时附上数据库中保存的新颖签名的完整应答帧。
+
+        :param run_id: 模糊测试标识。
+        :raises HTTPException 404: 既没有正在运行的模糊测试，也没有保存的签名。
+        :raises HTTPException 500: 其它异常。
+        :return: 签名统计信息以及各签名。
+        """
+        try:
+            saved = self.fuzzing_service.get_response_signatures(run_id)
+        except DatabaseError as e:
+            raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="服务端异常") from e
+        frames = {row.digest: row.frame.hex() for row in saved}
+        index = get_run(run_id)
+        if index is not None:
+            result = index.summary()
+            for signature in result["signatures"]:
+                signature["frame"] = frames.get(signature["digest"])
+            return dict(result, run_id=run_id, running=True)
+        if not saved:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="模糊测试不存在")
+        signatures = [
+            {
+                "kind": row.kind,
+                "rosctr": row.rosctr,
+                "error_class": row.error_class,
+                "error_code": row.error_code,
+                "function": row.function,
+                "return_code": row.return_code,
+                "digest": row.digest,
+                "first_case": row.first_case,
+                "frame": frames[row.digest],
+            }
+            for row in saved
+        ]
+        return {"run_id": run_id, "running": False, "unique": len(signatures), "signatures": signatures}
+
     # def get_cases(self, group_id):
     #     try:
     #         case = self.fuzzing_service.get_case(group_id)
@@ -0,0 +1,5 @@
+class JobNotExistError(Exception):
+    pass
+
+class JobStateError(Exception):
+    pass
@@ -5,12 +5,14 @@
 """
 from fastapi import FastAPI
 import uvicorn
-from api import user_api, fuzz_api
+from api import user_api, fuzz_api, fuzz_job_api, metrics_api
 
 
 app = FastAPI()
 app.include_router(user_api.router)
 app.include_router(fuzz_api.router)
+app.include_router(fuzz_job_api.router)
+app.include_router(metrics_api.router)
 
 
 def main():
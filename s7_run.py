@@ -1,4 +1,11 @@
-from model.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession, input_fuzzable
+from services.fuzzing_case_gen.s7_communication.s7_gen import FUZZABLE_FIELD_COUNTS
+from services.fuzzing_case_gen.s7_communication.s7_parallel import run_parallel
+from services.fuzzing_case_gen.s7_communication.s7_corpus import export_corpus as write_corpus
+from services.fuzzing_case_gen.s7_communication.s7_liveness import LivenessProber
+from services.database import Base, SessionLocal, engine
+from services.fuzzing_services import FuzzingService
+from exceptions.database_error import DatabaseError
 from pyfiglet import Figlet
 import rich_click as click
 
@@ -25,7 +32,53 @@ import rich_click as click
     show_default=True,
     help="模糊测试功能",
 )
-def start_fuzz(ip: str = "192.168.101.172", port: int = 102, function: str = "set up communication"):
+@click.option("--persistent", is_flag=True, default=False, help="复用 TCP/COTP 连接及建立通信，仅在目标断开或返回致命错误时重连")
+@click.option("--workers", type=int, default=1, show_default=True, help="并行模糊测试的工作进程数")
+@click.option("--connections-per-target", type=int, default=1, show_default=True, help="目标允许的并发连接数")
+@click.option("--start", type=int, default=None, help="起始测试用例编号（从 1 开始），用于拆分或中断后继续模糊测试")
+@click.option("--end", type=int, default=None, help="结束测试用例编号（包含）")
+@click.option("--report", type=str, default=None, help="并行模糊测试合并报告的 json 文件路径")
+@click.option("--scheduled", is_flag=True, default=False, help="按应答调度变异预算，优先测试产生新应答或连接失败的字段")
+@click.option("--budget", type=int, default=None, help="按应答调度时最多执行的测试用例数")
+@click.option("--strength", type=int, default=None, help="按该强度的覆盖数组组合变异多个字段，2 即 pairwise")
+@click.option("--values-per-field", type=int, default=7, show_default=True, help="组合变异时每个字段挑选的变异值个数")
+@click.option("--adaptive-timeout", is_flag=True, default=False, help="根据目标应答的往返时延自适应接收超时")
+@click.option("--liveness", is_flag=True, default=False, help="在独立连接上并发探测目标，目标宕机时暂停模糊测试")
+@click.option("--results", type=str, default=None, help="列式结果存储目录，为每个测试用例追加一条结果记录")
+@click.option("--phase-timing", is_flag=True, default=False, help="统计每个测试用例各阶段（前置回调、渲染、发送、等待应答、后置回调）的耗时")
+@click.option("--ring-log", type=int, default=None, help="只在内存中保留最近 N 个测试用例的日志，失败、超时或新颖应答时才写盘")
+@click.option("--pipeline", is_flag=True, default=False, help="按协商的 Max AmQ 流水线发送（仅适用于读取变量、读取 SZL 等无状态功能）")
+@click.option("--max-amq", type=int, default=8, show_default=True, help="流水线模式请求的 Max AmQ")
+@click.option("--export-corpus", type=str, default=None, help="把测试用例渲染为语料文件后退出，不连接目标")
+@click.option("--replay-corpus", type=str, default=None, help="重放语料文件中的测试用例，不再渲染")
+@click.option("--run-id", type=str, default=None, help="本次模糊测试的标识，用于查询应答签名")
+@click.option("--save-signatures", is_flag=True, default=False, help="把新颖的应答签名及完整应答帧保存到数据库")
+def start_fuzz(
+    ip: str = "192.168.101.172",
+    port: int = 102,
+    function: str = "set up communication",
+    persistent: bool = False,
+    workers: int = 1,
+    connections_per_target: int = 1,
+    report: str | None = None,
+    start: int | None = None,
+    end: int | None = None,
+    run_id: str | None = None,
+    save_signatures: bool = False,
+    scheduled: bool = False,
+    budget: int | None = None,
+    strength: int | None = None,
+    values_per_field: int = 7,
+    adaptive_timeout: bool = False,
+    liveness: bool = False,
+    results: str | None = None,
+    ring_log: int | None = None,
+    phase_timing: bool = False,
+    pipeline: bool = False,
+    max_amq: int = 8,
+    export_corpus: str | None = None,
+    replay_corpus: str | None = None,
+):
     """
     start_fuzz 选择功能码进行模糊测试
 
@@ -35,6 +88,48 @@ def start_fuzz(ip: str = "192.168.101.172", port: int = 102, function: str = "se
     :type port: int, optional
     :param function: _description_, defaults to "set up communication"
     :type function: str, optional
+    :param persistent: 是否启用持久通道模式, defaults to False
+    :type persistent: bool, optional
+    :param workers: 工作进程数，大于 1 时切分变异编号区间并行模糊测试, defaults to 1
+    :type workers: int, optional
+    :param connections_per_target: 目标允许的并发连接数, defaults to 1
+    :type connections_per_target: int, optional
+    :param report: 并行模糊测试合并报告的 json 文件路径, defaults to None
+    :type report: str | None, optional
+    :param start: 起始测试用例编号, defaults to None 表示从第一个用例开始
+    :type start: int | None, optional
+    :param end: 结束测试用例编号, defaults to None 表示到最后一个用例
+    :type end: int | None, optional
+    :param run_id: 本次模糊测试的标识，默认随机生成
+    :type run_id: str | None, optional
+    :param save_signatures: 是否把新颖的应答签名保存到数据库
+    :type save_signatures: bool, optional
+    :param scheduled: 是否按应答调度变异预算
+    :type scheduled: bool, optional
+    :param budget: 按应答调度时最多执行的测试用例数, defaults to None 表示全部
+    :type budget: int | None, optional
+    :param strength: 组合变异的覆盖强度, defaults to None 表示逐个字段变异
+    :type strength: int | None, optional
+    :param values_per_field: 组合变异时每个字段挑选的变异值个数, defaults to 7
+    :type values_per_field: int, optional
+    :param adaptive_timeout: 是否自适应接收超时, defaults to False 表示固定 5 秒
+    :type adaptive_timeout: bool, optional
+    :param liveness: 是否并发探测目标存活，目标宕机时暂停模糊测试
+    :type liveness: bool, optional
+    :param results: 列式结果存储目录，不能与 workers 同时使用
+    :type results: str | None, optional
+    :param ring_log: 环形缓冲日志保留的测试用例数，默认为 None 表示使用 boofuzz 的日志
+    :type ring_log: int | None, optional
+    :param phase_timing: 是否统计各阶段耗时
+    :type phase_timing: bool, optional
+    :param pipeline: 是否按协商的 Max AmQ 流水线发送
+    :type pipeline: bool, optional
+    :param max_amq: 流水线模式请求的 Max AmQ, defaults to 8
+    :type max_amq: int, optional
+    :param export_corpus: 语料文件路径，指定后只渲染测试用例并写入该文件
+    :type export_corpus: str | None, optional
+    :param replay_corpus: 要重放的语料文件路径
+    :type replay_corpus: str | None, optional
     """
     try:
         function = function.replace(" ", "_")
@@ -42,12 +137,108 @@ def start_fuzz(ip: str = "192.168.101.172", port: int = 102, function: str = "se
         print("发生异常，使用 -- help 选项查看用法")
     else:
         print(f"您选择的功能为 {function}")
-        manager = S7CommunicationSession(ip, port)
         figlet = Figlet()
         # 字体列表可以参看 http://www.jave.de/figlet/fonts/overview.html
         figlet.setFont(font="slant")
         print(figlet.renderText("fuzzing S7C"))
-        manager.start_fuzz(function)
+        # 会话中的 set_up_communication 对应生成器中的 setup_communication
+        gen_function = "setup_communication" if function == "set_up_communication" else function
+        if export_corpus:
+            fuzzable_list = input_fuzzable(
+                getattr(S7CommunicationSession, function), FUZZABLE_FIELD_COUNTS[gen_function]
+            )
+            metadata = write_corpus(export_corpus, gen_function, fuzzable_list, start or 1, end)
+            print(f"已将编号 {metadata['start']}～{metadata['end']} 的测试用例写入 {export_corpus}")
+            return
+        if workers > 1:
+            if results:
+                raise click.UsageError("--results 不能与 --workers 同时使用，并行模糊测试的结果见各分片的数据库与 --report")
+            fuzzable_list = input_fuzzable(
+                getattr(S7CommunicationSession, function), FUZZABLE_FIELD_COUNTS[gen_function]
+            )
+            result = run_parallel(
+                gen_function,
+                fuzzable_list,
+                [(ip, port)],
+                workers=workers,
+                connections_per_target=connections_per_target,
+                report_filename=report,
+                start=start or 1,
+                end=end,
+                persistent=persistent,
+            )
+            print(f"共执行 {result['cases']} 个测试用例，失败 {len(result['failures'])} 个，耗时 {result['elapsed']:.1f}s")
+            return
+        on_novel_signature = None
+        if save_signatures:
+            Base.metadata.create_all(bind=engine)
+            on_novel_signature = save_response_signature
+        manager = S7CommunicationSession(ip, port, persistent=persistent, run_id=run_id,
+                                         on_novel_signature=on_novel_signature, adaptive_timeout=adaptive_timeout,
+                                         results=results, ring_log=ring_log,
+                                         phase_timing=phase_timing)
+        print(f"本次模糊测试标识为 {manager.run_id}")
+        if start is not None or end is not None:
+            manager.case_range = (start or 1, end)
+        prober = None
+        # 各种运行方式结束时都要关闭结果存储，否则缓冲中未满一批的记录不会写盘
+        try:
+            if replay_corpus:
+                manager.replay_corpus(replay_corpus, start, end)
+            elif pipeline:
+                fuzzable_list = input_fuzzable(
+                    getattr(S7CommunicationSession, function), FUZZABLE_FIELD_COUNTS[gen_function]
+                )
+                manager.connect(getattr(manager.s7_gen, gen_function)(fuzzable_list))
+                stats = manager.fuzz_pipelined(start or 1, end, max_amq=max_amq)
+                print(f"流水线统计：{stats}")
+            else:
+                manager.scheduled = scheduled
+                manager.schedule_budget = budget
+                manager.combinatorial_strength = strength
+                manager.combinatorial_values = values_per_field
+                if liveness:
+                    prober = LivenessProber(
+                        ip, port, on_change=lambda old, new, sample: print(f"目标状态：{old} -> {new}")
+                    )
+                    prober.attach(manager)
+                    prober.start()
+                manager.start_fuzz(function)
+        finally:
+            if prober is not None:
+                prober.stop()
+                print(f"存活探测统计：{prober.stats()}")
+            if manager.results is not None:
+                manager.results.close()
+                print(f"已将 {len(manager.results)} 条结果记录写入 {results}")
+        if replay_corpus or pipeline:
+            return
+        if scheduled:
+            for row in manager.scheduler.stats():
+                print(f"{row['field']}: 执行 {row['pulls']}/{row['cases']}，奖励 {row['rewards']:.0f}")
+        if persistent:
+            print(f"持久通道统计：{manager.handshake_stats()}")
+        if adaptive_timeout:
+            print(f"往返时延统计：{manager.timing_stats()}")
+        if manager.ring_log is not None:
+            print(f"环形缓冲日志统计：{manager.ring_log.stats()}")
+        if phase_timing:
+            for name, report in manager.phase_stats()["functions"].items():
+                for phase, stats in report["phases"].items():
+                    print(f"{name} {phase}: p50 {stats['p50']:.1f}us，p99 {stats['p99']:.1f}us，最大 {stats['max']:.1f}us")
+
+
+def save_response_signature(run_id: str, entry, frame: bytes):
+    """
+    把新颖的应答签名保存到数据库，保存失败不影响模糊测试。
+    """
+    db = SessionLocal()
+    try:
+        FuzzingService(db).add_response_signature(run_id, entry, frame)
+    except (ValueError, DatabaseError):
+        pass
+    finally:
+        db.close()
 
 
 def main():
@@ -0,0 +1,55 @@
+"""
+后台模糊测试任务的请求与应答模型。
+"""
+from pydantic import BaseModel, Field
+
+
+class FuzzJobCreate(BaseModel):
+    """
+    提交后台模糊测试任务。
+    """
+    function: str = Field(min_length=1, description="可以模糊测试的功能名称，例如 read_var、setup_communication")
+    ip: str
+    port: int = Field(default=102, ge=1, le=65535)
+    fuzzable_list: list[bool] | None = None
+    start: int = Field(default=1, ge=1, description="起始变异编号（包含）")
+    end: int | None = Field(default=None, ge=1, description="结束变异编号（包含），默认为变异总数")
+    persistent: bool = False
+    adaptive_timeout: bool = False
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "function": "read_var",
+                    "ip": "192.168.101.172",
+                    "port": 102,
+                    "fuzzable_list": [False, False, False, False, False, False, True, True],
+                    "start": 1,
+                    "end": 1000,
+                    "persistent": True,
+                    "adaptive_timeout": True,
+                }
+            ]
+        }
+    }
+
+
+class FuzzJobInfo(BaseModel):
+    """
+    任务状态，status 为 queued、running、paused、completed、failed 或 cancelled。
+    """
+    job_id: str
+    user_id: int | None = None
+    status: str
+    function: str
+    target: str
+    index_start: int
+    index_end: int
+    total: int
+    cases: int
+    submitted_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    db_filename: str
+    result: dict | None = None
+    error: str | None = None
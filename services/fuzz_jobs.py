@@ -0,0 +1,386 @@
+"""
+后台模糊测试任务。
+
+每个任务在独立的工作进程中执行 s7_parallel.run_shard，FastAPI 的事件循环只负责登记任务与修改任务状态，
+不会被模糊测试阻塞。同时运行的任务数不超过 max_workers，其余任务排队，由后台的调度线程在有空闲时启动，
+并回收结束的进程、读取其结果。
+
+暂停与恢复通过进程间的 Event 传给工作进程，工作进程中的线程把它同步到会话的 is_paused 上，
+由 boofuzz 在两个测试用例之间暂停；暂停的任务仍然占用一个工作进程。取消直接终止工作进程。
+同一个线程定期把会话的指标快照（s7_metrics.snapshot）写入共享内存，父进程的 /metrics 由此输出各任务的指标。
+任务只保存在内存中，服务重启后丢失，已经写入的结果数据库不受影响。
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from exceptions.fuzz_job_error import JobNotExistError, JobStateError
+from services.fuzzing_case_gen.s7_communication.s7_case_index import S7CaseIndex
+from services.fuzzing_case_gen.s7_communication.s7_gen import FUZZABLE_FIELD_COUNTS
+from services.fuzzing_case_gen.s7_communication.s7_metrics import snapshot
+from services.fuzzing_case_gen.s7_communication.s7_parallel import run_shard
+
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+# 共享内存中指标快照（json）的最大字节数，超出时不更新
+SNAPSHOT_BYTES = 8192
+
+
+def _watch(session, paused, progress, metrics, interval: float = 0.1):
+    # 工作进程中的线程：同步暂停标志并上报进度与指标快照
+    while True:
+        session.is_paused = paused.is_set()
+        progress.value = session.cases_fuzzed
+        data = json.dumps(snapshot(session)).encode()
+        if len(data) < SNAPSHOT_BYTES:
+            with metrics.get_lock():
+                metrics.value = data
+        time.sleep(interval)
+
+
+def _run_job(spec: dict, paused, progress, metrics, conn):
+    """
+    工作进程的入口，把结果或异常通过管道发回父进程。
+    """
+
+    def attach(session):
+        threading.Thread(target=_watch, args=(session, paused, progress, metrics), daemon=True).start()
+
+    try:
+        result = run_shard(spec, on_session=attach)
+        progress.value = result["cases"]
+        conn.send((COMPLETED, result, None))
+    except Exception as e:
+        conn.send((FAILED, None, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+@dataclass
+class FuzzJob:
+    job_id: str
+    user_id: int | None
+    spec: dict
+    total: int
+    status: str = QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict | None = None
+    error: str | None = None
+    # 以下只在父进程中使用
+    process: multiprocessing.Process | None = field(default=None, repr=False)
+    conn: object = field(default=None, repr=False)
+    paused: object = field(default=None, repr=False)
+    progress: object = field(default=None, repr=False)
+    metrics: object = field(default=None, repr=False)
+
+    @property
+    def cases(self) -> int:
+        return self.progress.value if self.progress is not None else 0
+
+    def snapshot(self) -> dict | None:
+        """
+        工作进程最近上报的指标快照，格式与 s7_metrics.snapshot 相同；尚未上报时为 None。
+        """
+        if self.metrics is None:
+            return None
+        with self.metrics.get_lock():
+            data = self.metrics.value
+        if not data:
+            return None
+        item = json.loads(data)
+        # json 的键只能是字符串，分位数还原为浮点数
+        if item["rtt"] is not None:
+            item["rtt"] = {float(quantile): value for quantile, value in item["rtt"].items()}
+        return item
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "function": self.spec["function"],
+            "target": f"{self.spec['ip']}:{self.spec['port']}",
+            "index_start": self.spec["index_start"],
+            "index_end": self.spec["index_end"],
+            "total": self.total,
+            "cases": self.cases,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "db_filename": self.spec["db_filename"],
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class FuzzJobManager:
+    """
+    管理后台模糊测试任务的工作进程池。
+
+    :param max_workers: 同时运行的任务数。
+    :param results_dir: 各任务结果数据库所在目录。
+    :param poll_interval: 调度线程检查工作进程的间隔（秒）。
+    """
+
+    def __init__(self, max_workers: int = os.cpu_count() or 1, results_dir: str = "boofuzz-results",
+                 poll_interval: float = 0.2):
+        if max_workers < 1:
+            raise ValueError("工作进程数必须大于 0")
+        self.max_workers = max_workers
+        self.results_dir = results_dir
+        self.poll_interval = poll_interval
+        # 工作进程不继承父进程中 FastAPI 与数据库的状态
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs: dict[str, FuzzJob] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._ids = itertools.count(1)
+        self._monitor: threading.Thread | None = None
+
+    def submit(
+        self,
+        function: str,
+        ip: str,
+        port: int = 102,
+        fuzzable_list: list[bool] | None = None,
+        start: int = 1,
+        end: int | None = None,
+        user_id: int | None = None,
+        **session_kwargs,
+    ) -> FuzzJob:
+        """
+        登记一个任务，立即返回；任务在有空闲的工作进程时开始执行。
+
+        :param function: 功能名称，FUZZABLE_FIELD_COUNTS 中的键。
+        :param ip: 目标 ip。
+        :param port: 目标端口。
+        :param fuzzable_list: 变异规则列表。
+        :param start: 起始变异编号（包含）。
+        :param end: 结束变异编号（包含），默认为变异总数。
+        :param user_id: 提交任务的用户 id。
+        :param session_kwargs: 传给 S7CommunicationSession 的其余参数，例如 persistent。
+        :raises ValueError: 功能不存在、变异规则不合法或编号区间为空。
+        :raises JobStateError: 任务管理器已关闭。
+        """
+        if function not in FUZZABLE_FIELD_COUNTS:
+            raise ValueError(f"功能 {function} 不存在")
+        if fuzzable_list is not None and len(fuzzable_list) != FUZZABLE_FIELD_COUNTS[function]:
+            raise ValueError(f"功能 {function} 的变异规则长度应为 {FUZZABLE_FIELD_COUNTS[function]}")
+        # 变异总数按原语计数得到，不编码变异值，在事件循环中调用也只需数十毫秒
+        try:
+            total = S7CaseIndex.from_function(function, fuzzable_list).total
+        except (TypeError, ValueError, IndexError) as e:
+            raise ValueError(f"无法生成功能 {function} 的测试用例：{e}") from e
+        end = total if end is None else min(end, total)
+        if start < 1 or start > end:
+            raise ValueError(f"变异编号区间 [{start}, {end}] 为空")
+        job_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{next(self._ids)}"
+        spec = {
+            "shard": 0,
+            "function": function,
+            "fuzzable_list": fuzzable_list,
+            "ip": ip,
+            "port": port,
+            "index_start": start,
+            "index_end": end,
+            "db_filename": os.path.join(self.results_dir, f"job-{job_id}-{function}.db"),
+            "session_kwargs": dict(session_kwargs, run_id=job_id),
+        }
+        job = FuzzJob(job_id, user_id, spec, end - start + 1)
+        with self._lock:
+            if self._closed:
+                raise JobStateError("任务管理器已关闭")
+            self._jobs[job_id] = job
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._run, name="fuzz-job-monitor", daemon=True)
+                self._monitor.start()
+        self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> FuzzJob:
+        """
+        查询一个任务。
+
+        :raises JobNotExistError: 任务不存在。
+        """
+        with self._lock:
+            return self._get(job_id)
+
+    def _get(self, job_id: str) -> FuzzJob:
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise JobNotExistError(f"任务 {job_id} 不存在") from None
+
+    def jobs(self, user_id: int | None = None, status: str | None = None) -> list[FuzzJob]:
+        """
+        按提交顺序列出任务，可按用户与状态过滤。
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [
+            job for job in jobs
+            if (user_id is None or job.user_id == user_id) and (status is None or job.status == status)
+        ]
+
+    def snapshots(self) -> dict[str, dict]:
+        """
+        运行中或暂停的任务最近上报的指标快照，按任务 id 索引。
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.status in (RUNNING, PAUSED)]
+        items = {job.job_id: job.snapshot() for job in jobs}
+        return {job_id: item for job_id, item in items.items() if item is not None}
+
+    def pause(self, job_id: str) -> FuzzJob:
+        """
+        暂停一个正在运行的任务，当前测试用例结束后生效。
+
+        :raises JobNotExistError: 任务不存在。
+        :raises JobStateError: 任务不在运行中。
+        """
+        with self._lock:
+            job = self._get(job_id)
+            if job.status != RUNNING:
+                raise JobStateError(f"任务 {job_id} 的状态为 {job.status}，无法暂停")
+            job.paused.set()
+            job.status = PAUSED
+        return job
+
+    def resume(self, job_id: str) -> FuzzJob:
+        """
+        恢复一个暂停的任务。
+
+        :raises JobNotExistError: 任务不存在。
+        :raises JobStateError: 任务未暂停。
+        """
+        with self._lock:
+            job = self._get(job_id)
+            if job.status != PAUSED:
+                raise JobStateError(f"任务 {job_id} 的状态为 {job.status}，无法恢复")
+            job.paused.clear()
+            job.status = RUNNING
+        return job
+
+    def cancel(self, job_id: str) -> FuzzJob:
+        """
+        取消一个任务：排队中的任务不再执行，运行中或暂停的任务终止其工作进程。
+
+        :raises JobNotExistError: 任务不存在。
+        :raises JobStateError: 任务已经结束。
+        """
+        with self._lock:
+            job = self._get(job_id)
+            if job.status in FINISHED:
+                raise JobStateError(f"任务 {job_id} 已经结束")
+            if job.process is not None:
+                job.process.terminate()
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        self._wakeup.set()
+        return job
+
+    def shutdown(self, timeout: float = 5.0):
+        """
+        取消所有未结束的任务并停止调度线程。
+        """
+        with self._lock:
+            self._closed = True
+            for job in self._jobs.values():
+                if job.status not in FINISHED:
+                    if job.process is not None:
+                        job.process.terminate()
+                    job.status = CANCELLED
+                    job.finished_at = time.time()
+        self._wakeup.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+
+    def _start(self, job: FuzzJob):
+        receiver, sender = self._context.Pipe(duplex=False)
+        job.paused = self._context.Event()
+        job.progress = self._context.Value("q", 0, lock=False)
+        job.metrics = self._context.Array("c", SNAPSHOT_BYTES)
+        job.process = self._context.Process(
+            target=_run_job, args=(job.spec, job.paused, job.progress, job.metrics, sender),
+            name=f"fuzz-job-{job.job_id}", daemon=True,
+        )
+        job.conn = receiver
+        job.process.start()
+        # 父进程不再需要写端，工作进程退出后读端才能读到 EOF
+        sender.close()
+        job.started_at = time.time()
+        job.status = RUNNING
+
+    def _reap(self, job: FuzzJob):
+        # 调用时已持有锁；先读结果再判断进程是否退出，避免管道写满时工作进程无法退出
+        if job.conn.poll():
+            try:
+                outcome = job.conn.recv()
+            except EOFError:
+                outcome = None
+            if outcome is not None and job.status not in FINISHED:
+                job.status, job.result, job.error = outcome
+                job.finished_at = time.time()
+        if job.process.is_alive():
+            return
+        job.process.join()
+        job.conn.close()
+        if job.status not in FINISHED:
+            job.status = FAILED
+            job.error = f"工作进程异常退出，退出码 {job.process.exitcode}"
+            job.finished_at = time.time()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._lock:
+                for job in self._jobs.values():
+                    if job.process is not None and job.conn is not None and not job.conn.closed:
+                        self._reap(job)
+                active = sum(job.status in (RUNNING, PAUSED) for job in self._jobs.values())
+                for job in self._jobs.values():
+                    if active >= self.max_workers:
+                        break
+                    if job.status == QUEUED:
+                        self._start(job)
+                        active += 1
+                if self._closed and all(job.conn is None or job.conn.closed for job in self._jobs.values()):
+                    return
+
+
+_manager: FuzzJobManager | None = None
+_manager_lock = threading.Lock()
+
+
+def job_snapshots() -> dict[str, dict]:
+    """
+    本进程任务管理器中运行中任务的指标快照，任务管理器尚未创建时为空。
+    """
+    with _manager_lock:
+        manager = _manager
+    return manager.snapshots() if manager is not None else {}
+
+
+def get_job_manager() -> FuzzJobManager:
+    """
+    本进程的任务管理器，第一次调用时创建。
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = FuzzJobManager()
+        return _manager
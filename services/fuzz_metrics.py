@@ -0,0 +1,114 @@
+"""
+模糊测试指标的 Prometheus 文本格式输出。
+
+从 s7_metrics 登记的会话中读取计数器，每个 run_id 汇总为一组指标，往返时延分位数与工作线程利用率按工作线程输出。
+通过 /fuzz/jobs 提交的任务在独立的工作进程中运行，不在本进程的登记表中，其指标取自工作进程上报的快照，run_id 即任务 id。
+测试用例速率按相邻两次抓取之间的增量计算（第一次抓取按第一个测试用例开始至今计算），抓取状态只在抓取时加锁，
+不影响模糊测试线程。
+"""
+import threading
+import time
+from typing import Callable
+from services.fuzz_jobs import job_snapshots
+from services.fuzzing_case_gen.s7_communication.s7_metrics import sessions, snapshot
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 指标名称 -> (类型, 说明)
+METRICS = {
+    "s7_fuzz_cases_total": ("counter", "已执行的测试用例数"),
+    "s7_fuzz_cases_per_second": ("gauge", "测试用例速率（相邻两次抓取之间）"),
+    "s7_fuzz_timeouts_total": ("counter", "没有收到应答的测试用例数"),
+    "s7_fuzz_reconnects_total": ("counter", "持久通道的重连次数"),
+    "s7_fuzz_novel_responses_total": ("counter", "新颖的应答签名数"),
+    "s7_fuzz_responses_total": ("counter", "各类应答帧数"),
+    "s7_fuzz_rtt_seconds": ("gauge", "目标往返时延的分位数"),
+    "s7_fuzz_worker_utilization": ("gauge", "工作线程执行测试用例的时间占比"),
+    "s7_fuzz_workers": ("gauge", "未暂停的工作线程数"),
+}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class FuzzMetricsService:
+    """
+    把正在运行的模糊测试会话的指标输出为 Prometheus 文本格式。
+
+    :param jobs: 返回后台任务指标快照（任务 id -> 快照）的函数，默认为本进程任务管理器中运行中的任务。
+    """
+
+    def __init__(self, jobs: Callable[[], dict[str, dict]] = job_snapshots):
+        self.jobs = jobs
+        self._lock = threading.Lock()
+        # run_id -> (上一次抓取的时间, 上一次抓取时的测试用例数)
+        self._last: dict[str, tuple[float, int]] = {}
+
+    def _rate(self, run_id: str, cases: int, elapsed: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            previous = self._last.get(run_id)
+            self._last[run_id] = (now, cases)
+        if previous is None or now <= previous[0] or cases < previous[1]:
+            return cases / elapsed if elapsed > 0 else 0.0
+        return (cases - previous[1]) / (now - previous[0])
+
+    def collect(self) -> dict[str, list[tuple[dict, float]]]:
+        """
+        收集所有会话的指标。
+
+        :return: 指标名称 -> [(标签, 值)]。
+        """
+        samples: dict[str, list[tuple[dict, float]]] = {name: [] for name in METRICS}
+        running = {run_id: [snapshot(session) for session in workers] for run_id, workers in sessions().items()}
+        for job_id, item in self.jobs().items():
+            running.setdefault(job_id, []).append(item)
+        for run_id, snapshots in sorted(running.items()):
+            cases = sum(item["cases"] for item in snapshots)
+            elapsed = max(item["elapsed"] for item in snapshots)
+            run = {"run_id": run_id}
+            samples["s7_fuzz_cases_total"].append((run, cases))
+            samples["s7_fuzz_cases_per_second"].append((run, self._rate(run_id, cases, elapsed)))
+            for name, key in (
+                ("s7_fuzz_timeouts_total", "timeouts"),
+                ("s7_fuzz_reconnects_total", "reconnects"),
+                ("s7_fuzz_novel_responses_total", "novel_responses"),
+            ):
+                samples[name].append((run, sum(item[key] for item in snapshots)))
+            responses: dict[str, int] = {}
+            for item in snapshots:
+                for kind, count in item["responses"].items():
+                    responses[kind] = responses.get(kind, 0) + count
+            for kind, count in sorted(responses.items()):
+                samples["s7_fuzz_responses_total"].append(({**run, "kind": kind}, count))
+            samples["s7_fuzz_workers"].append((run, sum(not item["paused"] for item in snapshots)))
+            for worker, item in enumerate(snapshots):
+                labels = {**run, "worker": worker}
+                samples["s7_fuzz_worker_utilization"].append((labels, item["utilization"]))
+                for quantile, value in (item["rtt"] or {}).items():
+                    samples["s7_fuzz_rtt_seconds"].append(({**labels, "quantile": quantile}, value))
+        with self._lock:
+            for run_id in set(self._last) - set(running):
+                del self._last[run_id]
+        return samples
+
+    def render(self) -> str:
+        """
+        Prometheus 文本格式（0.0.4）的指标。
+        """
+        lines = []
+        for name, values in self.collect().items():
+            metric_type, description = METRICS[name]
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in values:
+                lines.append(f"{name}{_labels(**labels)} {float(value):.10g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_service = FuzzMetricsService()
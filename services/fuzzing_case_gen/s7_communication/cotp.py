@@ -51,7 +51,6 @@ class COTPConnect(Packet):
     ]
 
     def guess_payload_class(self, payload):  # type: (bytes) -> Type[Packet]
-        print(f'payload = {payload}')
         return COTPParameters
 
 
@@ -82,5 +81,4 @@ class COTP(Packet):
         return pkt + pay
 
     def guess_payload_class(self, payload: bytes) -> Type[Packet]:
-        print(f'payload = {payload}')
         return COTPConnect if self.pdu_type == 0xe0 else COTPFunction
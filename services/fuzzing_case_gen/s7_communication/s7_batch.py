@@ -0,0 +1,179 @@
+"""
+基于 NumPy 的批量变异。
+
+boofuzz 的 Byte/Word/DWord/Bytes 原语逐个产生 Python 对象形式的变异值，再逐个渲染数据包。
+BatchMutator 针对编译后模板中的一个定长字段，一次生成成千上万个变异值（NumPy 数组）：
+边界值、位翻转、算术扫描以及带种子的随机值，并批量写入字节模板，得到一块连续的
+(n, 帧长度) uint8 缓冲区，其中每一行都是已封装 TPKT/COTP 首部、可以直接发送的数据帧。
+
+批量变异只改变字段的取值而不改变长度，因此不需要修正长度字段。需要安装 numpy。
+"""
+from collections.abc import Iterator
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖
+    np = None
+
+from boofuzz.primitives import Bytes
+from .s7_template import S7RequestTemplate, compile_function
+from .s7_communication_socket_connection import S7CommunicationSocketConnection
+
+STRATEGIES = ("boundary", "bitflip", "arithmetic", "random")
+# 整数字段的字节宽度 -> NumPy 无符号整数类型
+_UINT_DTYPES = {1: "u1", 2: "u2", 4: "u4", 8: "u8"}
+
+
+class BatchMutator:
+    """
+    一个定长字段的批量变异器。
+
+    :param template: 编译后的 Request 模板。
+    :param field: 字段的 qualified name 或最后一级名称。
+    :param seed: 随机值的种子，相同的种子产生相同的变异。
+    :raises ImportError: 没有安装 numpy。
+    :raises KeyError: 字段不存在。
+    """
+
+    def __init__(self, template: S7RequestTemplate, field: str, seed: int | None = 0):
+        if np is None:
+            raise ImportError("批量变异需要安装 numpy")
+        self.template = template
+        self.field_index = template.field_index(field)
+        template_field = template.fields[self.field_index]
+        self.name = template_field.name
+        self.offset = template_field.offset
+        self.width = template_field.length
+        primitive = template_field.primitive
+        # Bytes 以及宽度不是 1/2/4/8 的字段按字节数组处理
+        self.is_integer = not isinstance(primitive, Bytes) and self.width in _UINT_DTYPES
+        self.endian = getattr(primitive, "endian", ">")
+        self._dtype = np.dtype(self.endian + _UINT_DTYPES[self.width]) if self.is_integer else None
+        self.default = template.template[self.offset:self.offset + self.width]
+        self._rng = np.random.default_rng(seed)
+        # 封装好 TPKT/COTP 首部的默认帧，字段在帧中的偏移需要加上首部长度
+        self.frame_template = np.frombuffer(
+            S7CommunicationSocketConnection.frame(template.template, "DT Data"), dtype=np.uint8
+        )
+        self.frame_offset = len(self.frame_template) - len(template.template) + self.offset
+
+    @classmethod
+    def from_function(cls, function: str, field: str, fuzzable_list: list[bool] | None = None,
+                      seed: int | None = 0) -> "BatchMutator":
+        return cls(compile_function(function, fuzzable_list), field, seed)
+
+    @property
+    def bits(self) -> int:
+        return self.width * 8
+
+    def _default_int(self) -> int:
+        return int.from_bytes(self.default, "little" if self.endian == "<" else "big")
+
+    def _encode(self, values) -> "np.ndarray":
+        # 整数值按字段的字节序编码为 (n, width) 的字节矩阵
+        values = np.asarray(values, dtype=np.uint64)
+        return values.astype(self._dtype).view(np.uint8).reshape(-1, self.width)
+
+    def boundary(self) -> "np.ndarray":
+        """
+        边界值：0、最大值、各个 2 的幂及其前后的值、有符号数的边界，去重后按出现顺序排列。
+        """
+        if not self.is_integer:
+            fills = [0x00, 0xFF, 0x7F, 0x80, 0x01, 0xFE]
+            return np.array([[fill] * self.width for fill in fills], dtype=np.uint8)
+        top = (1 << self.bits) - 1
+        candidates = [0, top, top >> 1, (top >> 1) + 1]
+        for bit in range(self.bits):
+            power = 1 << bit
+            candidates += [power - 1, power, power + 1]
+        values = [value for value in candidates if 0 <= value <= top]
+        unique = np.unique(np.array(values, dtype=np.uint64), return_index=True)[1]
+        return self._encode(np.array(values, dtype=np.uint64)[np.sort(unique)])
+
+    def bitflip(self) -> "np.ndarray":
+        """
+        位翻转：在默认值上分别翻转每一位，以及每两个相邻的位。
+        """
+        bits = self.bits
+        default = np.frombuffer(self.default, dtype=np.uint8)
+        single = np.repeat(default[None, :], bits, axis=0)
+        positions = np.arange(bits)
+        single[positions, positions // 8] ^= (0x80 >> (positions % 8)).astype(np.uint8)
+        double = single[:-1].copy()
+        second = positions[1:]
+        double[np.arange(bits - 1), second // 8] ^= (0x80 >> (second % 8)).astype(np.uint8)
+        return np.concatenate([single, double])
+
+    def arithmetic(self, span: int = 35) -> "np.ndarray":
+        """
+        算术扫描：默认值加减 1..span，按字段宽度回绕。字节数组字段对每个字节分别扫描。
+        """
+        deltas = np.concatenate([np.arange(1, span + 1), -np.arange(1, span + 1)]).astype(np.int64)
+        if self.is_integer:
+            modulus = 1 << self.bits
+            if self.bits == 64:
+                values = (np.uint64(self._default_int()) + deltas.astype(np.uint64))
+            else:
+                values = ((self._default_int() + deltas) % modulus).astype(np.uint64)
+            return self._encode(values)
+        default = np.frombuffer(self.default, dtype=np.uint8)
+        out = np.repeat(default[None, :], len(deltas) * self.width, axis=0)
+        rows = np.arange(len(out))
+        columns = rows // len(deltas)
+        out[rows, columns] = ((default[columns].astype(np.int64) + np.tile(deltas, self.width)) % 256).astype(np.uint8)
+        return out
+
+    def random(self, count: int) -> "np.ndarray":
+        """
+        count 个均匀分布的随机值。
+        """
+        return self._rng.integers(0, 256, size=(count, self.width), dtype=np.uint8)
+
+    def values(self, strategy: str, count: int = 1024) -> "np.ndarray":
+        """
+        按策略生成已编码的字段值。
+
+        :param strategy: boundary、bitflip、arithmetic 或 random。
+        :param count: random 策略生成的数量。
+        :return: (n, width) 的 uint8 数组。
+        """
+        if strategy == "random":
+            return self.random(count)
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的变异策略 {strategy}")
+        return getattr(self, strategy)()
+
+    def frames(self, values: "np.ndarray") -> "np.ndarray":
+        """
+        把一批已编码的字段值写入帧模板。
+
+        :param values: (n, width) 的 uint8 数组。
+        :return: (n, 帧长度) 的 C 连续 uint8 数组，每一行是一个完整的数据帧。
+        """
+        out = np.empty((len(values), len(self.frame_template)), dtype=np.uint8)
+        out[:] = self.frame_template
+        out[:, self.frame_offset:self.frame_offset + self.width] = values
+        return out
+
+    def batches(self, batch_size: int = 4096, strategies=STRATEGIES, random_count: int = 4096) -> Iterator["np.ndarray"]:
+        """
+        依次按各策略生成帧，每批最多 batch_size 个。
+
+        :param batch_size: 每批的帧数。
+        :param strategies: 使用的策略及其顺序。
+        :param random_count: random 策略生成的总数。
+        """
+        for strategy in strategies:
+            values = self.values(strategy, random_count)
+            for start in range(0, len(values), batch_size):
+                yield self.frames(values[start:start + batch_size])
+
+
+def iter_frames(frames: "np.ndarray") -> Iterator[memoryview]:
+    """
+    以 memoryview 逐个取出批量帧，发送时不复制数据。
+    """
+    buffer = memoryview(frames).cast("B")
+    length = frames.shape[1]
+    for start in range(0, len(buffer), length):
+        yield buffer[start:start + length]
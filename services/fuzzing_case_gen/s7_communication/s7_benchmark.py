@@ -0,0 +1,337 @@
+"""
+S7 模糊测试性能基准。
+
+对 S7CommunicationGenerator 中的每个功能分别测量：
+
+1. build：构建 Request 的耗时；
+2. render_tree / render_template：boofuzz Request.render() 与编译后的字节模板渲染每个变异的耗时；
+3. framing：S7CommunicationSocketConnection.send 封装 TPKT/COTP 并发送到本地 socketpair 的耗时；
+4. roundtrip：对本地 PLC 模拟器发送一个变异并收到应答的完整往返时延。
+
+每项给出 cases/sec 以及 p50/p90/p99 时延，可以输出 json，并与保存的基线比较。
+--batch 另外比较 s7_batch 的 NumPy 批量变异与逐个渲染生成相同数据帧的吞吐量。
+
+用法：python -m services.fuzzing_case_gen.s7_communication.s7_benchmark --json result.json --baseline baseline.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import socket
+import struct
+import sys
+import threading
+import time
+
+from boofuzz.mutation_context import MutationContext
+from .s7_gen import S7CommunicationGenerator, FUZZABLE_FIELD_COUNTS
+from .s7_template import compile_request
+from .s7_frame_cache import S7FrameCache
+from .s7_communication_socket_connection import S7CommunicationSocketConnection
+from .s7_emulator import EmulatorConfig, EmulatorThread
+
+METRICS = ("render_tree", "render_template", "framing", "roundtrip")
+# 批量变异基准使用的 (功能, 字段)
+BATCH_FIELDS = (("read_var", "db_number"), ("read_szl", "szl_id"), ("upload", "upload_id"), ("download", "unknown"))
+# TPKT 长度字段最大为 65535，超长的变异无法发送
+_MAX_PAYLOAD = 65535 - 7
+
+
+def summarize(samples: list[float]) -> dict:
+    """
+    把每个用例的耗时（秒）汇总为 cases/sec 与 p50/p90/p99（微秒）。
+    """
+    if not samples:
+        return {"cases": 0, "cases_per_sec": 0.0, "p50_us": 0.0, "p90_us": 0.0, "p99_us": 0.0}
+    ordered = sorted(samples)
+    total = sum(ordered)
+
+    def percentile(p):
+        # 最近秩法
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1e6
+
+    return {
+        "cases": len(ordered),
+        "cases_per_sec": len(ordered) / total if total else 0.0,
+        "p50_us": percentile(50),
+        "p90_us": percentile(90),
+        "p99_us": percentile(99),
+    }
+
+
+def _timed(iterable, action) -> list[float]:
+    samples = []
+    for item in iterable:
+        start = time.perf_counter()
+        action(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _measure_build(function: str, repeat: int = 20) -> float:
+    fuzzable_list = [True] * FUZZABLE_FIELD_COUNTS[function]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        getattr(S7CommunicationGenerator, function)(fuzzable_list)
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def _measure_framing(payloads: list[bytes]) -> list[float]:
+    connection = S7CommunicationSocketConnection("127.0.0.1", 102)
+    connection._sock, peer = socket.socketpair()
+
+    def drain():
+        while peer.recv(1 << 16):
+            pass
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    pdu_type = S7CommunicationSocketConnection.pdu_type
+    S7CommunicationSocketConnection.set_pdu_type("DT Data")
+    try:
+        return _timed(payloads, connection.send)
+    finally:
+        S7CommunicationSocketConnection.set_pdu_type(pdu_type)
+        connection._sock.shutdown(socket.SHUT_WR)
+        reader.join()
+        connection._sock.close()
+        peer.close()
+
+
+class _RoundTrip:
+    """
+    通过 S7CommunicationSocketConnection 与模拟器收发数据，连接被断开时重新建立 COTP 连接与通信。
+    """
+
+    def __init__(self, port: int):
+        self.connection = S7CommunicationSocketConnection("127.0.0.1", port, recv_timeout=1.0)
+        self.frames = S7FrameCache()
+        self.reconnects = -1
+        self.connected = False
+
+    def _recv_frame(self) -> bytes:
+        data = b""
+        while len(data) < 4 or len(data) < struct.unpack("!H", data[2:4])[0]:
+            chunk = self.connection.recv(1 << 16)
+            if not chunk:
+                return b""
+            data += chunk
+        return data
+
+    def connect(self):
+        if self.connected:
+            self.connection.close()
+        self.connection.open()
+        self.reconnects += 1
+        self.connection.send_frame(self.frames.connect_request())
+        self._recv_frame()
+        self.connection.send_frame(self.frames.get("setup_communication"))
+        self._recv_frame()
+        self.connected = True
+
+    def exchange(self, payload: bytes):
+        if not self.connected:
+            self.connect()
+        try:
+            self.connection.send(payload)
+            reply = self._recv_frame()
+        except Exception:
+            reply = b""
+        if not reply:
+            self.connected = False
+
+
+def _measure_roundtrip(payloads: list[bytes], emulator_config: EmulatorConfig | None) -> tuple[list[float], int]:
+    pdu_type = S7CommunicationSocketConnection.pdu_type
+    S7CommunicationSocketConnection.set_pdu_type("DT Data")
+    try:
+        with EmulatorThread(emulator_config) as emulator:
+            round_trip = _RoundTrip(emulator.port)
+            round_trip.connect()
+            samples = _timed(payloads, round_trip.exchange)
+            round_trip.connection.close()
+            return samples, round_trip.reconnects
+    finally:
+        S7CommunicationSocketConnection.set_pdu_type(pdu_type)
+
+
+def benchmark_function(function: str, max_cases: int = 2000, emulator_config: EmulatorConfig | None = None) -> dict:
+    """
+    测量一个功能的各项指标，所有字段均开启变异。
+
+    :param function: S7CommunicationGenerator 中的功能名称。
+    :param max_cases: 每项指标最多测量的用例数。
+    :param emulator_config: roundtrip 使用的模拟器配置。
+    """
+    request = getattr(S7CommunicationGenerator, function)([True] * FUZZABLE_FIELD_COUNTS[function])
+    mutations = list(itertools.islice(request.get_mutations(), max_cases))
+    render_tree = _timed(mutations, lambda m: request.render(MutationContext(mutations=m)))
+
+    template = compile_request(request)
+    indexes = range(min(max_cases, template.num_mutations))
+    render_template = _timed(indexes, template.render_mutation)
+
+    payloads = [bytes(template.render_mutation(i)) for i in indexes]
+    payloads = [payload for payload in payloads if len(payload) <= _MAX_PAYLOAD]
+    roundtrip, reconnects = _measure_roundtrip(payloads, emulator_config)
+    return {
+        "build_ms": _measure_build(function),
+        "render_tree": summarize(render_tree),
+        "render_template": summarize(render_template),
+        "framing": summarize(_measure_framing(payloads)),
+        "roundtrip": dict(summarize(roundtrip), reconnects=reconnects),
+    }
+
+
+def benchmark_batch(function: str, field: str, count: int = 20000) -> dict:
+    """
+    比较 NumPy 批量变异与逐个渲染生成同样 count 个数据帧的吞吐量，并校验两者的输出一致。
+
+    :param function: S7CommunicationGenerator 中的功能名称。
+    :param field: 要变异的字段名称。
+    :param count: 生成的数据帧数，其中随机值补足边界值、位翻转、算术扫描之外的部分。
+    """
+    from .s7_batch import BatchMutator, STRATEGIES
+
+    mutator = BatchMutator.from_function(function, field, [True] * FUZZABLE_FIELD_COUNTS[function])
+    fixed = sum(len(mutator.values(strategy)) for strategy in STRATEGIES if strategy != "random")
+    random_count = max(0, count - fixed)
+
+    start = time.perf_counter()
+    batches = list(mutator.batches(random_count=random_count))
+    batch_elapsed = time.perf_counter() - start
+    frames = sum(len(batch) for batch in batches)
+
+    # 逐个渲染：每个值是一个 Python bytes 对象，逐个写入模板并封装首部
+    values = [bytes(row) for batch in batches for row in batch[:, mutator.frame_offset:mutator.frame_offset + mutator.width]]
+    template = mutator.template
+    start = time.perf_counter()
+    rendered = [S7CommunicationSocketConnection.frame(template.render(mutator.field_index, value), "DT Data")
+                for value in values]
+    object_elapsed = time.perf_counter() - start
+
+    flat = [bytes(row) for batch in batches for row in batch]
+    batch_rate = frames / batch_elapsed if batch_elapsed else 0.0
+    object_rate = frames / object_elapsed if object_elapsed else 0.0
+    return {
+        "function": function,
+        "field": mutator.name,
+        "frames": frames,
+        "batch_frames_per_sec": batch_rate,
+        "object_frames_per_sec": object_rate,
+        "speedup": batch_rate / object_rate if object_rate else 0.0,
+        "identical": flat == rendered,
+    }
+
+
+def run_suite(
+    functions: list[str] | None = None, max_cases: int = 2000, emulator_config: EmulatorConfig | None = None
+) -> dict:
+    """
+    对 functions 中的每个功能运行基准，默认为所有功能。
+    """
+    functions = list(FUZZABLE_FIELD_COUNTS) if functions is None else functions
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "max_cases": max_cases,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "functions": {function: benchmark_function(function, max_cases, emulator_config) for function in functions},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.1) -> list[dict]:
+    """
+    比较两次运行的 cases/sec。
+
+    :param threshold: 吞吐量下降超过该比例时视为性能回退。
+    :return: 每个功能、每项指标的比较结果，regression 为 True 表示性能回退。
+    """
+    rows = []
+    for function, metrics in current["functions"].items():
+        old_metrics = baseline.get("functions", {}).get(function)
+        if old_metrics is None:
+            continue
+        for metric in METRICS:
+            if metric not in metrics or metric not in old_metrics:
+                continue
+            new = metrics[metric]["cases_per_sec"]
+            old = old_metrics[metric]["cases_per_sec"]
+            change = (new - old) / old if old else 0.0
+            rows.append({
+                "function": function,
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": change,
+                "regression": change < -threshold,
+            })
+    return rows
+
+
+def print_report(result: dict):
+    print(f"{'function':<22}{'metric':<18}{'cases/s':>12}{'p50(us)':>10}{'p90(us)':>10}{'p99(us)':>10}")
+    for function, metrics in result["functions"].items():
+        for metric in METRICS:
+            row = metrics[metric]
+            print(
+                f"{function:<22}{metric:<18}{row['cases_per_sec']:>12.0f}"
+                f"{row['p50_us']:>10.1f}{row['p90_us']:>10.1f}{row['p99_us']:>10.1f}"
+            )
+
+
+def print_comparison(rows: list[dict]):
+    print(f"{'function':<22}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}")
+    for row in rows:
+        flag = "  <- 回退" if row["regression"] else ""
+        print(
+            f"{row['function']:<22}{row['metric']:<18}{row['baseline']:>12.0f}"
+            f"{row['current']:>12.0f}{row['change']:>9.1%}{flag}"
+        )
+
+
+def print_batch(rows: list[dict]):
+    print(f"{'function':<22}{'field':<28}{'frames':>8}{'batch/s':>12}{'object/s':>12}{'speedup':>9}")
+    for row in rows:
+        field = row["field"].rsplit(".", 1)[-1]
+        print(
+            f"{row['function']:<22}{field:<28}{row['frames']:>8}{row['batch_frames_per_sec']:>12.0f}"
+            f"{row['object_frames_per_sec']:>12.0f}{row['speedup']:>8.1f}x"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="S7 模糊测试性能基准")
+    parser.add_argument("--functions", nargs="*", choices=list(FUZZABLE_FIELD_COUNTS), default=None)
+    parser.add_argument("--cases", type=int, default=2000, help="每项指标最多测量的用例数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟器的应答延迟（秒）")
+    parser.add_argument("--json", dest="json_path", default=None, help="把结果写入 json 文件")
+    parser.add_argument("--baseline", default=None, help="与保存的基线 json 比较")
+    parser.add_argument("--threshold", type=float, default=0.1, help="吞吐量下降超过该比例时视为回退")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回退时返回非零退出码")
+    parser.add_argument("--batch", action="store_true", help="比较 NumPy 批量变异与逐个渲染（需要 numpy）")
+    args = parser.parse_args(argv)
+
+    result = run_suite(args.functions, args.cases, EmulatorConfig(latency=args.latency))
+    print_report(result)
+    if args.batch:
+        result["batch"] = [benchmark_batch(function, field, args.cases * 10) for function, field in BATCH_FIELDS]
+        print()
+        print_batch(result["batch"])
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            rows = compare(result, json.load(f), args.threshold)
+        print()
+        print_comparison(rows)
+        if args.fail_on_regression and any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+测试用例寻址。
+
+“功能 F、变异规则 L 下的第 N 个变异”在任意机器上都对应同一个数据包：编号与 boofuzz 的
+total_mutant_index 一致（从 1 开始），由编译后的字节模板直接定位，不需要从头遍历或渲染。
+因此一次模糊测试可以按编号区间拆分到多台机器上执行，中断后也可以从任意编号继续。
+"""
+import attr
+from boofuzz.blocks.request import Request
+from boofuzz.mutation import Mutation
+from boofuzz.mutation_context import MutationContext
+
+from .s7_gen import FUZZABLE_FIELD_COUNTS, S7CommunicationGenerator
+from .s7_template import S7RequestTemplate, compile_request
+
+
+@attr.s
+class S7MutationContext(MutationContext):
+    """
+    携带已渲染数据的 MutationContext，会话发送时直接使用 data 而不再渲染 Request。
+    设置了 frame（已封装 TPKT/COTP 首部的完整数据帧）时直接发送 frame。
+    """
+    data = attr.ib(type=bytes, default=None)
+    frame = attr.ib(type=bytes, default=None)
+
+
+def case_id(function: str, fuzzable_list: list[bool] | None, index: int) -> str:
+    """
+    生成测试用例的稳定标识，例如 read_var:00000001:42。
+
+    :param function: 功能名称。
+    :param fuzzable_list: 变异规则列表，None 表示使用生成器的默认规则。
+    :param index: 变异编号，从 1 开始。
+    """
+    rule = "default" if fuzzable_list is None else "".join("1" if f else "0" for f in fuzzable_list)
+    return f"{function}:{rule}:{index}"
+
+
+def parse_case_id(identifier: str) -> tuple[str, list[bool] | None, int]:
+    """
+    解析 case_id 生成的标识。
+
+    :raises ValueError: 标识格式错误或变异规则长度与功能不符。
+    :return: (功能名称, 变异规则列表, 变异编号)
+    """
+    try:
+        function, rule, index = identifier.split(":")
+        index = int(index)
+    except ValueError:
+        raise ValueError(f"无法解析测试用例标识 {identifier}") from None
+    if function not in FUZZABLE_FIELD_COUNTS:
+        raise ValueError(f"未知的功能 {function}")
+    if rule == "default":
+        return function, None, index
+    if len(rule) != FUZZABLE_FIELD_COUNTS[function] or set(rule) - {"0", "1"}:
+        raise ValueError(f"变异规则 {rule} 与功能 {function} 不符")
+    return function, [c == "1" for c in rule], index
+
+
+class S7CaseIndex:
+    """
+    一个 Request 的测试用例索引：计算变异总数、按编号渲染或构造 MutationContext，复杂度 O(log n)。
+
+    变异总数由 Request.num_mutations() 按原语计数得到，不编码任何变异值；字节模板在第一次定位或渲染测试用例时才编译。
+    """
+
+    def __init__(self, request: Request, template: S7RequestTemplate | None = None):
+        self.request = request
+        self._template = template
+        self._total = request.num_mutations() if template is None else template.num_mutations
+
+    @classmethod
+    def from_function(cls, function: str, fuzzable_list: list[bool] | None = None) -> "S7CaseIndex":
+        return cls(getattr(S7CommunicationGenerator, function)(fuzzable_list))
+
+    @classmethod
+    def from_request(cls, request: Request) -> "S7CaseIndex":
+        return cls(request)
+
+    @property
+    def template(self) -> S7RequestTemplate:
+        """
+        编译后的字节模板，第一次访问时编译。
+        """
+        if self._template is None:
+            self._template = compile_request(self.request)
+        return self._template
+
+    @property
+    def total(self) -> int:
+        """
+        变异总数，即最大的变异编号。
+        """
+        return self._total
+
+    def _check(self, index: int):
+        if not 1 <= index <= self.total:
+            raise IndexError(f"变异编号 {index} 超出范围 [1, {self.total}]")
+
+    def describe(self, index: int) -> tuple[str, int]:
+        """
+        第 index 个变异所变异的字段及其在该字段中的编号。
+
+        :param index: 变异编号，从 1 开始。
+        :return: (字段的 qualified name, 字段内变异编号)
+        """
+        self._check(index)
+        field_index, value_index = self.template.locate(index - 1)
+        return self.template.fields[field_index].name, value_index
+
+    def render(self, index: int) -> bytes:
+        """
+        渲染第 index 个变异，结果与 boofuzz 模糊测试到该编号时发送的数据一致。
+
+        :param index: 变异编号，从 1 开始。
+        """
+        self._check(index)
+        return bytes(self.template.render_mutation(index - 1))
+
+    def mutation_context(
+        self, index: int, message_path: list | None = None, data: bytes | None = None
+    ) -> S7MutationContext:
+        """
+        构造第 index 个变异的 MutationContext，供会话直接发送。
+
+        :param index: 变异编号，从 1 开始。
+        :param message_path: 会话中到达该 Request 的路径。
+        :param data: 已经渲染好的数据，例如从语料文件中读取的数据，默认为按编号渲染。
+        """
+        self._check(index)
+        k, value_index = self.template._locate(index - 1)
+        name = self.template.fields[self.template.fuzzable_indexes[k]].name
+        # 变异值为该字段编码后的字节，仅用于日志中的用例名称
+        mutation = Mutation(value=self.template.mutations[k][value_index], qualified_name=name, index=value_index)
+        return S7MutationContext(
+            mutations={name: mutation},
+            message_path=message_path or [],
+            data=self.render(index) if data is None else data,
+        )
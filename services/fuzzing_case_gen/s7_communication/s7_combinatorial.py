@@ -0,0 +1,189 @@
+"""
+组合变异（pairwise / n-wise 覆盖数组）。
+
+boofuzz 每个测试用例只变异一个原语，transport_size、length、area 等字段之间的相互作用从未被同时测试，
+而所有字段取值的笛卡尔积又太大。CoveringArray 以贪心算法逐行生成 t 强度覆盖数组：任意 t 个字段的
+任意取值组合至少出现在一行中，行数随字段数近似按对数增长。生成过程是流式的，只保存尚未覆盖的组合
+（每组 t 个字段一个位图），不保存已经产生的行。
+
+CombinatorialCases 为一个 Request 的每个可变异字段挑选少量有代表性的变异值（包括默认值），
+按覆盖数组同时替换多个字段并修正长度字段。
+"""
+import math
+from collections.abc import Iterator
+from dataclasses import dataclass
+from itertools import combinations
+
+from boofuzz.mutation import Mutation
+from .s7_case_index import S7MutationContext
+from .s7_template import S7RequestTemplate, compile_function
+
+
+class CoveringArray:
+    """
+    t 强度覆盖数组的流式生成器。
+
+    :param value_counts: 每个字段的取值个数，取值用 0..n-1 表示。
+    :param strength: 覆盖强度 t，2 即 pairwise；大于字段数时按字段数计算（即笛卡尔积）。
+    :raises ValueError: 强度小于 1 或某个字段没有取值。
+    """
+
+    def __init__(self, value_counts: list[int], strength: int = 2):
+        if strength < 1:
+            raise ValueError(f"覆盖强度 {strength} 必须大于 0")
+        if any(count < 1 for count in value_counts):
+            raise ValueError("每个字段至少需要一个取值")
+        self.value_counts = list(value_counts)
+        self.strength = min(strength, len(value_counts))
+        self.combinations = list(combinations(range(len(value_counts)), self.strength))
+        # 每个字段参与的 (组合下标, 字段在组合中的位置)
+        self._involved = [[] for _ in value_counts]
+        for c, fields in enumerate(self.combinations):
+            for position, field in enumerate(fields):
+                self._involved[field].append((c, position))
+        self.rows = 0
+
+    @property
+    def tuples(self) -> int:
+        """
+        需要覆盖的取值组合总数。
+        """
+        return sum(math.prod(self.value_counts[field] for field in fields) for fields in self.combinations)
+
+    def _index(self, fields: tuple[int, ...], row: list[int | None]) -> int:
+        # 组合中各字段取值的混合进制编号
+        index = 0
+        for field in fields:
+            index = index * self.value_counts[field] + row[field]
+        return index
+
+    def _decode(self, fields: tuple[int, ...], index: int) -> list[int]:
+        values = []
+        for field in reversed(fields):
+            index, value = divmod(index, self.value_counts[field])
+            values.append(value)
+        return values[::-1]
+
+    def __iter__(self) -> Iterator[tuple[int, ...]]:
+        """
+        依次产生覆盖数组的每一行，即每个字段的取值编号。
+        """
+        self.rows = 0
+        if not self.combinations:
+            return
+        uncovered = [(1 << math.prod(self.value_counts[field] for field in fields)) - 1
+                     for fields in self.combinations]
+        usage = [[0] * count for count in self.value_counts]
+        first = 0
+        while True:
+            while first < len(uncovered) and not uncovered[first]:
+                first += 1
+            if first == len(uncovered):
+                return
+            row: list[int | None] = [None] * len(self.value_counts)
+            # 以第一个尚未覆盖的组合为种子，保证每一行至少覆盖一个新组合
+            mask = uncovered[first]
+            seed = self._decode(self.combinations[first], (mask & -mask).bit_length() - 1)
+            for field, value in zip(self.combinations[first], seed):
+                row[field] = value
+            for field, count in enumerate(self.value_counts):
+                if row[field] is not None:
+                    continue
+                best, best_key = 0, None
+                for value in range(count):
+                    row[field] = value
+                    gain = 0
+                    for c, _ in self._involved[field]:
+                        fields = self.combinations[c]
+                        if all(row[other] is not None for other in fields):
+                            gain += uncovered[c] >> self._index(fields, row) & 1
+                    # 新覆盖的组合最多者优先，其次是使用次数最少的取值
+                    key = (gain, -usage[field][value])
+                    if best_key is None or key > best_key:
+                        best, best_key = value, key
+                row[field] = best
+            for c, fields in enumerate(self.combinations):
+                uncovered[c] &= ~(1 << self._index(fields, row))
+            for field, value in enumerate(row):
+                usage[field][value] += 1
+            self.rows += 1
+            yield tuple(row)
+
+
+def interesting_values(values: list[bytes], limit: int) -> list[int]:
+    """
+    从一个字段的变异值中挑选至多 limit 个有代表性的取值：去重后在变异顺序上均匀抽样，
+    boofuzz 的变异以边界值开头，因此总是保留第一个变异。
+
+    :param values: 该字段编码后的变异值。
+    :param limit: 最多挑选的个数。
+    :return: 变异值的下标。
+    """
+    distinct = []
+    seen = set()
+    for index, value in enumerate(values):
+        if value not in seen:
+            seen.add(value)
+            distinct.append(index)
+    if len(distinct) <= limit:
+        return distinct
+    step = len(distinct) / limit
+    return [distinct[int(i * step)] for i in range(limit)]
+
+
+@dataclass
+class Combination:
+    """
+    一个组合测试用例。
+
+    :param case: 测试用例编号，从 1 开始。
+    :param mutations: 可变异字段下标 -> 字段内变异编号，取默认值的字段不在其中。
+    :param data: 渲染后的 S7 数据。
+    """
+    case: int
+    mutations: dict[int, int]
+    data: bytes
+
+
+class CombinatorialCases:
+    """
+    一个 Request 的组合测试用例。
+
+    :param template: 编译后的 Request 模板。
+    :param strength: 覆盖强度，2 即 pairwise。
+    :param max_values: 每个字段最多挑选的变异值个数，另外还包括默认值。
+    """
+
+    def __init__(self, template: S7RequestTemplate, strength: int = 2, max_values: int = 7):
+        self.template = template
+        # 每个可变异字段的取值：None 表示默认值，其余为字段内变异编号
+        self.choices = [[None] + interesting_values(values, max_values) for values in template.mutations]
+        self.array = CoveringArray([len(choices) for choices in self.choices], strength)
+
+    @classmethod
+    def from_function(
+        cls, function: str, fuzzable_list: list[bool] | None = None, strength: int = 2, max_values: int = 7
+    ) -> "CombinatorialCases":
+        return cls(compile_function(function, fuzzable_list), strength, max_values)
+
+    def __iter__(self) -> Iterator[Combination]:
+        for case, row in enumerate(self.array, 1):
+            mutations = {}
+            values = {}
+            for k, choice in enumerate(row):
+                value_index = self.choices[k][choice]
+                if value_index is not None:
+                    mutations[k] = value_index
+                    values[self.template.fuzzable_indexes[k]] = self.template.mutations[k][value_index]
+            yield Combination(case, mutations, bytes(self.template.render_fields(values)))
+
+    def mutation_context(self, combination: Combination, message_path: list | None = None) -> S7MutationContext:
+        """
+        构造组合测试用例的 MutationContext，日志中的用例名称列出所有被变异的字段。
+        """
+        mutations = {}
+        for k, value_index in combination.mutations.items():
+            name = self.template.fields[self.template.fuzzable_indexes[k]].name
+            mutations[name] = Mutation(value=self.template.mutations[k][value_index], qualified_name=name,
+                                       index=value_index)
+        return S7MutationContext(mutations=mutations, message_path=message_path or [], data=combination.data)
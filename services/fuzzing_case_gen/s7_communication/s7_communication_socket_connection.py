@@ -1,23 +1,123 @@
 """
 重写连接类，将 s7 数据包封装在 cotp、tpkt 中
 """
+import errno
+import socket
+import struct
+import sys
+import time
 from scapy.compat import raw
+from boofuzz import exception
+from boofuzz.connections.base_socket_connection import _seconds_to_sockopt_format
 from boofuzz.connections.tcp_socket_connection import TCPSocketConnection
 from .tpkt import TPKT
 from .cotp import COTP
+from .s7_rtt import RTTEstimator
+
+# TPKT 首部：版本、保留、长度
+_TPKT_HEADER = struct.Struct("!BBH")
+# TPKT 首部 + COTP DT 首部：COTP 长度、PDU 类型、TPDU number/EOT
+_DT_HEADER = struct.Struct("!BBHBBB")
+# COTP CR 首部（不含 TPKT），与 cotp.COTPConnect 的默认值一致：
+# 目的引用 0x0000、源引用 0x000F、选项 0x00、src tsap 0x0101、dst tsap 0x0102、tpdu size 0x0a
+_COTP_CR = struct.pack("!BBHHB", 17, 0xE0, 0x0000, 0x000F, 0x00) + bytes.fromhex("c1020101c2020201c0010a")
+_PDU_TYPES = {"CR Connect Request", "DT Data"}
+
+
+def _count_frames(data: bytes) -> int:
+    """
+    data 开头连续的完整 TPKT 帧个数。
+    """
+    count = offset = 0
+    while offset + _TPKT_HEADER.size <= len(data):
+        length = _TPKT_HEADER.unpack_from(data, offset)[2]
+        if length < _TPKT_HEADER.size or offset + length > len(data):
+            break
+        offset += length
+        count += 1
+    return count
 
 
 class S7CommunicationSocketConnection(TCPSocketConnection):
     """
     重写 TCPSocketConnection 的 send 方法发送 COTP、TPKT 协议层的数据，以便专心于 S7 协议的原语定义
+
+    默认使用预编译的 struct 封装 TPKT/COTP 首部，并通过 socket.sendmsg 将首部与数据一同发送；
+    framing="scapy" 时使用 scapy 构建协议栈，用于校验两种封装方式的输出是否一致。
+
+    传入 rtt 时启用自适应接收超时：每次发送后的第一次接收以 rtt 给出的超时等待，超时时通知 rtt 退避。
+    只有收到的数据包含了所有在途请求的应答时才记录往返时延：非持久模式下 CR、前置数据包与测试用例连续发送，
+    第一次接收到的通常只是 CC，其时延是建立连接的耗时而不是测试用例的往返时延。
     """
     pdu_type = "CR Connect Request"
-    def __init__(self, host, port, send_timeout=5.0, recv_timeout=5.0, server=False):
+    def __init__(
+        self,
+        host,
+        port,
+        send_timeout=5.0,
+        recv_timeout=5.0,
+        server=False,
+        framing: str = "native",
+        rtt: RTTEstimator | None = None,
+    ):
         super(TCPSocketConnection, self).__init__(send_timeout, recv_timeout)
         self.host = host
         self.port = port
         self.server = server
         self._serverSock = None
+        if framing not in ("native", "scapy"):
+            raise ValueError(f"不支持的封装方式 {framing}")
+        self.framing = framing
+        # 每次发送复用的首部缓冲区，避免分配新的 bytes 对象
+        self._dt_header = bytearray(_DT_HEADER.size)
+        self._cr_header = bytearray(_TPKT_HEADER.size) + _COTP_CR
+        self.rtt = rtt
+        # 尚未收到应答的最近一次发送的时间，以及当前设置在套接字上的接收超时
+        self._last_send: float | None = None
+        # 上一次接收之后发出的请求数
+        self._outstanding = 0
+        self._applied_timeout: float | None = None
+        # 最近一次收发是否因为连接被重置或中止而失败，由会话在发送测试用例前清除
+        self.connection_lost = False
+        # 分阶段计时：启用后记录 send 完成的时间（perf_counter_ns），用于区分发送与等待应答的耗时
+        self.track_send = False
+        self.send_finished_ns: int | None = None
+        # 为 True 时 send 收到的数据已经封装好 TPKT/COTP 首部，例如语料文件中的数据帧，由 send_frame 直接发送
+        self.send_framed = False
+
+    def open(self):
+        super().open()
+        self._last_send = None
+        self._outstanding = 0
+        self._applied_timeout = self._recv_timeout
+        self.connection_lost = False
+
+    def recv(self, max_bytes):
+        """
+        接收数据。启用自适应超时时，发送后的第一次接收以估计的超时等待并记录往返时延。
+        """
+        try:
+            return self._recv(max_bytes)
+        except (exception.BoofuzzTargetConnectionReset, exception.BoofuzzTargetConnectionAborted):
+            self.connection_lost = True
+            raise
+
+    def _recv(self, max_bytes):
+        if self.rtt is None or self._last_send is None:
+            return super().recv(max_bytes)
+        timeout = self.rtt.timeout()
+        if timeout != self._applied_timeout:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, _seconds_to_sockopt_format(timeout))
+            self._applied_timeout = timeout
+        data = super().recv(max_bytes)
+        if not data:
+            self.rtt.timed_out()
+        elif self._outstanding <= 1 or _count_frames(data) >= self._outstanding:
+            # 最后一个应答对应最近一次发送的请求
+            self.rtt.observe(time.perf_counter() - self._last_send)
+        self._last_send = None
+        self._outstanding = 0
+        return data
 
     def send(self, data):
         """
@@ -28,11 +128,118 @@ class S7CommunicationSocketConnection(TCPSocketConnection):
         :param data: _description_
         :type data: _type_
         """
-        tpkt = TPKT()
-        cotp = COTP(pdu_type=S7CommunicationSocketConnection.pdu_type)
-        data = raw(tpkt/cotp/data)
-        super().send(data)
-    
+        if self.send_framed:
+            return self.send_frame(data)
+        self._last_send = time.perf_counter()
+        self._outstanding += 1
+        try:
+            if self.framing == "scapy":
+                sent = super().send(self.frame_scapy(data))
+            else:
+                sent = self._send_buffers(self._header(len(data)), data)
+        except (exception.BoofuzzTargetConnectionReset, exception.BoofuzzTargetConnectionAborted):
+            self.connection_lost = True
+            raise
+        if self.track_send:
+            self.send_finished_ns = time.perf_counter_ns()
+        return sent
+
+    def send_frame(self, frame: bytes) -> int:
+        """
+        发送已经封装好 TPKT、COTP 协议层的数据帧，不再进行封装。
+
+        :param frame: 完整的数据帧，通常来自 S7FrameCache。
+        :return: 实际发送的字节数。
+        """
+        self._last_send = time.perf_counter()
+        self._outstanding += 1
+        try:
+            sent = super().send(frame)
+        except (exception.BoofuzzTargetConnectionReset, exception.BoofuzzTargetConnectionAborted):
+            self.connection_lost = True
+            raise
+        if self.track_send:
+            self.send_finished_ns = time.perf_counter_ns()
+        return sent
+
+    def _header(self, length: int) -> bytearray:
+        """
+        根据当前 pdu 类型在复用缓冲区中写入 TPKT/COTP 首部。
+
+        :param length: s7 数据长度。
+        :raises struct.error: 帧长度超过 TPKT 长度字段的表示范围。
+        """
+        pdu_type = S7CommunicationSocketConnection.pdu_type
+        if pdu_type == "DT Data":
+            _DT_HEADER.pack_into(self._dt_header, 0, 3, 0, _DT_HEADER.size + length, 2, 0xF0, 0x80)
+            return self._dt_header
+        if pdu_type == "CR Connect Request":
+            _TPKT_HEADER.pack_into(self._cr_header, 0, 3, 0, len(self._cr_header) + length)
+            return self._cr_header
+        raise ValueError(f"不支持的 pdu 类型 {pdu_type}")
+
+    def _send_buffers(self, header, data) -> int:
+        """
+        使用 scatter/gather 一次发送首部与数据，不进行字节拼接。
+
+        :return: 实际发送的字节数。
+        """
+        total = len(header) + len(data)
+        if not hasattr(self._sock, "sendmsg"):
+            return super().send(bytes(header) + bytes(data))
+        buffers = [memoryview(header), memoryview(data)]
+        num_sent = 0
+        try:
+            while num_sent < total:
+                sent = self._sock.sendmsg(buffers)
+                num_sent += sent
+                # 部分发送时跳过已发送的部分
+                while buffers and sent >= len(buffers[0]):
+                    sent -= len(buffers[0])
+                    buffers.pop(0)
+                if buffers and sent:
+                    buffers[0] = buffers[0][sent:]
+        except socket.error as e:
+            if e.errno == errno.ECONNABORTED:
+                raise exception.BoofuzzTargetConnectionAborted(
+                    socket_errno=e.errno, socket_errmsg=e.strerror
+                ).with_traceback(sys.exc_info()[2])
+            elif e.errno in [errno.ECONNRESET, errno.ENETRESET, errno.ETIMEDOUT, errno.EPIPE]:
+                raise exception.BoofuzzTargetConnectionReset().with_traceback(sys.exc_info()[2])
+            else:
+                raise
+        return num_sent
+
+    @staticmethod
+    def frame(data: bytes, pdu_type: str | None = None) -> bytes:
+        """
+        将 s7 数据封装在 TPKT、COTP 协议层中。
+
+        :param data: s7 数据。
+        :param pdu_type: COTP pdu 类型，默认使用当前设置的类型。
+        :return: 完整的数据帧。
+        """
+        if pdu_type is None:
+            pdu_type = S7CommunicationSocketConnection.pdu_type
+        if pdu_type == "DT Data":
+            return _DT_HEADER.pack(3, 0, _DT_HEADER.size + len(data), 2, 0xF0, 0x80) + data
+        if pdu_type == "CR Connect Request":
+            return _TPKT_HEADER.pack(3, 0, _TPKT_HEADER.size + len(_COTP_CR) + len(data)) + _COTP_CR + data
+        raise ValueError(f"不支持的 pdu 类型 {pdu_type}")
+
+    @staticmethod
+    def frame_scapy(data: bytes, pdu_type: str | None = None) -> bytes:
+        """
+        使用 scapy 的 TPKT、COTP 协议层封装 s7 数据，用于校验 frame 的输出。
+
+        :param data: s7 数据。
+        :param pdu_type: COTP pdu 类型，默认使用当前设置的类型。
+        :return: 完整的数据帧。
+        """
+        if pdu_type is None:
+            pdu_type = S7CommunicationSocketConnection.pdu_type
+        return raw(TPKT() / COTP(pdu_type=pdu_type) / data)
+
     @staticmethod
     def set_pdu_type(pdu_type: str) -> None:
         """
@@ -41,4 +248,6 @@ class S7CommunicationSocketConnection(TCPSocketConnection):
         :param pdu_type: _description_
         :type pdu_type: str
         """
-        S7CommunicationSocketConnection.pdu_type = pdu_type
\ No newline at end of file
+        if pdu_type not in _PDU_TYPES:
+            raise ValueError(f"不支持的 pdu 类型 {pdu_type}")
+        S7CommunicationSocketConnection.pdu_type = pdu_type
@@ -0,0 +1,187 @@
+"""
+预渲染的测试用例语料文件。
+
+回归测试需要把同一组变异重放到多个固件版本的 PLC 上，每次都重新渲染所有测试用例。
+export_corpus 把一个功能、一条变异规则下的测试用例一次性渲染为完整的 TPKT/COTP/S7 数据帧，
+写入一个二进制语料文件；S7Corpus 以只读方式 mmap 该文件，按定长偏移索引直接取出数据帧：
+打开文件不需要读取或解析数据，内存占用与语料大小无关，多个进程可以共享同一个文件。
+
+文件格式（整数均为小端）：
+
+1. 首部 32 字节：魔数 S7CORPUS、版本 u32、元数据长度 u32、用例数 u64、索引偏移 u64；
+   版本 2 起元数据中包含字段表，不再支持没有字段表的版本 1 文件；
+2. 元数据：utf-8 编码的 json，包含功能名称、变异规则、用例编号区间以及各可变异字段的第一个用例编号，
+   重放时由此得到每个用例所变异的字段（可变异字段中的序号），不需要重新编译字节模板；
+3. 数据帧：依次存放每个测试用例的完整数据帧，超过 TPKT 长度上限的用例长度为 0；
+4. 索引：用例数 + 1 个 u64 偏移，第 i 个用例的数据帧为 [offset[i], offset[i + 1])，按 8 字节对齐。
+"""
+import bisect
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+
+from .s7_case_index import S7CaseIndex
+from .s7_communication_socket_connection import S7CommunicationSocketConnection
+
+MAGIC = b"S7CORPUS"
+VERSION = 2
+_HEADER = struct.Struct("<8sIIQQ")
+# TPKT(4) + COTP DT(3) 首部长度
+_DT_HEADER_LENGTH = 7
+_MAX_PAYLOAD = 65535 - _DT_HEADER_LENGTH
+
+
+def export_corpus(
+    filename: str, function: str, fuzzable_list: list[bool] | None = None, start: int = 1, end: int | None = None
+) -> dict:
+    """
+    把 function 在 fuzzable_list 规则下编号为 [start, end] 的测试用例渲染为语料文件。
+
+    :param filename: 语料文件路径。
+    :param function: S7CommunicationGenerator 中的功能名称。
+    :param fuzzable_list: 变异规则列表，None 表示使用生成器的默认规则。
+    :param start: 起始编号，从 1 开始。
+    :param end: 结束编号（包含），默认为变异总数。
+    :raises IndexError: 编号区间超出范围。
+    :return: 语料文件的元数据。
+    """
+    index = S7CaseIndex.from_function(function, fuzzable_list)
+    end = index.total if end is None else end
+    if not 1 <= start <= end <= index.total:
+        raise IndexError(f"编号区间 [{start}, {end}] 超出范围 [1, {index.total}]")
+    metadata = {
+        "function": function,
+        "fuzzable_list": fuzzable_list,
+        "request": index.template.name,
+        "start": start,
+        "end": end,
+        "total": index.total,
+        # 按可变异字段的顺序：[字段的 qualified name, 该字段第一个变异的编号]。匿名 Block 的名称与生成顺序有关，
+        # 重放时按序号而不是名称对应字段
+        "fields": [
+            [index.template.fields[field_index].name, index.template.mutation_range(k).start + 1]
+            for k, field_index in enumerate(index.template.fuzzable_indexes)
+        ],
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    meta = json.dumps(metadata, ensure_ascii=False).encode()
+    count = end - start + 1
+    offsets = array("Q")
+    with open(filename, "wb") as f:
+        f.write(bytes(_HEADER.size))
+        f.write(meta)
+        position = _HEADER.size + len(meta)
+        for case in range(start, end + 1):
+            offsets.append(position)
+            data = index.render(case)
+            if len(data) > _MAX_PAYLOAD:
+                continue
+            frame = S7CommunicationSocketConnection.frame(data, "DT Data")
+            f.write(frame)
+            position += len(frame)
+        offsets.append(position)
+        padding = -position % 8
+        f.write(bytes(padding))
+        index_offset = position + padding
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        offsets.tofile(f)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, len(meta), count, index_offset))
+    return metadata
+
+
+class S7Corpus:
+    """
+    以 mmap 方式打开的语料文件。
+
+    :param filename: 语料文件路径。
+    :raises ValueError: 文件不是语料文件或版本不受支持。
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        if len(self._buffer) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{filename} 不是语料文件")
+        magic, version, meta_length, count, index_offset = _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{filename} 不是语料文件或版本不受支持")
+        self.metadata: dict = json.loads(bytes(self._buffer[_HEADER.size:_HEADER.size + meta_length]))
+        self.count = count
+        self.start = self.metadata["start"]
+        self.end = self.metadata["end"]
+        self.fields: list[list] = self.metadata["fields"]
+        self._field_starts = [first for _, first in self.fields]
+        index = self._buffer[index_offset:index_offset + (count + 1) * 8]
+        if sys.byteorder == "little":
+            # 索引直接引用映射的内存，不复制
+            self._offsets = index.cast("Q")
+        else:
+            self._offsets = memoryview(array("Q", struct.unpack(f"<{count + 1}Q", index)))
+            index.release()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        for view in ("_offsets", "_buffer"):
+            if getattr(self, view, None) is not None:
+                getattr(self, view).release()
+                setattr(self, view, None)
+        try:
+            self._mmap.close()
+        except BufferError:
+            # 调用者仍持有数据帧的视图，映射在这些视图被回收后释放
+            pass
+
+    def frame(self, case: int) -> memoryview:
+        """
+        编号为 case 的测试用例的完整数据帧，为映射内存的视图。该用例超过 TPKT 长度上限时为空。
+
+        :param case: 测试用例编号，与 fuzz_range 的编号一致。
+        :raises IndexError: 编号不在语料范围内。
+        """
+        if not self.start <= case <= self.end:
+            raise IndexError(f"编号 {case} 不在语料范围 [{self.start}, {self.end}] 内")
+        i = case - self.start
+        return self._buffer[self._offsets[i]:self._offsets[i + 1]]
+
+    def locate(self, case: int) -> tuple[int, int]:
+        """
+        编号为 case 的测试用例所变异的字段在可变异字段中的序号，以及在该字段中的编号。
+
+        :raises IndexError: 编号不在语料范围内。
+        """
+        if not self.start <= case <= self.end:
+            raise IndexError(f"编号 {case} 不在语料范围 [{self.start}, {self.end}] 内")
+        k = bisect.bisect_right(self._field_starts, case) - 1
+        return k, case - self._field_starts[k]
+
+    def payload(self, case: int) -> memoryview:
+        """
+        编号为 case 的测试用例去掉 TPKT/COTP 首部后的 S7 数据。
+        """
+        return self.frame(case)[_DT_HEADER_LENGTH:]
+
+    def __iter__(self):
+        """
+        依次产生 (测试用例编号, 数据帧)，跳过超过 TPKT 长度上限的用例。
+        """
+        for case in range(self.start, self.end + 1):
+            frame = self.frame(case)
+            if frame:
+                yield case, frame
@@ -0,0 +1,452 @@
+"""
+本地 S7 PLC 模拟器。
+
+基于 asyncio 实现的 TPKT/COTP/S7comm 服务端，对建立通信、读取变量、读取 SZL、上传/下载以及启动/停止 PLC
+返回合理的 Ack_Data/Userdata 应答，用于在没有真实 PLC 的环境中测量模糊测试的吞吐量。
+支持配置应答延迟、按概率注入错误以及模拟崩溃（断开所有连接或不再应答）。
+
+用法：python -m services.fuzzing_case_gen.s7_communication.s7_emulator --port 1102 --latency 0.001
+"""
+import argparse
+import asyncio
+import random
+import struct
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .tpkt import TPKT
+from .cotp import COTP, COTPFunction
+from .s7_communication_socket_connection import S7CommunicationSocketConnection
+
+_TPKT_HEADER = struct.Struct("!BBH")
+# Ack/Ack_Data 首部：协议 id、ROSCTR、保留、pdu 引用、参数长度、数据长度、错误类别、错误码
+_ACK_HEADER = struct.Struct("!BBH2sHHBB")
+# Job/Userdata 首部
+_JOB_HEADER = struct.Struct("!BBH2sHH")
+_READ_ITEM = struct.Struct("!BBBBHHB3s")
+# 读取变量的传输大小对应的元素字节数
+_TRANSPORT_SIZES = {0x01: 1, 0x02: 1, 0x03: 1, 0x04: 2, 0x05: 2, 0x06: 4, 0x07: 4, 0x08: 4}
+_AREAS = {0x03, 0x1C, 0x1D, 0x1E, 0x1F, 0x80, 0x81, 0x82, 0x83, 0x84, 0x85}
+_KNOWN_SZL_IDS = {0x0000, 0x0011, 0x001C, 0x0131, 0x0232, 0x0424}
+
+# S7 首部错误（错误类别, 错误码）
+NO_ERROR = (0x00, 0x00)
+ERROR_CONTEXT_NOT_SUPPORTED = (0x81, 0x04)
+ERROR_PDU_SIZE = (0x85, 0x00)
+
+# 上传/下载功能码，生成器中的下载使用 0xFA~0xFC
+_TRANSFER_FUNCTIONS = {0x1A, 0x1B, 0x1C, 0x1D, 0x1E, 0x1F, 0xFA, 0xFB, 0xFC}
+_UPLOAD_BLOCK = bytes(range(64))
+
+
+@dataclass
+class EmulatorConfig:
+    """
+    模拟器配置。
+
+    :param latency: 每个应答前的固定延迟（秒）。
+    :param jitter: 在固定延迟上叠加的 [0, jitter) 随机延迟（秒）。
+    :param error_rate: 对 Job 请求返回 injected_error 的概率。
+    :param injected_error: 注入的 S7 首部错误（错误类别, 错误码）。
+    :param crash_after: 收到第 crash_after 个 S7 请求时崩溃，该请求不再应答；只崩溃一次，恢复后继续正常应答。
+        None 表示不按次数崩溃。
+    :param crash_on: 收到的 S7 数据满足该条件时崩溃，用于模拟被某个特定用例打崩。
+    :param crash_mode: close 断开所有连接并拒绝新连接；hang 保持连接但不再应答。
+    :param crash_duration: 崩溃持续的秒数，None 表示直到调用 recover()。
+    :param pdu_length: 建立通信时协商的最大 PDU 长度。
+    :param max_amq: 建立通信时协商的最大并行任务数（Max AmQ），同一连接上最多同时处理这么多个请求。
+    :param require_setup: 是否要求先建立通信再发送其它 Job 请求。
+    :param scapy_decode: 是否使用 scapy 的 TPKT/COTP 层解析 DT 数据包，默认按固定偏移解析以免模拟器成为瓶颈。
+    :param seed: 随机数种子，用于复现注入的错误与延迟。
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    injected_error: tuple[int, int] = (0x84, 0x04)
+    crash_after: int | None = None
+    crash_on: Callable[[bytes], bool] | None = None
+    crash_mode: str = "close"
+    crash_duration: float | None = None
+    pdu_length: int = 480
+    max_amq: int = 1
+    require_setup: bool = False
+    scapy_decode: bool = False
+    seed: int | None = None
+
+
+@dataclass
+class ConnectionState:
+    """
+    一个 TCP 连接上的 COTP/S7 状态。
+    """
+    cotp_connected: bool = False
+    setup_done: bool = False
+    pdu_length: int = 240
+    amq: int = 1
+
+
+@dataclass
+class EmulatorStats:
+    connections: int = 0
+    frames: int = 0
+    requests: int = 0
+    errors_injected: int = 0
+    crashes: int = 0
+    functions: dict = field(default_factory=dict)
+
+
+class S7PLCEmulator:
+    """
+    S7 PLC 模拟器，在 asyncio 事件循环中运行。
+    """
+
+    def __init__(self, config: EmulatorConfig | None = None):
+        self.config = config or EmulatorConfig()
+        if self.config.crash_mode not in ("close", "hang"):
+            raise ValueError(f"不支持的崩溃模式 {self.config.crash_mode}")
+        self.stats = EmulatorStats()
+        self.crashed = False
+        self._random = random.Random(self.config.seed)
+        self._server: asyncio.AbstractServer | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """
+        开始监听。
+
+        :param port: 监听端口，0 表示由系统分配。
+        :return: 实际监听的端口。
+        """
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self.port
+
+    async def stop(self):
+        for writer in list(self._writers):
+            writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def crash(self):
+        """
+        模拟 PLC 崩溃。
+        """
+        if self.crashed:
+            return
+        self.crashed = True
+        self.stats.crashes += 1
+        if self.config.crash_mode == "close":
+            for writer in list(self._writers):
+                writer.close()
+        if self.config.crash_duration is not None and self._loop is not None:
+            self._loop.call_later(self.config.crash_duration, self.recover)
+
+    def recover(self):
+        """
+        从崩溃中恢复，重新接受连接并应答。
+        """
+        self.crashed = False
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self.crashed and self.config.crash_mode == "close":
+            writer.close()
+            return
+        self.stats.connections += 1
+        self._writers.add(writer)
+        state = ConnectionState()
+        # 协商的 AmQ 大于 1 时并行处理的请求
+        jobs = set()
+        try:
+            while True:
+                header = await reader.readexactly(_TPKT_HEADER.size)
+                length = _TPKT_HEADER.unpack(header)[2]
+                body = await reader.readexactly(max(0, length - _TPKT_HEADER.size))
+                self.stats.frames += 1
+                if self.crashed:
+                    if self.config.crash_mode == "close":
+                        break
+                    continue
+                reply = self.handle_frame(header + body, state)
+                if reply is None:
+                    break
+                delay = self.config.latency
+                if self.config.jitter:
+                    delay += self._random.uniform(0, self.config.jitter)
+                if state.amq > 1:
+                    if len(jobs) >= state.amq:
+                        _, jobs = await asyncio.wait(jobs, return_when=asyncio.FIRST_COMPLETED)
+                    jobs.add(asyncio.ensure_future(self._reply(writer, reply, delay)))
+                elif not await self._reply(writer, reply, delay):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for job in jobs:
+                job.cancel()
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _reply(self, writer: asyncio.StreamWriter, reply: bytes, delay: float) -> bool:
+        """
+        延迟 delay 秒后发送应答。
+
+        :return: 处理期间模拟器崩溃并断开连接时返回 False。
+        """
+        if delay:
+            await asyncio.sleep(delay)
+        if self.crashed:
+            # 处理当前请求时崩溃，不再应答
+            if self.config.crash_mode == "close":
+                writer.close()
+                return False
+            return True
+        try:
+            writer.write(reply)
+            await writer.drain()
+        except ConnectionError:
+            return False
+        return True
+
+    def handle_frame(self, frame: bytes, state: ConnectionState | None = None) -> bytes | None:
+        """
+        处理一个完整的 TPKT 帧并返回应答帧。
+
+        :param frame: 包含 TPKT、COTP 首部的完整数据帧。
+        :param state: 所属连接的状态，默认为一个新连接。
+        :return: 应答帧，None 表示 PLC 会断开连接。
+        """
+        if state is None:
+            state = ConnectionState()
+        if len(frame) < 7 or frame[0] != 3:
+            return None
+        # COTP 连接请求使用 scapy 的协议层解析
+        if frame[5] == 0xE0:
+            packet = TPKT(frame)
+            if COTP not in packet or packet[COTP].pdu_type != 0xE0:
+                return None
+            state.cotp_connected = True
+            return self._connect_confirm(frame)
+        if frame[5] != 0xF0 or not state.cotp_connected:
+            return None
+        if self.config.scapy_decode:
+            s7 = bytes(TPKT(frame)[COTPFunction].payload)
+        else:
+            s7 = frame[7:]
+        reply = self.handle_s7(s7, state)
+        if reply is None:
+            return None
+        return S7CommunicationSocketConnection.frame(reply, "DT Data")
+
+    @staticmethod
+    def _connect_confirm(frame: bytes) -> bytes:
+        # CC：目的引用为请求的源引用，参数原样返回
+        source_reference = frame[8:10]
+        parameters = frame[11:]
+        cotp = bytes([6 + len(parameters), 0xD0]) + source_reference + b"\x00\x01\x00" + parameters
+        return _TPKT_HEADER.pack(3, 0, _TPKT_HEADER.size + len(cotp)) + cotp
+
+    def handle_s7(self, s7: bytes, state: ConnectionState) -> bytes | None:
+        """
+        处理一个 S7 PDU 并返回应答 PDU。
+
+        :return: 应答 PDU，None 表示 PLC 会断开连接。
+        """
+        if len(s7) < _JOB_HEADER.size or s7[0] != 0x32:
+            return None
+        self.stats.requests += 1
+        _, rosctr, _, pdu_reference, parameter_length, data_length = _JOB_HEADER.unpack_from(s7)
+        parameter = s7[_JOB_HEADER.size:_JOB_HEADER.size + parameter_length]
+        data = s7[_JOB_HEADER.size + parameter_length:]
+        function = parameter[0] if parameter else None
+        self.stats.functions[function] = self.stats.functions.get(function, 0) + 1
+
+        if self.config.crash_on is not None and self.config.crash_on(s7):
+            self.crash()
+        if self.config.crash_after is not None and self.stats.requests == self.config.crash_after:
+            self.crash()
+
+        if rosctr == 0x07:
+            return self._userdata(pdu_reference, parameter, data)
+        if rosctr != 0x01:
+            return None
+        if _JOB_HEADER.size + parameter_length + data_length != len(s7) or not parameter:
+            return _ack(pdu_reference, error=ERROR_PDU_SIZE, rosctr=0x02)
+        if self.config.error_rate and self._random.random() < self.config.error_rate:
+            self.stats.errors_injected += 1
+            return _ack(pdu_reference, error=self.config.injected_error, rosctr=0x02)
+
+        if function == 0xF0:
+            return self._setup_communication(pdu_reference, parameter, state)
+        if self.config.require_setup and not state.setup_done:
+            return _ack(pdu_reference, error=ERROR_CONTEXT_NOT_SUPPORTED, rosctr=0x02)
+        if function == 0x04:
+            return self._read_var(pdu_reference, parameter, state)
+        if function in (0x28, 0x29):
+            return _ack(pdu_reference, bytes([function]))
+        if function in _TRANSFER_FUNCTIONS:
+            return self._transfer(pdu_reference, function, parameter)
+        return _ack(pdu_reference, error=ERROR_CONTEXT_NOT_SUPPORTED, rosctr=0x02)
+
+    def _setup_communication(self, pdu_reference: bytes, parameter: bytes, state: ConnectionState) -> bytes:
+        if len(parameter) < 8:
+            return _ack(pdu_reference, error=ERROR_PDU_SIZE, rosctr=0x02)
+        calling, called, requested = struct.unpack_from("!HHH", parameter, 2)
+        state.pdu_length = max(1, min(requested, self.config.pdu_length))
+        state.amq = max(1, min(calling, called, self.config.max_amq))
+        state.setup_done = True
+        return _ack(pdu_reference, struct.pack("!BBHHH", 0xF0, 0x00, state.amq, state.amq, state.pdu_length))
+
+    def _read_var(self, pdu_reference: bytes, parameter: bytes, state: ConnectionState) -> bytes:
+        count = parameter[1] if len(parameter) > 1 else 0
+        if count == 0 or len(parameter) < 2 + count * _READ_ITEM.size:
+            return _ack(pdu_reference, error=(0x85, 0x00), rosctr=0x02)
+        items = []
+        for i in range(count):
+            spec, following, syntax_id, transport, length, db_number, area, _ = _READ_ITEM.unpack_from(
+                parameter, 2 + i * _READ_ITEM.size
+            )
+            if spec != 0x12 or following != 0x0A or syntax_id != 0x10:
+                items.append(b"\x05\x00\x00\x00")
+            elif transport not in _TRANSPORT_SIZES:
+                items.append(b"\x06\x00\x00\x00")
+            elif area not in _AREAS or (area == 0x84 and db_number == 0):
+                items.append(b"\x0a\x00\x00\x00")
+            elif transport == 0x01:
+                items.append(struct.pack("!BBH", 0xFF, 0x03, 1) + b"\x00")
+            else:
+                size = _TRANSPORT_SIZES[transport] * length
+                items.append(struct.pack("!BBH", 0xFF, 0x04, size * 8) + bytes(size))
+        # 除最后一项外，奇数长度的数据需要填充一个字节
+        data = b"".join(item + b"\x00" * (len(item) % 2 if i < count - 1 else 0) for i, item in enumerate(items))
+        if _ACK_HEADER.size + 2 + len(data) > state.pdu_length:
+            return _ack(pdu_reference, error=ERROR_PDU_SIZE, rosctr=0x02)
+        return _ack(pdu_reference, bytes([0x04, count]), data)
+
+    @staticmethod
+    def _transfer(pdu_reference: bytes, function: int, parameter: bytes) -> bytes:
+        if function == 0x1D:
+            # 开始上传：返回上传 id 以及 ascii 表示的块长度
+            length = str(len(_UPLOAD_BLOCK)).zfill(7).encode()
+            return _ack(pdu_reference, bytes.fromhex("1d0001000000000000000107") + length)
+        if function == 0x1E:
+            data = struct.pack("!HH", len(_UPLOAD_BLOCK), 0x00FB) + _UPLOAD_BLOCK
+            return _ack(pdu_reference, b"\x1e\x00", data)
+        return _ack(pdu_reference, bytes([function]))
+
+    @staticmethod
+    def _userdata(pdu_reference: bytes, parameter: bytes, data: bytes) -> bytes | None:
+        # 仅支持读取 SZL：参数头 00 01 12、方法 0x11（请求）、功能组 4、子功能 1
+        if len(parameter) < 8 or parameter[:3] != b"\x00\x01\x12" or parameter[4] != 0x11:
+            return None
+        sequence = parameter[7]
+        if parameter[5] & 0x0F != 0x04 or parameter[6] != 0x01 or len(data) < 8:
+            reply_parameter = bytes([0x00, 0x01, 0x12, 0x08, 0x12, 0x84, parameter[6], sequence, 0, 0, 0xD6, 0x02])
+            reply_data = b"\x0a\x00\x00\x00"
+        else:
+            szl_id, index = struct.unpack_from("!HH", data, 4)
+            reply_parameter = bytes([0x00, 0x01, 0x12, 0x08, 0x12, 0x84, 0x01, sequence, 0, 0, 0, 0])
+            if szl_id in _KNOWN_SZL_IDS:
+                szl = struct.pack("!HHHH", szl_id, index, 0, 0)
+                reply_data = struct.pack("!BBH", 0xFF, 0x09, len(szl)) + szl
+            else:
+                reply_data = b"\x0a\x00\x00\x00"
+        return _JOB_HEADER.pack(0x32, 0x07, 0, pdu_reference, len(reply_parameter), len(reply_data)) \
+            + reply_parameter + reply_data
+
+
+def _ack(pdu_reference: bytes, parameter: bytes = b"", data: bytes = b"", error=NO_ERROR, rosctr=0x03) -> bytes:
+    """
+    构造 Ack(0x02)/Ack_Data(0x03) PDU。
+    """
+    return _ACK_HEADER.pack(0x32, rosctr, 0, pdu_reference, len(parameter), len(data), *error) + parameter + data
+
+
+class EmulatorThread:
+    """
+    在后台线程中运行模拟器，便于在同步代码（测试、基准）中使用::
+
+        with EmulatorThread(EmulatorConfig(latency=0.001)) as emulator:
+            session = S7CommunicationSession("127.0.0.1", emulator.port)
+    """
+
+    def __init__(self, config: EmulatorConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.emulator = S7PLCEmulator(config)
+        self.host = host
+        self.port = port
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self) -> "EmulatorThread":
+        self._thread.start()
+        future = asyncio.run_coroutine_threadsafe(self.emulator.start(self.host, self.port), self._loop)
+        self.port = future.result()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.emulator.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def call(self, function: Callable, *args):
+        """
+        在模拟器所在的事件循环中调用 function，例如 emulator.call(emulator.emulator.recover)。
+        """
+        self._loop.call_soon_threadsafe(function, *args)
+
+    @property
+    def stats(self) -> EmulatorStats:
+        return self.emulator.stats
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 S7 PLC 模拟器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=102)
+    parser.add_argument("--latency", type=float, default=0.0, help="应答延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机附加延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入错误应答的概率")
+    parser.add_argument("--crash-after", type=int, default=None, help="收到第 N 个请求时崩溃（只崩溃一次）")
+    parser.add_argument("--crash-mode", choices=("close", "hang"), default="close")
+    parser.add_argument("--crash-duration", type=float, default=None, help="崩溃持续的秒数")
+    parser.add_argument("--require-setup", action="store_true", help="要求先建立通信")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    config = EmulatorConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        crash_after=args.crash_after,
+        crash_mode=args.crash_mode,
+        crash_duration=args.crash_duration,
+        require_setup=args.require_setup,
+        seed=args.seed,
+    )
+
+    async def serve():
+        emulator = S7PLCEmulator(config)
+        port = await emulator.start(args.host, args.port)
+        print(f"S7 PLC 模拟器监听于 {args.host}:{port}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+前置/后置数据包帧缓存。
+
+CR TPDU、建立通信、请求下载、结束下载等数据包在一次模糊测试会话中不会变化，
+缓存其完整的 TPKT/COTP/S7 帧后可以直接发送，避免每个测试用例都重新构建、渲染 Request。
+"""
+from .s7_gen import S7CommunicationGenerator
+from .s7_communication_socket_connection import S7CommunicationSocketConnection
+
+# 对某个功能进行模糊测试时，在变异数据包之前需要发送的数据包
+PROLOGUE_FUNCTIONS = {
+    "download": ("setup_communication", "request_download"),
+    "upload": ("setup_communication", "request_upload"),
+}
+# 对某个功能进行模糊测试时，在变异数据包之后需要发送的数据包
+EPILOGUE_FUNCTIONS = {
+    "download": ("end_download",),
+    "upload": ("end_upload",),
+}
+
+
+class S7FrameCache:
+    """
+    以功能名称和生成器参数为键缓存完整数据帧，并统计命中/未命中次数。
+    """
+
+    def __init__(self):
+        self._frames: dict[tuple, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, function: str, fuzzable_list: list[bool] | None = None) -> bytes:
+        """
+        获取 S7CommunicationGenerator 中名为 function 的数据包封装后的 DT 帧。
+
+        :param function: 功能名称，例如 setup_communication、request_download。
+        :param fuzzable_list: 传给生成器的变异规则列表，默认为 None。
+        :return: 完整的 TPKT/COTP/S7 数据帧。
+        """
+        key = (function, None if fuzzable_list is None else tuple(fuzzable_list))
+        frame = self._frames.get(key)
+        if frame is None:
+            self.misses += 1
+            data = getattr(S7CommunicationGenerator, function)(fuzzable_list).render()
+            frame = S7CommunicationSocketConnection.frame(data, "DT Data")
+            self._frames[key] = frame
+        else:
+            self.hits += 1
+        return frame
+
+    def connect_request(self) -> bytes:
+        """
+        获取 COTP CR TPDU 帧。
+        """
+        key = ("connect_request", None)
+        frame = self._frames.get(key)
+        if frame is None:
+            self.misses += 1
+            frame = S7CommunicationSocketConnection.frame(b"", "CR Connect Request")
+            self._frames[key] = frame
+        else:
+            self.hits += 1
+        return frame
+
+    def prologue(self, function: str, exclude: tuple[str, ...] = ()) -> list[bytes]:
+        """
+        对 function 进行模糊测试时，CR TPDU 之后、变异数据包之前需要发送的数据帧。
+
+        :param exclude: 不需要发送的前置数据包名称，例如持久通道中已经发送过的建立通信。
+        """
+        return [self.get(name) for name in PROLOGUE_FUNCTIONS.get(function, ()) if name not in exclude]
+
+    def epilogue(self, function: str) -> list[bytes]:
+        """
+        对 function 进行模糊测试时，变异数据包之后需要发送的数据帧。
+        """
+        return [self.get(name) for name in EPILOGUE_FUNCTIONS.get(function, ())]
+
+    def stats(self) -> dict:
+        """
+        缓存统计信息。
+        """
+        return {"hits": self.hits, "misses": self.misses, "frames": len(self._frames)}
+
+    def clear(self):
+        self._frames.clear()
+        self.hits = 0
+        self.misses = 0
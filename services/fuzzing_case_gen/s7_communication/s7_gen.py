@@ -7,6 +7,39 @@ from boofuzz.blocks import Block, Request, Size
 
 # from boofuzz.protocol_session_reference import ProtocolSessionReference
 
+# 各功能允许用户控制的变异字段个数，与 S7CommunicationSession.start_fuzz 中要求输入的列表长度一致
+FUZZABLE_FIELD_COUNTS = {
+    "setup_communication": 3,
+    "read_var": 8,
+    "read_szl": 2,
+    "run_plc": 1,
+    "stop_plc": 1,
+    "upload": 4,
+    "download": 5,
+}
+# read_var 默认读取的 item：variable_specification、length_of_following_address_specification、syntax_id、
+# transport_size、length、db_number、area、address
+READ_VAR_ITEM = (0x12, 0x0A, 0x10, 0x02, 0x0010, 0x0000, 0x03, 0x000000)
+# item_count 为 1 个字节
+MAX_READ_VAR_ITEMS = 255
+
+
+def read_var_fuzzable_lists(
+        items: list[tuple[int, ...]], fuzzable_lists: list[list[bool]] | None = None
+) -> list[list[bool]]:
+    """
+    检查多 item 读取变量请求的参数，并补全默认的变异规则（每个 item 只变异 address）。
+
+    :raises ValueError: item 个数为 0 或超过 MAX_READ_VAR_ITEMS，或变异规则与 item 个数不一致。
+    """
+    if not 1 <= len(items) <= MAX_READ_VAR_ITEMS:
+        raise ValueError(f"item 个数 {len(items)} 超出范围 [1, {MAX_READ_VAR_ITEMS}]")
+    if fuzzable_lists is None:
+        return [[False] * 7 + [True] for _ in items]
+    if len(fuzzable_lists) != len(items) or any(len(flags) != 8 for flags in fuzzable_lists):
+        raise ValueError("变异规则的个数必须与 item 个数一致，且每个 item 的变异规则长度为 8")
+    return [list(flags) for flags in fuzzable_lists]
+
 
 class S7CommunicationGenerator:
     """
@@ -82,6 +115,7 @@ class S7CommunicationGenerator:
             area: int,
             address: int,
             fuzzable_list: list[bool] | None = None,
+            name: str | None = None,
     ) -> Block:
         """
         item 传入各项参数定义 item
@@ -104,11 +138,13 @@ class S7CommunicationGenerator:
         :type address: int
         :param fuzzable_list: _description_, defaults to None
         :type fuzzable_list: list[bool] | None, optional
+        :param name: item 的名称，一个 Request 中有多个 item 时需要指定不同的名称，defaults to None
+        :type name: str | None, optional
         :return: _description_
         :rtype: Block
         """
         item = Block(
-            # "item",
+            name,
             children=(
                 Byte(
                     "variable_specification",
@@ -243,6 +279,38 @@ class S7CommunicationGenerator:
         )
         return Request("read_var", children=(header, parameter))
 
+    @staticmethod
+    def read_var_items(
+            items: list[tuple[int, ...]], fuzzable_lists: list[list[bool]] | None = None
+    ) -> Request:
+        """
+        read_var_items 一次读取多个 item 的读取变量请求，item_count 与 item 的个数一致。
+
+        item 较多时整棵 Request 树会很大，只需要遍历测试用例时应使用 s7_read_var.ReadVarCases。
+
+        :param items: 每个 item 的参数，顺序与 define_item 一致，例如 READ_VAR_ITEM。
+        :type items: list[tuple[int, ...]]
+        :param fuzzable_lists: 每个 item 的变异规则列表，defaults to None，即每个 item 只变异 address
+        :type fuzzable_lists: list[list[bool]] | None, optional
+        :raises ValueError: item 个数为 0 或超过 MAX_READ_VAR_ITEMS，或变异规则与 item 个数不一致。
+        :return: _description_
+        :rtype: Request
+        """
+        fuzzable_lists = read_var_fuzzable_lists(items, fuzzable_lists)
+        header = S7CommunicationGenerator.define_header("parameter")
+        parameter = Block(
+            "parameter",
+            children=(
+                Byte("function", 0x04, fuzzable=False),
+                Byte("item_count", len(items), fuzzable=False),
+                *(
+                    S7CommunicationGenerator.define_item(*item, fuzzable_list, name=f"item{i}")
+                    for i, (item, fuzzable_list) in enumerate(zip(items, fuzzable_lists))
+                ),
+            ),
+        )
+        return Request("read_var", children=(header, parameter))
+
     @staticmethod
     def read_szl(fuzzable_list: list[bool] | None = None):
         """
@@ -0,0 +1,251 @@
+"""
+目标存活探测。
+
+判断一个可疑用例之后 PLC 是否存活，原本需要重新建立 TCP 连接、发送 CR 以及建立通信。
+LivenessProber 在后台线程的 asyncio 事件循环中，通过一条独立的连接与模糊测试并发地探测目标：
+连接断开时依次尝试 TCP 连接、COTP CR 与建立通信，连接可用时每隔 interval 秒发送一次缓存的
+读取 SZL 请求作为 ping。每次探测的各阶段时延都记录在有界的时间序列中，可以在目标彻底宕机之前
+观察到时延的上升。
+
+连续失败 failures 次判定目标宕机，ping 时延超过基线的 degraded_factor 倍再加 degraded_delta 秒判定目标性能下降；
+关联会话后，目标宕机时暂停会话（boofuzz 的 is_paused），恢复后继续。
+"""
+import asyncio
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Callable
+
+from boofuzz.sessions import Session
+from .s7_frame_cache import S7FrameCache
+from .s7_response import classify
+
+ALIVE = "alive"
+DEGRADED = "degraded"
+DEAD = "dead"
+UNKNOWN = "unknown"
+# TPKT 首部长度
+_TPKT_HEADER_LENGTH = 4
+
+
+@dataclass
+class ProbeSample:
+    """
+    一次探测的结果。
+
+    :param timestamp: 探测开始的时间（time.time()）。
+    :param ok: 是否收到正常的 SZL 应答。
+    :param stage: 完成或失败的阶段：tcp、cotp、setup 或 szl。
+    :param latency: ping 的往返时延（秒），失败时为 None。
+    :param connect: 本次重新建立连接（TCP + CR + 建立通信）的耗时（秒），复用连接时为 None。
+    :param error: 失败原因。
+    """
+    timestamp: float
+    ok: bool
+    stage: str
+    latency: float | None = None
+    connect: float | None = None
+    error: str | None = None
+
+
+class LivenessProber:
+    """
+    在独立连接上并发探测目标是否存活。
+
+    :param host: 目标 ip。
+    :param port: 目标端口。
+    :param interval: 两次探测之间的间隔（秒）。
+    :param timeout: 每个阶段等待应答的超时（秒）。
+    :param failures: 连续失败多少次判定目标宕机。
+    :param degraded_factor: ping 时延超过基线（最近正常时延的中位数）的倍数时判定性能下降。
+    :param degraded_delta: 判定性能下降时在基线倍数之上另加的绝对余量（秒），基线只有几十微秒时
+        调度抖动也会超过基线的倍数，需要这一下限避免误判。
+    :param history: 时间序列最多保留的探测次数。
+    :param on_change: 状态变化时的回调，参数为 (旧状态, 新状态, ProbeSample)，在探测线程中调用。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        interval: float = 0.1,
+        timeout: float = 0.5,
+        failures: int = 2,
+        degraded_factor: float = 5.0,
+        degraded_delta: float = 0.01,
+        history: int = 4096,
+        on_change: Callable[[str, str, ProbeSample], None] | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        self.failures = failures
+        self.degraded_factor = degraded_factor
+        self.degraded_delta = degraded_delta
+        self.on_change = on_change
+        self.state = UNKNOWN
+        self.samples: deque[ProbeSample] = deque(maxlen=history)
+        self.probes = 0
+        self.consecutive_failures = 0
+        self.transitions = 0
+        self.session: Session | None = None
+        self._paused_session = False
+        # 用于计算基线的最近正常时延
+        self._baseline: deque[float] = deque(maxlen=64)
+        frame_cache = S7FrameCache()
+        self._connect_request = frame_cache.connect_request()
+        self._setup = frame_cache.get("setup_communication")
+        self._ping = frame_cache.get("read_szl")
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._alive = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> "LivenessProber":
+        self._thread.start()
+        self._task = asyncio.run_coroutine_threadsafe(self._run(), self._loop)
+        return self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._resume_session()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def attach(self, session: Session):
+        """
+        关联模糊测试会话：目标宕机时暂停会话，恢复后继续。只恢复由探测器暂停的会话。
+        """
+        self.session = session
+
+    @property
+    def alive(self) -> bool:
+        return self.state in (ALIVE, DEGRADED)
+
+    def wait_alive(self, timeout: float | None = None) -> bool:
+        """
+        等待目标存活，最多等待 timeout 秒。
+        """
+        return self._alive.wait(timeout)
+
+    async def _read_frame(self) -> bytes:
+        header = await self._reader.readexactly(_TPKT_HEADER_LENGTH)
+        length = int.from_bytes(header[2:4], "big")
+        return header + await self._reader.readexactly(max(0, length - _TPKT_HEADER_LENGTH))
+
+    async def _exchange(self, frame: bytes) -> bytes:
+        self._writer.write(frame)
+        await self._writer.drain()
+        return await asyncio.wait_for(self._read_frame(), self.timeout)
+
+    async def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def probe(self) -> ProbeSample:
+        """
+        探测一次：连接不可用时重新建立连接，然后发送 ping。
+        """
+        sample = ProbeSample(time.time(), False, "tcp")
+        started = time.perf_counter()
+        try:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+                sample.stage = "cotp"
+                if classify(await self._exchange(self._connect_request)).kind != "cc":
+                    raise ConnectionError("COTP 连接被拒绝")
+                # S7 要求在其它请求之前建立通信，只在建立连接时发送一次
+                sample.stage = "setup"
+                if not classify(await self._exchange(self._setup)).ok:
+                    raise ConnectionError("建立通信失败")
+                sample.connect = time.perf_counter() - started
+            sample.stage = "szl"
+            sent = time.perf_counter()
+            response = classify(await self._exchange(self._ping))
+            if response.kind == "invalid":
+                raise ConnectionError("无效的 SZL 应答")
+            sample.latency = time.perf_counter() - sent
+            sample.ok = True
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            sample.error = type(e).__name__ if not str(e) else str(e)
+            await self._close()
+        return sample
+
+    def _record(self, sample: ProbeSample):
+        self.samples.append(sample)
+        self.probes += 1
+        if sample.ok:
+            self.consecutive_failures = 0
+            baseline = statistics.median(self._baseline) if self._baseline else None
+            if baseline is not None and sample.latency > baseline * self.degraded_factor + self.degraded_delta:
+                state = DEGRADED
+            else:
+                state = ALIVE
+                self._baseline.append(sample.latency)
+        else:
+            self.consecutive_failures += 1
+            state = DEAD if self.consecutive_failures >= self.failures else DEGRADED
+        if state != self.state:
+            previous, self.state = self.state, state
+            self.transitions += 1
+            self._on_state(previous, state, sample)
+
+    def _on_state(self, previous: str, state: str, sample: ProbeSample):
+        if state == DEAD:
+            self._alive.clear()
+            if self.session is not None and not self.session.is_paused:
+                self.session.is_paused = True
+                self._paused_session = True
+        elif state in (ALIVE, DEGRADED):
+            self._alive.set()
+            self._resume_session()
+        if self.on_change is not None:
+            self.on_change(previous, state, sample)
+
+    def _resume_session(self):
+        if self._paused_session and self.session is not None:
+            self.session.is_paused = False
+        self._paused_session = False
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            self._record(await self.probe())
+            await asyncio.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def series(self) -> list[dict]:
+        """
+        探测时间序列，按时间顺序排列。
+        """
+        return [asdict(sample) for sample in list(self.samples)]
+
+    def stats(self) -> dict:
+        """
+        探测统计：当前状态、探测次数、连续失败次数、状态变化次数以及最近正常 ping 时延的中位数与最大值。
+        """
+        latencies = [sample.latency for sample in list(self.samples) if sample.ok]
+        return {
+            "state": self.state,
+            "probes": self.probes,
+            "consecutive_failures": self.consecutive_failures,
+            "transitions": self.transitions,
+            "latency_p50": statistics.median(latencies) if latencies else None,
+            "latency_max": max(latencies) if latencies else None,
+        }
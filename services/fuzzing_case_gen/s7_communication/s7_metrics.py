@@ -0,0 +1,100 @@
+"""
+正在运行的模糊测试会话的指标登记表。
+
+会话在创建时以 run_id 登记自己（弱引用，会话被回收后自动移除），模糊测试结束时注销。
+模糊测试线程只累加会话上的普通计数器，不加锁；指标接口在抓取时调用 snapshot 读取这些计数器。读取与写入并发时个别值可能相差一个测试用例，
+对监控而言可以接受。同一个 run_id 可以登记多个会话（工作线程），按登记顺序编号。
+"""
+import threading
+import time
+import weakref
+
+from boofuzz.sessions import Session
+
+_SESSIONS: dict[str, list[weakref.ref]] = {}
+_LOCK = threading.Lock()
+# 往返时延的分位数
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def register_session(run_id: str, session: Session):
+    """
+    在 run_id 下登记一个会话，已经登记的会话不重复登记。
+    """
+    with _LOCK:
+        refs = [ref for ref in _SESSIONS.get(run_id, []) if ref() is not None]
+        if not any(ref() is session for ref in refs):
+            refs.append(weakref.ref(session))
+        _SESSIONS[run_id] = refs
+
+
+def unregister_session(run_id: str, session: Session | None = None):
+    """
+    移除 run_id 下的一个会话，session 为 None 时移除该 run_id 下的所有会话。
+    """
+    with _LOCK:
+        refs = []
+        if session is not None:
+            refs = [ref for ref in _SESSIONS.get(run_id, []) if ref() is not None and ref() is not session]
+        if refs:
+            _SESSIONS[run_id] = refs
+        else:
+            _SESSIONS.pop(run_id, None)
+
+
+def sessions() -> dict[str, list[Session]]:
+    """
+    仍然存活的会话，按 run_id 分组。
+    """
+    with _LOCK:
+        items = list(_SESSIONS.items())
+    result = {}
+    for run_id, refs in items:
+        alive = [session for session in (ref() for ref in refs) if session is not None]
+        if alive:
+            result[run_id] = alive
+    return result
+
+
+def _rtt_quantiles(session) -> dict[float, float] | None:
+    # 优先使用自适应超时的时延样本，其次是分阶段计时中等待应答的耗时
+    try:
+        if getattr(session, "rtt", None) is not None and session.rtt.samples:
+            return {q: session.rtt.quantile(q * 100) for q in QUANTILES}
+        phases = getattr(session, "phases", None)
+        if phases is not None:
+            histograms = [h for (_, _, phase), h in phases.histograms().items() if phase == "recv" and h.count]
+            if histograms:
+                merged = type(histograms[0])(histograms[0].significant_bits)
+                for histogram in histograms:
+                    merged.merge(histogram)
+                return {q: merged.percentile(q * 100) / 1e9 for q in QUANTILES}
+    except (IndexError, RuntimeError):
+        # 读取时模糊测试线程恰好在修改样本窗口，本次抓取跳过时延
+        pass
+    return None
+
+
+def snapshot(session) -> dict:
+    """
+    读取一个会话的当前指标。
+
+    :return: cases、timeouts、reconnects、novel_responses、responses（各类应答帧数）、rtt（分位数 -> 秒，
+        没有时延数据时为 None）、busy（执行测试用例的秒数）、elapsed（第一个测试用例开始至今的秒数）、
+        utilization（busy / elapsed）以及 paused。
+    """
+    started = getattr(session, "fuzz_started", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    busy = getattr(session, "busy_time", 0.0)
+    return {
+        "cases": getattr(session, "cases_fuzzed", 0),
+        "timeouts": getattr(session, "timeouts", 0),
+        "reconnects": getattr(session, "reconnects", 0),
+        "novel_responses": getattr(session, "novel_signatures", 0),
+        "responses": dict(getattr(session, "response_counts", {})),
+        "rtt": _rtt_quantiles(session),
+        "busy": busy,
+        "elapsed": elapsed,
+        "utilization": min(1.0, busy / elapsed) if elapsed > 0 else 0.0,
+        "paused": bool(session.is_paused),
+    }
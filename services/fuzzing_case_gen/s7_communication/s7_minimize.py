@@ -0,0 +1,249 @@
+"""
+崩溃用例最小化。
+
+一个使 PLC 崩溃的用例往往同时变异了多个字段（组合变异），或者带有长达 100 字节的数据，
+手工找出真正触发崩溃的部分非常耗时。S7Minimizer 在编译后的模板上执行 ddmin：先在被变异的字段中
+找出 1-最小的字段子集（其余字段恢复默认值），再对每个保留的字段逐字节化简：变长字段（未指定 size 的 Bytes）
+删除字节，定长字段把字节恢复为默认值。候选用例通过 S7RequestTemplate.render_fields 渲染，
+TPKT/COTP 以及 S7 首部、参数中的长度字段与 boofuzz 的 Size 语义一致。
+
+每个候选用例都交给 oracle 判断是否仍然使目标崩溃，结果按渲染后的数据缓存，同一个候选用例不会被测试两次。
+
+用法：python -m services.fuzzing_case_gen.s7_communication.s7_minimize 192.168.101.172 102 download --fuzzable 00001 --case 42
+"""
+import argparse
+import sys
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+from boofuzz.primitives import Bytes
+from .s7_gen import FUZZABLE_FIELD_COUNTS
+from .s7_replay import ReplayCase, S7Replayer
+from .s7_template import S7RequestTemplate, compile_function
+
+
+def ddmin(items: Sequence, test: Callable[[list], bool]) -> list:
+    """
+    Zeller 的 ddmin 算法：返回使 test 为真的 1-最小子序列，即去掉其中任意一个元素后 test 都为假。
+
+    :param items: 初始序列，test(items) 应为真。
+    :param test: 判断子序列是否仍然触发故障。
+    """
+    items = list(items)
+    n = 2
+    while len(items) >= 2:
+        size = len(items) // n
+        chunks = [items[i * size:(i + 1) * size] if i < n - 1 else items[i * size:] for i in range(n)]
+        reduced = False
+        for chunk in chunks:
+            if test(chunk):
+                items, n, reduced = chunk, 2, True
+                break
+        if not reduced:
+            for i in range(n):
+                complement = [item for j, chunk in enumerate(chunks) if j != i for item in chunk]
+                if test(complement):
+                    items, n, reduced = complement, max(n - 1, 2), True
+                    break
+        if not reduced:
+            if n >= len(items):
+                break
+            n = min(len(items), n * 2)
+    if len(items) == 1 and test([]):
+        return []
+    return items
+
+
+@dataclass
+class MinimizeResult:
+    """
+    最小化结果。
+
+    :param values: 保留的字段下标 -> 字段值。
+    :param data: 最小化后的 S7 数据。
+    :param fields: 保留字段的 qualified name。
+    :param tests: 实际交给 oracle 的候选用例数。
+    :param cache_hits: 命中缓存而没有重复测试的候选用例数。
+    """
+    values: dict[int, bytes]
+    data: bytes
+    fields: list[str]
+    tests: int
+    cache_hits: int
+
+
+class S7Minimizer:
+    """
+    在编译后的模板上最小化崩溃用例。
+
+    :param template: 崩溃用例所属 Request 的模板。
+    :param oracle: 判断一个 S7 数据是否仍然使目标崩溃。
+    """
+
+    def __init__(self, template: S7RequestTemplate, oracle: Callable[[bytes], bool]):
+        self.template = template
+        self.oracle = oracle
+        self.cache: dict[bytes, bool] = {}
+        self.tests = 0
+        self.cache_hits = 0
+
+    @classmethod
+    def from_function(
+        cls, function: str, fuzzable_list: list[bool] | None, oracle: Callable[[bytes], bool]
+    ) -> "S7Minimizer":
+        return cls(compile_function(function, fuzzable_list), oracle)
+
+    def variable(self, field_index: int) -> bool:
+        """
+        字段的长度是否可变：未指定 size 的 Bytes。
+        """
+        primitive = self.template.fields[field_index].primitive
+        return isinstance(primitive, Bytes) and primitive.size is None
+
+    def default(self, field_index: int) -> bytes:
+        template_field = self.template.fields[field_index]
+        return self.template.template[template_field.offset:template_field.offset + template_field.length]
+
+    def values_from_case(self, case: int) -> dict[int, bytes]:
+        """
+        第 case 个变异（从 1 开始，与 fuzz_range 一致）的字段值。
+        """
+        field_index, value_index = self.template.locate(case - 1)
+        k = self.template.fuzzable_indexes.index(field_index)
+        return {field_index: self.template.mutations[k][value_index]}
+
+    def values_from_payload(self, payload: bytes) -> dict[int, bytes]:
+        """
+        把一个 S7 数据按模板拆分为与默认值不同的可变异字段。长度与模板不同时，差值归于唯一的可变异变长字段；
+        长度字段等不可变异的字段由渲染重新计算，不会被拆分出来。
+
+        :raises ValueError: 无法唯一地拆分。
+        """
+        delta = len(payload) - len(self.template.template)
+        variable = [i for i in self.template.fuzzable_indexes if self.variable(i)]
+        if delta and len(variable) != 1:
+            raise ValueError("数据长度与模板不同，且可变异的变长字段不唯一，无法拆分")
+        values = {}
+        position = 0
+        for i, template_field in enumerate(self.template.fields):
+            length = template_field.length + (delta if delta and i == variable[0] else 0)
+            if length < 0:
+                raise ValueError("数据长度小于模板中的定长部分")
+            value = payload[position:position + length]
+            position += length
+            if template_field.fuzzable and value != self.default(i):
+                values[i] = value
+        return values
+
+    def render(self, values: dict[int, bytes]) -> bytes:
+        return bytes(self.template.render_fields(values))
+
+    def test(self, values: dict[int, bytes]) -> bool:
+        """
+        候选用例是否仍然使目标崩溃，结果按渲染后的数据缓存。
+        """
+        data = self.render(values)
+        if data in self.cache:
+            self.cache_hits += 1
+            return self.cache[data]
+        self.tests += 1
+        result = self.cache[data] = bool(self.oracle(data))
+        return result
+
+    def _reduce_field(self, values: dict[int, bytes], field_index: int) -> bytes:
+        value = values[field_index]
+        others = {i: v for i, v in values.items() if i != field_index}
+        if self.variable(field_index):
+            # 变长字段：删除字节
+            kept = ddmin(range(len(value)), lambda keep: self.test(
+                {**others, field_index: bytes(value[j] for j in keep)}
+            ))
+            return bytes(value[j] for j in kept)
+        # 定长字段：把与默认值不同的字节恢复为默认值
+        default = self.default(field_index)
+        if len(value) != len(default):
+            return value
+        differing = [j for j in range(len(value)) if value[j] != default[j]]
+
+        def patch(keep: list[int]) -> bytes:
+            patched = bytearray(default)
+            for j in keep:
+                patched[j] = value[j]
+            return bytes(patched)
+
+        return patch(ddmin(differing, lambda keep: self.test({**others, field_index: patch(keep)})))
+
+    def minimize(self, values: dict[int, bytes]) -> MinimizeResult:
+        """
+        最小化一个崩溃用例。
+
+        :param values: 崩溃用例中被变异的字段下标 -> 字段值。
+        :raises ValueError: 该用例无法复现。
+        """
+        if not self.test(values):
+            raise ValueError("该用例没有使目标崩溃，无法最小化")
+        fields = ddmin(sorted(values), lambda keep: self.test({i: values[i] for i in keep}))
+        values = {i: values[i] for i in fields}
+        for field_index in fields:
+            values[field_index] = self._reduce_field(values, field_index)
+        # 恢复为默认值的字段不再列出
+        values = {i: v for i, v in values.items() if v != self.default(i)}
+        return MinimizeResult(
+            values=values,
+            data=self.render(values),
+            fields=[self.template.fields[i].name for i in values],
+            tests=self.tests,
+            cache_hits=self.cache_hits,
+        )
+
+
+class ReplayOracle:
+    """
+    以 S7Replayer 重放候选用例的 oracle：候选用例使目标崩溃后，先等待目标恢复再测试下一个。
+
+    :param replayer: 重放器，功能需要与崩溃用例一致。
+    """
+
+    def __init__(self, replayer: S7Replayer):
+        self.replayer = replayer
+        self._crashed = False
+
+    def __call__(self, data: bytes) -> bool:
+        if self._crashed and not self.replayer.wait_alive():
+            raise RuntimeError("目标没有恢复，无法继续最小化")
+        result = self.replayer.replay([ReplayCase(None, data)])[0]
+        self._crashed = result.reproduced
+        return result.reproduced
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="最小化使 PLC 崩溃的 S7 测试用例")
+    parser.add_argument("host")
+    parser.add_argument("port", type=int)
+    parser.add_argument("function", choices=list(FUZZABLE_FIELD_COUNTS))
+    parser.add_argument("--fuzzable", default=None, help="变异规则，例如 00001，默认为生成器的默认规则")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--case", type=int, help="崩溃用例的编号")
+    group.add_argument("--payload", help="十六进制表示的崩溃用例 S7 数据")
+    parser.add_argument("--timeout", type=float, default=1.0, help="等待应答的超时（秒）")
+    parser.add_argument("--recover-timeout", type=float, default=30.0, help="等待目标恢复的最长时间（秒）")
+    args = parser.parse_args(argv)
+
+    fuzzable_list = None if args.fuzzable is None else [c == "1" for c in args.fuzzable]
+    replayer = S7Replayer(args.host, args.port, args.function, timeout=args.timeout,
+                          recover_timeout=args.recover_timeout)
+    minimizer = S7Minimizer.from_function(args.function, fuzzable_list, ReplayOracle(replayer))
+    if args.case is not None:
+        values = minimizer.values_from_case(args.case)
+    else:
+        values = minimizer.values_from_payload(bytes.fromhex(args.payload))
+    result = minimizer.minimize(values)
+    for name, value in zip(result.fields, result.values.values()):
+        print(f"{name}: {value.hex()}")
+    print(f"最小化后的数据：{result.data.hex()}")
+    print(f"测试 {result.tests} 个候选用例，命中缓存 {result.cache_hits} 次")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
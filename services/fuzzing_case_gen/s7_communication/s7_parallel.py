@@ -0,0 +1,183 @@
+"""
+多进程并行模糊测试。
+
+把某个功能的变异编号区间（与 boofuzz 的 total_mutant_index 一致，从 1 开始）切分为互不相交的分片，
+每个分片在独立的进程中使用自己的 S7CommunicationSession 与 S7CommunicationSocketConnection 执行，
+最后把各分片的结果合并为一份报告。
+"""
+import json
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+from .s7_gen import S7CommunicationGenerator
+from .s7c_manager import S7CommunicationSession
+from .s7_case_index import S7CaseIndex
+
+
+def shard_ranges(total: int, shards: int) -> list[tuple[int, int]]:
+    """
+    把 1..total 切分为至多 shards 个连续且互不相交的区间。
+
+    :param total: 变异总数。
+    :param shards: 分片数。
+    :return: (index_start, index_end) 列表，两端均包含。
+    """
+    if shards < 1:
+        raise ValueError("分片数必须大于 0")
+    shards = min(shards, total)
+    if shards == 0:
+        return []
+    size, remainder = divmod(total, shards)
+    ranges = []
+    start = 1
+    for i in range(shards):
+        end = start + size - 1 + (1 if i < remainder else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def plan_shards(
+    function: str,
+    fuzzable_list: list[bool] | None,
+    targets: list[tuple[str, int]],
+    workers: int,
+    connections_per_target: int = 1,
+    results_dir: str = "boofuzz-results",
+    start: int = 1,
+    end: int | None = None,
+    **session_kwargs,
+) -> list[dict]:
+    """
+    生成各分片的任务描述。并发数为 workers 与 len(targets) * connections_per_target 中的较小值，
+    分片按顺序轮流分配给各个目标，保证每个目标上的并发连接数不超过 connections_per_target。
+
+    :param function: S7CommunicationGenerator 中的功能名称。
+    :param fuzzable_list: 变异规则列表。
+    :param targets: 目标 (ip, port) 列表。
+    :param workers: 工作进程数。
+    :param connections_per_target: 每个目标允许的并发连接数。
+    :param results_dir: 各分片结果数据库所在目录。
+    :param start: 只切分 [start, end] 内的编号，默认从 1 开始。
+    :param end: 结束编号（包含），默认为变异总数。
+    :param session_kwargs: 传给 S7CommunicationSession 的其余参数，例如 persistent。
+    """
+    if not targets:
+        raise ValueError("至少需要一个模糊测试目标")
+    if workers < 1 or connections_per_target < 1:
+        raise ValueError("工作进程数与每个目标的连接数必须大于 0")
+    total = S7CaseIndex.from_function(function, fuzzable_list).total
+    end = total if end is None else min(end, total)
+    slots = min(workers, len(targets) * connections_per_target)
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    specs = []
+    for shard, (first, last) in enumerate(shard_ranges(max(0, end - start + 1), slots)):
+        ip, port = targets[shard % len(targets)]
+        specs.append(
+            {
+                "shard": shard,
+                "function": function,
+                "fuzzable_list": fuzzable_list,
+                "ip": ip,
+                "port": port,
+                "index_start": start + first - 1,
+                "index_end": start + last - 1,
+                "db_filename": os.path.join(results_dir, f"run-{run_id}-{function}-shard{shard}.db"),
+                "session_kwargs": session_kwargs,
+            }
+        )
+    return specs
+
+
+def run_shard(spec: dict, on_session: Callable[[S7CommunicationSession], None] | None = None) -> dict:
+    """
+    在工作进程中执行一个分片。
+
+    :param spec: plan_shards 生成的任务描述。
+    :param on_session: 会话创建后、开始模糊测试前的回调，在工作进程中调用。
+    :return: 分片结果，失败用例以全局变异编号为键。
+    """
+    session = S7CommunicationSession(
+        spec["ip"],
+        spec["port"],
+        web_port=None,
+        db_filename=spec["db_filename"],
+        fuzz_loggers=[],
+        **spec["session_kwargs"],
+    )
+    session.connect(getattr(S7CommunicationGenerator, spec["function"])(spec["fuzzable_list"]))
+    if on_session is not None:
+        on_session(session)
+    start = time.perf_counter()
+    session.fuzz_range(spec["index_start"], spec["index_end"])
+    elapsed = time.perf_counter() - start
+
+    failures = {}
+    # 测试用例 id 形如 "编号: 名称"
+    for test_case_id, synopses in session._fuzz_data_logger.failed_test_cases.items():
+        failures[int(str(test_case_id).split(":")[0])] = list(synopses)
+    return {
+        "shard": spec["shard"],
+        "target": f"{spec['ip']}:{spec['port']}",
+        "index_start": spec["index_start"],
+        "index_end": spec["index_end"],
+        "cases": session.num_cases_actually_fuzzed,
+        "failures": failures,
+        "elapsed": elapsed,
+        "db_filename": spec["db_filename"],
+        "handshakes": session.handshake_stats(),
+    }
+
+
+def merge_reports(results: list[dict], elapsed: float) -> dict:
+    """
+    合并各分片的结果。
+
+    :param results: run_shard 的返回值列表。
+    :param elapsed: 整体耗时（秒）。
+    """
+    results = sorted(results, key=lambda r: r["index_start"])
+    failures = {}
+    for result in results:
+        failures.update(result["failures"])
+    cases = sum(result["cases"] for result in results)
+    return {
+        "cases": cases,
+        "failures": dict(sorted(failures.items())),
+        "elapsed": elapsed,
+        "cases_per_sec": cases / elapsed if elapsed else 0.0,
+        "handshakes_saved": sum(result["handshakes"]["handshakes_saved"] for result in results),
+        "shards": results,
+    }
+
+
+def run_parallel(
+    function: str,
+    fuzzable_list: list[bool] | None,
+    targets: list[tuple[str, int]],
+    workers: int = os.cpu_count() or 1,
+    connections_per_target: int = 1,
+    report_filename: str | None = None,
+    **kwargs,
+) -> dict:
+    """
+    并行对 function 进行模糊测试并返回合并后的报告。
+
+    :param report_filename: 报告的 json 文件路径，默认为 None 表示不写文件。
+    :param kwargs: 传给 plan_shards 的其余参数。
+    """
+    specs = plan_shards(function, fuzzable_list, targets, workers, connections_per_target, **kwargs)
+    start = time.perf_counter()
+    results = []
+    if specs:
+        with ProcessPoolExecutor(max_workers=len(specs)) as executor:
+            results = list(executor.map(run_shard, specs))
+    report = merge_reports(results, time.perf_counter() - start)
+    report["function"] = function
+    report["fuzzable_list"] = fuzzable_list
+    if report_filename is not None:
+        with open(report_filename, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
@@ -0,0 +1,218 @@
+"""
+测试用例的分阶段计时。
+
+一个测试用例的耗时分布在 cr_tpdu 前置回调、渲染、发送、等待应答以及 s7c_post_callck 后置回调之间，
+只看总耗时无法判断瓶颈在哪里。PhaseTimer 用单调时钟（perf_counter_ns）记录每个阶段的耗时，
+按 (功能, 字段, 阶段) 累加到 HDR 风格的对数直方图中：每个二进制数量级分为固定个数的线性子桶，
+记录一个值只需要计算下标并累加计数，相对误差不超过 2 ** -(significant_bits - 1)。
+
+直方图可以在运行中随时读取（report），也可以在结束后输出最终报告。会话未启用计时时不注册任何计时包装，
+热路径上没有额外开销。
+"""
+import functools
+import threading
+import time
+from array import array
+from collections.abc import Callable
+
+# 阶段名称，按在一个测试用例中出现的顺序排列
+PHASES = ("pre_send", "render", "send", "recv", "post", "total")
+
+
+class LogHistogram:
+    """
+    HDR 风格的对数直方图，记录非负整数（通常为纳秒）。
+
+    :param significant_bits: 每个数量级的精度位数，子桶个数为 2 ** significant_bits 的一半。
+    :param highest: 可记录的最大值，更大的值按该值记录。
+    """
+
+    def __init__(self, significant_bits: int = 7, highest: int = 1 << 40):
+        if not 1 <= significant_bits < highest.bit_length():
+            raise ValueError(f"精度位数 {significant_bits} 不合法")
+        self.significant_bits = significant_bits
+        self.highest = highest
+        self._sub_count = 1 << significant_bits
+        self._half = self._sub_count >> 1
+        self.counts = array("Q", [0]) * (self._index(highest) + 1)
+        self.count = 0
+        self.total = 0
+        self.min: int | None = None
+        self.max: int | None = None
+
+    def _index(self, value: int) -> int:
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self.significant_bits
+        return self._sub_count + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def _bounds(self, index: int) -> tuple[int, int]:
+        """
+        下标对应的取值区间 [low, high)。
+        """
+        if index < self._sub_count:
+            return index, index + 1
+        shift, offset = divmod(index - self._sub_count, self._half)
+        shift += 1
+        low = (offset + self._half) << shift
+        return low, low + (1 << shift)
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        elif value > self.highest:
+            value = self.highest
+        # 抓取指标的线程不加锁读取直方图：先更新 min/max 与各桶，最后才增加 count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.counts[self._index(value)] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other: "LogHistogram"):
+        """
+        把另一个相同参数的直方图累加到本直方图中。
+        """
+        if (other.significant_bits, other.highest) != (self.significant_bits, self.highest):
+            raise ValueError("直方图参数不一致，无法合并")
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.count += other.count
+
+    def percentile(self, percentile: float) -> int | None:
+        """
+        分位数，取所在子桶的中点并限制在 [min, max] 之间；没有记录时为 None。
+        """
+        minimum, maximum = self.min, self.max
+        if not self.count or minimum is None or maximum is None:
+            return None
+        target = max(1, -(-self.count * percentile // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                low, high = self._bounds(index)
+                return min(maximum, max(minimum, (low + high - 1) // 2))
+        return maximum
+
+    def summary(self) -> dict:
+        """
+        记录数、最小/平均/p50/p90/p99/最大值。
+        """
+        return {
+            "count": self.count,
+            "min": self.min,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class PhaseTimer:
+    """
+    按 (功能, 字段, 阶段) 汇总测试用例各阶段耗时的计时器。
+
+    :param significant_bits: 直方图的精度位数。
+    """
+
+    def __init__(self, significant_bits: int = 7):
+        self.significant_bits = significant_bits
+        self._histograms: dict[tuple[str, str, str], LogHistogram] = {}
+        self._lock = threading.Lock()
+        # 当前测试用例的功能、字段以及已经测得的各阶段耗时。字段在发送时才能确定，因此在用例结束时统一记录
+        self.function = ""
+        self.field = ""
+        self._current: dict[str, int] = {}
+        self._case_started: int | None = None
+
+    def begin_case(self, function: str, field: str):
+        """
+        设置当前测试用例所属的功能与字段。
+        """
+        self.function = function
+        self.field = field
+
+    def mark(self, phase: str, elapsed_ns: int):
+        """
+        记录当前测试用例一个阶段的耗时，在 end_case 时归入直方图。
+        """
+        self._current[phase] = elapsed_ns
+
+    def end_case(self):
+        """
+        把当前测试用例各阶段的耗时累加到 (功能, 字段, 阶段) 对应的直方图中。
+        """
+        for phase, elapsed_ns in self._current.items():
+            key = (self.function, self.field, phase)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                with self._lock:
+                    histogram = self._histograms.setdefault(key, LogHistogram(self.significant_bits))
+            histogram.record(elapsed_ns)
+        self._current.clear()
+
+    def timed(self, phase: str, callback: Callable) -> Callable:
+        """
+        包装 boofuzz 回调并记录其耗时。前置回调标记测试用例的开始，后置回调结束时记录 total 并结束该用例。
+        """
+
+        @functools.wraps(callback)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter_ns()
+            if phase == "pre_send":
+                # 上一个用例没有执行到后置回调时丢弃其耗时
+                self._current.clear()
+                self._case_started = started
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                finished = time.perf_counter_ns()
+                self.mark(phase, finished - started)
+                if phase == "post":
+                    if self._case_started is not None:
+                        self.mark("total", finished - self._case_started)
+                        self._case_started = None
+                    self.end_case()
+
+        return wrapper
+
+    def histograms(self) -> dict[tuple[str, str, str], LogHistogram]:
+        with self._lock:
+            return dict(self._histograms)
+
+    def report(self, unit: float = 1e3) -> dict:
+        """
+        各功能以及功能下各字段每个阶段的耗时统计，可以在运行中调用。
+
+        :param unit: 输出单位对应的纳秒数，默认为微秒。
+        :return: {功能: {"phases": {阶段: 统计}, "fields": {字段: {阶段: 统计}}}}。
+        """
+        merged: dict[tuple[str, str], LogHistogram] = {}
+        report: dict[str, dict] = {}
+        for (function, field, phase), histogram in sorted(self.histograms().items()):
+            function_report = report.setdefault(function, {"phases": {}, "fields": {}})
+            function_report["fields"].setdefault(field, {})[phase] = _scale(histogram.summary(), unit)
+            merged.setdefault((function, phase), LogHistogram(self.significant_bits)).merge(histogram)
+        for (function, phase), histogram in merged.items():
+            report[function]["phases"][phase] = _scale(histogram.summary(), unit)
+        for function_report in report.values():
+            function_report["phases"] = _ordered(function_report["phases"])
+            function_report["fields"] = {field: _ordered(phases) for field, phases in function_report["fields"].items()}
+        return report
+
+
+def _ordered(phases: dict) -> dict:
+    return {phase: phases[phase] for phase in PHASES if phase in phases}
+
+
+def _scale(summary: dict, unit: float) -> dict:
+    return {key: value if key == "count" or value is None else value / unit for key, value in summary.items()}
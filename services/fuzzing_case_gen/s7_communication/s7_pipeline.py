@@ -0,0 +1,202 @@
+"""
+基于 Max AmQ 的流水线发送。
+
+建立通信时双方协商 Max AmQ（允许同时处于未应答状态的任务数），但 boofuzz 的会话总是发送一个
+PDU 并等待应答后才发送下一个。S7Pipeline 从建立通信的应答中读取协商的 AmQ，最多让这么多个
+变异 PDU 同时在途：每个 PDU 的 S7 首部写入不同的 pdu 引用，应答按 pdu 引用匹配回测试用例。
+"""
+import struct
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from boofuzz import exception
+
+from .s7_communication_socket_connection import S7CommunicationSocketConnection
+from .s7_frame_cache import S7FrameCache
+from .s7_response import S7_OFFSET, S7Response, TPKTReassembler, classify
+
+RECV_MAX_BYTES = 65536
+# S7 首部中 pdu 引用的偏移
+PDU_REFERENCE_OFFSET = 4
+# Ack_Data 首部 12 字节之后是建立通信的参数：功能码、保留、Max AmQ calling、Max AmQ called、PDU 长度
+_SETUP_PARAMETER = struct.Struct("!BBHHH")
+_AMQ_OFFSET = S7_OFFSET + 10 + 2
+
+
+def setup_frame(frame_cache: S7FrameCache, max_amq: int) -> bytes:
+    """
+    请求 max_amq 个并行任务的建立通信数据帧。
+
+    :param frame_cache: 帧缓存。
+    :param max_amq: 请求的 Max AmQ calling/called。
+    """
+    frame = bytearray(frame_cache.get("setup_communication"))
+    struct.pack_into("!HH", frame, _AMQ_OFFSET, max_amq, max_amq)
+    return bytes(frame)
+
+
+def negotiated_amq(frame) -> int | None:
+    """
+    从建立通信的应答中取出协商的 AmQ，取 calling、called 中的较小值。
+
+    :param frame: 建立通信的应答帧。
+    :return: 协商的 AmQ，应答不是成功的建立通信应答时返回 None。
+    """
+    if not frame:
+        return None
+    response = classify(frame)
+    offset = S7_OFFSET + 12
+    if response.kind != "ack_data" or not response.ok or len(frame) < offset + _SETUP_PARAMETER.size:
+        return None
+    function, _, calling, called, _ = _SETUP_PARAMETER.unpack_from(frame, offset)
+    if function != 0xF0:
+        return None
+    return max(1, min(calling, called))
+
+
+@dataclass(frozen=True)
+class PipelineResult:
+    """
+    一个测试用例的结果。
+
+    :param case: 测试用例编号。
+    :param data: 实际发送的 S7 数据（已写入 pdu 引用）。
+    :param reply: 匹配到的应答帧，超时或连接断开时为 None。
+    :param response: 应答的分类结果。
+    :param sent_at: 发送时间（time.time()）。
+    :param received_at: 收到应答的时间，没有应答时为 None。
+    """
+    case: int
+    data: bytes
+    reply: bytes | None = None
+    response: S7Response | None = None
+    sent_at: float = 0.0
+    received_at: float | None = None
+
+
+class S7Pipeline:
+    """
+    在一个连接上流水线发送测试用例。
+
+    :param connection: 目标连接。
+    :param frame_cache: 帧缓存，用于获取 CR TPDU 与建立通信数据帧。
+    :param max_amq: 请求的 Max AmQ，实际在途数量不超过目标协商的值。
+    """
+
+    def __init__(self, connection: S7CommunicationSocketConnection, frame_cache: S7FrameCache | None = None,
+                 max_amq: int = 8):
+        self.connection = connection
+        self.frame_cache = frame_cache or S7FrameCache()
+        self.max_amq = max_amq
+        self.window = 1
+        self.reassembler = TPKTReassembler()
+        # pdu 引用 -> (测试用例编号, 发送的数据, 发送时间)
+        self._inflight: dict[int, tuple[int, bytes, float]] = {}
+        self._reference = 0
+        self.sent = 0
+        self.answered = 0
+        self.unanswered = 0
+        self.unmatched = 0
+        self.reconnects = 0
+
+    def _recv_frame(self) -> bytes:
+        while True:
+            chunk = self._recv()
+            if not chunk:
+                return b""
+            frames = self.reassembler.feed(chunk)
+            if frames:
+                return bytes(frames[0])
+
+    def _recv(self) -> bytes:
+        try:
+            return self.connection.recv(RECV_MAX_BYTES)
+        except (exception.BoofuzzTargetConnectionReset, exception.BoofuzzTargetConnectionAborted):
+            return b""
+
+    def open(self) -> int:
+        """
+        打开连接、建立 COTP 连接与通信，并根据协商的 AmQ 设置在途窗口。
+
+        :raises BoofuzzTargetConnectionFailedError: 无法连接目标。
+        :return: 在途窗口大小。
+        """
+        self.connection.open()
+        self.reassembler.reset()
+        self.connection.send_frame(self.frame_cache.connect_request())
+        self._recv_frame()
+        self.connection.send_frame(setup_frame(self.frame_cache, self.max_amq))
+        amq = negotiated_amq(self._recv_frame())
+        self.window = max(1, min(self.max_amq, amq or 1))
+        return self.window
+
+    def close(self):
+        self.connection.close()
+
+    def _next_reference(self) -> int:
+        # pdu 引用在 1..65535 之间循环，跳过仍在途的引用
+        while True:
+            self._reference = self._reference % 0xFFFF + 1
+            if self._reference not in self._inflight:
+                return self._reference
+
+    def run(self, cases: Iterable[tuple[int, bytes]]) -> Iterator[PipelineResult]:
+        """
+        依次发送测试用例，窗口已满时先接收应答。结果按应答到达的顺序产生。
+
+        :param cases: (测试用例编号, S7 数据) 序列。
+        """
+        for case, payload in cases:
+            while len(self._inflight) >= self.window:
+                yield from self._receive()
+            reference = self._next_reference()
+            data = bytearray(payload)
+            if len(data) >= PDU_REFERENCE_OFFSET + 2:
+                struct.pack_into("!H", data, PDU_REFERENCE_OFFSET, reference)
+            self._inflight[reference] = (case, bytes(data), time.time())
+            try:
+                self.connection.send_frame(S7CommunicationSocketConnection.frame(data, "DT Data"))
+            except (exception.BoofuzzTargetConnectionReset, exception.BoofuzzTargetConnectionAborted):
+                yield from self._fail_inflight()
+                continue
+            self.sent += 1
+        while self._inflight:
+            yield from self._receive()
+
+    def _receive(self) -> Iterator[PipelineResult]:
+        chunk = self._recv()
+        if not chunk:
+            yield from self._fail_inflight()
+            return
+        for frame in self.reassembler.feed(chunk):
+            response = classify(frame)
+            entry = None
+            if response.rosctr in (0x02, 0x03, 0x07):
+                entry = self._inflight.pop(response.pdu_reference, None)
+            if entry is None:
+                self.unmatched += 1
+                continue
+            self.answered += 1
+            yield PipelineResult(entry[0], entry[1], bytes(frame), response, entry[2], time.time())
+
+    def _fail_inflight(self) -> Iterator[PipelineResult]:
+        # 超时或连接断开：所有在途的用例都没有应答，重新建立连接后继续
+        inflight = sorted(self._inflight.values())
+        self._inflight.clear()
+        self.unanswered += len(inflight)
+        self.close()
+        self.reconnects += 1
+        self.open()
+        for case, data, sent_at in inflight:
+            yield PipelineResult(case, data, sent_at=sent_at)
+
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "sent": self.sent,
+            "answered": self.answered,
+            "unanswered": self.unanswered,
+            "unmatched": self.unmatched,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,142 @@
+"""
+多 item 读取变量请求的延迟枚举。
+
+S7CommunicationGenerator.read_var_items 为每个 item 创建 8 个 boofuzz 原语，100 多个 item 时整棵
+Request 树及其编译模板会占用大量内存。ReadVarCases 只保存各 item 的参数与未变异时的字节，
+以生成器按需产生测试用例：把变异后的字段拼接到其它 item 的默认字节中，并修正 parameter_length。
+字段的变异值只取决于字段及其默认值，按 (字段, 默认值) 缓存，不同 item 的相同字段共享同一份变异值。测试用例的编号与顺序与 boofuzz 遍历
+read_var_items 生成的 Request 完全一致。
+"""
+import bisect
+import struct
+from collections.abc import Iterator
+from functools import lru_cache
+
+from boofuzz.blocks import Request
+from .s7_gen import S7CommunicationGenerator, READ_VAR_ITEM, read_var_fuzzable_lists
+from .s7_template import compile_request
+
+# protocol_id、rosctr、reserved、pdu_reference、parameter_length、data_length
+_HEADER = struct.Struct("!BBHHHH")
+_ITEM = struct.Struct("!BBBBHHB3s")
+# item 中各字段的偏移与长度
+_FIELD_NAMES = (
+    "variable_specification", "length_of_following_address_specification", "syntax_id", "transport_size",
+    "length", "db_number", "area", "address",
+)
+_FIELD_WIDTHS = (1, 1, 1, 1, 2, 2, 1, 3)
+_FIELD_OFFSETS = tuple(sum(_FIELD_WIDTHS[:i]) for i in range(len(_FIELD_WIDTHS)))
+# function、item_count
+_PARAMETER_HEAD_LENGTH = 2
+
+
+@lru_cache(maxsize=1024)
+def _field_mutations(position: int, value: int) -> tuple[bytes, ...]:
+    # 字段的变异只取决于字段本身及其默认值，与 item 中的其它字段无关。只变异这一个字段编译一次，
+    # 缓存编码后的变异值：大量 item 通常只有 db_number、address 等少数字段的取值不同
+    item = list(READ_VAR_ITEM)
+    item[position] = value
+    fuzzable_list = [i == position for i in range(len(item))]
+    block = S7CommunicationGenerator.define_item(*item, fuzzable_list, name="item")
+    template = compile_request(Request("read_var_item", children=(block,)))
+    return tuple(template.mutations[0])
+
+
+def _mutated_fields(item: tuple[int, ...], fuzzable_list: tuple[bool, ...]) -> list[tuple[int, tuple[bytes, ...]]]:
+    """
+    item 中按顺序排列的 (可变异字段的位置, 该字段的变异值)。
+    """
+    return [(position, _field_mutations(position, item[position])) for position, fuzzable in enumerate(fuzzable_list)
+            if fuzzable]
+
+
+class ReadVarCases:
+    """
+    多 item 读取变量请求的测试用例，按需渲染。
+
+    :param items: 每个 item 的参数，顺序与 define_item 一致，默认为一个 READ_VAR_ITEM。
+    :param fuzzable_lists: 每个 item 的变异规则列表，默认每个 item 只变异 address。
+    :raises ValueError: item 个数为 0 或超过 255，或变异规则与 item 个数不一致。
+    """
+
+    def __init__(self, items: list[tuple[int, ...]] | None = None, fuzzable_lists: list[list[bool]] | None = None):
+        self.items = [tuple(item) for item in (items or [READ_VAR_ITEM])]
+        self.fuzzable_lists = [tuple(flags) for flags in read_var_fuzzable_lists(self.items, fuzzable_lists)]
+        self.item_bytes = [_ITEM.pack(*item[:7], item[7].to_bytes(3, "big")) for item in self.items]
+        self.parameter_length = _PARAMETER_HEAD_LENGTH + sum(len(item) for item in self.item_bytes)
+        # 每个 item 第一个测试用例的编号（从 0 开始），最后一项为测试用例总数
+        self._starts = [0]
+        for item, flags in zip(self.items, self.fuzzable_lists):
+            count = sum(len(values) for _, values in _mutated_fields(item, flags))
+            self._starts.append(self._starts[-1] + count)
+
+    @property
+    def total(self) -> int:
+        """
+        测试用例总数，与 read_var_items 生成的 Request 的变异总数相同。
+        """
+        return self._starts[-1]
+
+    def __len__(self):
+        return self.total
+
+    def _locate(self, case: int) -> tuple[int, int, int]:
+        if not 1 <= case <= self.total:
+            raise IndexError(f"变异编号 {case} 超出范围 [1, {self.total}]")
+        item_index = bisect.bisect_right(self._starts, case - 1) - 1
+        value_index = case - 1 - self._starts[item_index]
+        for position, values in _mutated_fields(self.items[item_index], self.fuzzable_lists[item_index]):
+            if value_index < len(values):
+                return item_index, position, value_index
+            value_index -= len(values)
+        raise AssertionError("unreachable")
+
+    def _payload(self, item_index: int, position: int, value: bytes) -> bytes:
+        item = self.item_bytes[item_index]
+        offset = _FIELD_OFFSETS[position]
+        mutated = item[:offset] + value + item[offset + _FIELD_WIDTHS[position]:]
+        parameter_length = self.parameter_length + len(mutated) - len(item)
+        return b"".join((
+            _HEADER.pack(0x32, 0x01, 0x0000, 0x0000, parameter_length & 0xFFFF, 0),
+            bytes((0x04, len(self.items))),
+            *self.item_bytes[:item_index],
+            mutated,
+            *self.item_bytes[item_index + 1:],
+        ))
+
+    def default(self) -> bytes:
+        """
+        未变异的请求。
+        """
+        return self._payload(0, 0, self.item_bytes[0][:1])
+
+    def describe(self, case: int) -> tuple[int, str, int]:
+        """
+        第 case 个测试用例变异的 item、字段及其在该字段中的编号。
+
+        :param case: 测试用例编号，从 1 开始。
+        :return: (item 下标, 字段名称, 字段内变异编号)
+        """
+        item_index, position, value_index = self._locate(case)
+        return item_index, _FIELD_NAMES[position], value_index
+
+    def render(self, case: int) -> bytes:
+        """
+        渲染第 case 个测试用例，与 boofuzz 遍历 read_var_items 生成的 Request 时发送的数据一致。
+
+        :param case: 测试用例编号，从 1 开始。
+        """
+        item_index, position, value_index = self._locate(case)
+        value = _field_mutations(position, self.items[item_index][position])[value_index]
+        return self._payload(item_index, position, value)
+
+    def __iter__(self) -> Iterator[tuple[int, bytes]]:
+        """
+        依次产生 (测试用例编号, S7 数据)，可以直接传给 S7Pipeline.run。
+        """
+        case = 0
+        for item_index, (item, flags) in enumerate(zip(self.items, self.fuzzable_lists)):
+            for position, values in _mutated_fields(item, flags):
+                for value in values:
+                    case += 1
+                    yield case, self._payload(item_index, position, value)
@@ -0,0 +1,351 @@
+"""
+崩溃重放。
+
+PLC 出现故障后，复现需要重新运行 s7_run.py 并等待 boofuzz 遍历到同一个编号。S7Replayer 接收
+一组测试用例（按编号渲染、取自语料文件或 boofuzz 的运行日志），对每个用例按默认会话中 cr_tpdu
+的顺序重新发送：新的 TCP 连接、CR TPDU、该功能的前置数据包、变异数据包、后置数据包，
+然后探测目标是否仍然存活，报告哪些用例能够复现故障。用例之间可以不停顿地连续发送，也可以指定间隔。
+
+用法：python -m services.fuzzing_case_gen.s7_communication.s7_replay 192.168.101.172 102 read_var --cases 5,10-20
+"""
+import argparse
+import json
+import socket
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, asdict
+
+from boofuzz import exception
+
+from .s7_gen import FUZZABLE_FIELD_COUNTS
+from .s7_case_index import S7CaseIndex
+from .s7_corpus import S7Corpus
+from .s7_frame_cache import S7FrameCache
+from .s7_response import TPKTReassembler, classify
+from .s7_communication_socket_connection import S7CommunicationSocketConnection
+
+RECV_MAX_BYTES = 65536
+# 连接被重置、中止或拒绝
+_CONNECTION_ERRORS = (
+    exception.BoofuzzTargetConnectionReset,
+    exception.BoofuzzTargetConnectionAborted,
+    exception.BoofuzzTargetConnectionFailedError,
+    ConnectionError,
+    socket.timeout,
+)
+
+
+@dataclass
+class ReplayCase:
+    """
+    一个待重放的测试用例。
+
+    :param case: 测试用例编号，原始数据没有编号时为 None。
+    :param data: 变异数据包的 S7 数据（不含 TPKT/COTP 首部）。
+    """
+    case: int | None
+    data: bytes
+
+
+@dataclass
+class ReplayResult:
+    """
+    一个测试用例的重放结果。
+
+    :param case: 测试用例编号。
+    :param reproduced: 是否复现了故障。
+    :param reason: no_reply（没有应答）、connection_reset（连接断开）、target_down（之后目标无法建立通信）、
+        ok（目标正常应答）或 skipped（目标一直未恢复，没有重放）。
+    :param response: 目标应答的分类结果。
+    :param attempts: 实际重放次数。
+    :param elapsed: 重放耗时（秒）。
+    """
+    case: int | None
+    reproduced: bool
+    reason: str
+    response: str | None = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+
+def parse_cases(text: str) -> list[int]:
+    """
+    解析形如 5,10-20 的编号列表。
+
+    :raises ValueError: 格式错误。
+    """
+    cases = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = (int(value) for value in part.split("-", 1))
+            cases.extend(range(first, last + 1))
+        else:
+            cases.append(int(part))
+    return cases
+
+
+def cases_from_indexes(function: str, fuzzable_list: list[bool] | None, indexes: list[int]) -> list[ReplayCase]:
+    """
+    按编号渲染测试用例，编号与 fuzz_range、case_id 一致。
+    """
+    index = S7CaseIndex.from_function(function, fuzzable_list)
+    return [ReplayCase(case, index.render(case)) for case in indexes]
+
+
+def cases_from_corpus(
+    filename: str, indexes: list[int] | None = None, function: str | None = None, fuzzable_list: list[bool] | None = None
+) -> list[ReplayCase]:
+    """
+    从语料文件中取出测试用例，indexes 为 None 时取出全部。
+
+    :param function: 重放时使用的功能，给出时必须与语料的功能一致，否则前置/后置数据包与测试用例不匹配。
+    :param fuzzable_list: 给出时必须与语料的变异规则一致。
+    :raises ValueError: 语料的功能或变异规则与参数不一致。
+    """
+    with S7Corpus(filename) as corpus:
+        if function is not None and corpus.metadata["function"] != function:
+            raise ValueError(f"语料文件 {filename} 的功能为 {corpus.metadata['function']}，与 {function} 不一致")
+        if fuzzable_list is not None and corpus.metadata["fuzzable_list"] != fuzzable_list:
+            raise ValueError(f"语料文件 {filename} 的变异规则与给出的变异规则不一致")
+        indexes = range(corpus.start, corpus.end + 1) if indexes is None else indexes
+        return [ReplayCase(case, bytes(corpus.payload(case))) for case in indexes if corpus.frame(case)]
+
+
+def cases_from_run_log(
+    db_filename: str, function: str | None = None, fuzzable_list: list[bool] | None = None, failed_only: bool = True
+) -> list[ReplayCase]:
+    """
+    从 boofuzz 的运行日志（sqlite 数据库）中取出测试用例发送的变异数据包。
+
+    日志中的数据超过一定长度会被截断，此时如果给出了 function，则按编号重新渲染。
+
+    :param db_filename: 运行日志路径。
+    :param function: 产生该日志的功能名称。
+    :param fuzzable_list: 产生该日志的变异规则。
+    :param failed_only: 是否只取出失败（fail/error）的测试用例。
+    """
+    index = S7CaseIndex.from_function(function, fuzzable_list) if function else None
+    database = sqlite3.connect(db_filename)
+    try:
+        if failed_only:
+            rows = database.execute(
+                "SELECT DISTINCT test_case_index FROM steps WHERE type IN ('fail', 'error') ORDER BY test_case_index"
+            ).fetchall()
+        else:
+            rows = database.execute("SELECT number FROM cases ORDER BY number").fetchall()
+        cases = []
+        for (number,) in rows:
+            sends = database.execute(
+                "SELECT data, is_truncated FROM steps WHERE test_case_index = ? AND type = 'send'", [number]
+            ).fetchall()
+            # 前置/后置数据包以完整的数据帧记录，变异数据包是以协议 id 0x32 开头的 S7 数据
+            fuzzed = [(bytes(data), truncated) for data, truncated in sends if data and bytes(data[:1]) == b"\x32"]
+            if fuzzed and not fuzzed[-1][1]:
+                cases.append(ReplayCase(number, fuzzed[-1][0]))
+            elif index is not None and 1 <= number <= index.total:
+                cases.append(ReplayCase(number, index.render(number)))
+        return cases
+    finally:
+        database.close()
+
+
+class S7Replayer:
+    """
+    按默认会话的前置数据包顺序重放测试用例并检测故障。
+
+    :param host: 目标 ip。
+    :param port: 目标端口。
+    :param function: 用例所属的功能名称，决定前置/后置数据包。
+    :param interval: 相邻两次重放之间的间隔（秒），0 表示不停顿。
+    :param repeat: 每个用例最多重放的次数，复现后不再重复。
+    :param timeout: 等待应答的超时（秒）。
+    :param recover_timeout: 复现故障后等待目标恢复的最长时间（秒）。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        function: str,
+        interval: float = 0.0,
+        repeat: int = 1,
+        timeout: float = 1.0,
+        recover_timeout: float = 10.0,
+    ):
+        self.host = host
+        self.port = port
+        # 会话中的 Request 名称，例如 setup_communication 对应 set_up_communication
+        self.request_name = S7CaseIndex.from_function(function).template.name
+        self.interval = interval
+        self.repeat = repeat
+        self.timeout = timeout
+        self.recover_timeout = recover_timeout
+        self.frame_cache = S7FrameCache()
+
+    def _connection(self) -> S7CommunicationSocketConnection:
+        connection = S7CommunicationSocketConnection(
+            self.host, self.port, send_timeout=self.timeout, recv_timeout=self.timeout
+        )
+        connection.open()
+        return connection
+
+    @staticmethod
+    def _recv_frame(connection, reassembler: TPKTReassembler) -> bytes:
+        while True:
+            chunk = connection.recv(RECV_MAX_BYTES)
+            if not chunk:
+                return b""
+            frames = reassembler.feed(chunk)
+            if frames:
+                return bytes(frames[0])
+
+    def probe(self) -> bool:
+        """
+        目标是否存活：能够建立 COTP 连接与通信，并收到成功的应答。
+        """
+        try:
+            connection = self._connection()
+        except _CONNECTION_ERRORS:
+            return False
+        reassembler = TPKTReassembler()
+        try:
+            connection.send_frame(self.frame_cache.connect_request())
+            if classify(self._recv_frame(connection, reassembler)).kind != "cc":
+                return False
+            connection.send_frame(self.frame_cache.get("setup_communication"))
+            return classify(self._recv_frame(connection, reassembler)).ok
+        except _CONNECTION_ERRORS:
+            return False
+        finally:
+            connection.close()
+
+    def wait_alive(self) -> bool:
+        """
+        等待目标恢复，最多等待 recover_timeout 秒。
+        """
+        deadline = time.monotonic() + self.recover_timeout
+        while True:
+            if self.probe():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.2)
+
+    def send_case(self, data: bytes) -> tuple[str, str | None]:
+        """
+        按 cr_tpdu 的顺序发送一个用例：CR TPDU、前置数据包、变异数据包，接收应答后发送后置数据包。
+
+        :return: (原因, 应答的分类结果)，原因为 ok、no_reply 或 connection_reset。
+        """
+        try:
+            connection = self._connection()
+        except _CONNECTION_ERRORS:
+            return "connection_reset", None
+        try:
+            prologue = self.frame_cache.prologue(self.request_name)
+            connection.send_frame(self.frame_cache.connect_request())
+            for frame in prologue:
+                connection.send_frame(frame)
+            connection.send_frame(S7CommunicationSocketConnection.frame(data, "DT Data"))
+            # 与 cr_tpdu 相同，发送前置数据包时不等待应答；CC 与前置数据包的应答之后才是变异数据包的应答
+            reassembler = TPKTReassembler()
+            expected = len(prologue) + 2
+            frames = []
+            while len(frames) < expected:
+                chunk = connection.recv(RECV_MAX_BYTES)
+                if not chunk:
+                    break
+                frames += reassembler.feed(chunk)
+            if len(frames) < expected:
+                return "no_reply", str(classify(frames[-1])) if frames else None
+            for frame in self.frame_cache.epilogue(self.request_name):
+                connection.send_frame(frame)
+            return "ok", str(classify(frames[-1]))
+        except _CONNECTION_ERRORS:
+            return "connection_reset", None
+        finally:
+            connection.close()
+
+    def replay(self, cases: list[ReplayCase]) -> list[ReplayResult]:
+        """
+        依次重放测试用例。
+
+        :param cases: 待重放的测试用例。
+        :return: 每个用例的重放结果。
+        """
+        results = []
+        alive = True
+        for replay_case in cases:
+            if not alive:
+                alive = self.wait_alive()
+                if not alive:
+                    results.append(ReplayResult(replay_case.case, False, "skipped"))
+                    continue
+            started = time.perf_counter()
+            result = ReplayResult(replay_case.case, False, "ok")
+            for attempt in range(1, self.repeat + 1):
+                if self.interval and (results or attempt > 1):
+                    time.sleep(self.interval)
+                reason, response = self.send_case(replay_case.data)
+                if reason == "ok" and not self.probe():
+                    reason = "target_down"
+                result = ReplayResult(replay_case.case, reason != "ok", reason, response, attempt)
+                if result.reproduced:
+                    alive = False
+                    break
+            result.elapsed = time.perf_counter() - started
+            results.append(result)
+        return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="重放 S7 测试用例并检测哪些用例能够复现故障")
+    parser.add_argument("host")
+    parser.add_argument("port", type=int)
+    parser.add_argument("function", choices=list(FUZZABLE_FIELD_COUNTS))
+    parser.add_argument("--fuzzable", default=None, help="变异规则，例如 00000001，默认为生成器的默认规则")
+    parser.add_argument("--cases", default=None, help="测试用例编号，例如 5,10-20")
+    parser.add_argument("--corpus", default=None, help="从语料文件中取出测试用例")
+    parser.add_argument("--run-log", default=None, help="从 boofuzz 运行日志中取出失败的测试用例")
+    parser.add_argument("--payload", action="append", default=[], help="十六进制表示的原始 S7 数据，可以指定多次")
+    parser.add_argument("--interval", type=float, default=0.0, help="相邻两次重放之间的间隔（秒）")
+    parser.add_argument("--repeat", type=int, default=1, help="每个用例最多重放的次数")
+    parser.add_argument("--timeout", type=float, default=1.0, help="等待应答的超时（秒）")
+    parser.add_argument("--json", dest="json_path", default=None, help="把结果写入 json 文件")
+    args = parser.parse_args(argv)
+
+    fuzzable_list = None if args.fuzzable is None else [c == "1" for c in args.fuzzable]
+    indexes = parse_cases(args.cases) if args.cases else None
+    if args.corpus:
+        try:
+            cases = cases_from_corpus(args.corpus, indexes, args.function, fuzzable_list)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.run_log:
+        cases = cases_from_run_log(args.run_log, args.function, fuzzable_list)
+    elif indexes:
+        cases = cases_from_indexes(args.function, fuzzable_list, indexes)
+    else:
+        cases = []
+    cases += [ReplayCase(None, bytes.fromhex(payload)) for payload in args.payload]
+    if not cases:
+        parser.error("没有需要重放的测试用例")
+
+    replayer = S7Replayer(args.host, args.port, args.function, args.interval, args.repeat, args.timeout)
+    results = replayer.replay(cases)
+    for result in results:
+        flag = "复现" if result.reproduced else "未复现"
+        print(f"{result.case!s:>10}  {flag:<4}  {result.reason:<16}  {result.response or ''}")
+    print(f"共重放 {len(results)} 个测试用例，复现 {sum(result.reproduced for result in results)} 个")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump([asdict(result) for result in results], f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+PLC 应答的流式重组与分类。
+
+boofuzz 每次 recv 得到的是任意切分的字节块：一个块里可能有多个 TPKT 帧，一个帧也可能跨越多个块。
+TPKTReassembler 按 TPKT 长度字段把字节流切分为完整的帧，同一个块内的帧以 memoryview 切片返回而不复制；
+classify 按固定偏移从帧中取出 S7 首部的 ROSCTR、pdu 引用以及错误类别/错误码，不依赖 scapy。
+"""
+import struct
+from dataclasses import dataclass
+
+_TPKT_HEADER = struct.Struct("!BBH")
+# TPKT(4) + COTP DT(3) 首部长度
+S7_OFFSET = 7
+
+ERROR_CLASSES = {
+    0x00: "no error",
+    0x81: "application relationship",
+    0x82: "object definition",
+    0x83: "no resources available",
+    0x84: "error on service processing",
+    0x85: "error on supplies",
+    0x87: "access error",
+}
+_ROSCTR_KINDS = {0x01: "job", 0x02: "ack", 0x03: "ack_data", 0x07: "userdata"}
+_COTP_KINDS = {0xE0: "cr", 0xD0: "cc", 0x80: "dr", 0xC0: "dc", 0x70: "er"}
+
+
+class TPKTReassembler:
+    """
+    TPKT 字节流重组器。
+
+    :param max_frame: 允许的最大帧长度，TPKT 长度字段最大为 65535。
+    """
+
+    def __init__(self, max_frame: int = 65535):
+        self.max_frame = max_frame
+        self._pending = bytearray()
+        self.frames = 0
+        self.errors = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        尚未组成完整帧的字节数。
+        """
+        return len(self._pending)
+
+    def reset(self):
+        """
+        丢弃未完成的帧，在重新建立连接时调用。
+        """
+        self._pending.clear()
+
+    def feed(self, chunk: bytes) -> list:
+        """
+        输入一个接收到的字节块，返回其中所有完整的帧。
+
+        同一个块内的帧为 chunk 的 memoryview 切片（零拷贝）；跨块的帧在内部缓冲区中拼接后以 bytes 返回。
+        遇到无效的 TPKT 首部时丢弃缓冲区中剩余的数据并计入 errors。
+
+        :param chunk: 本次接收到的数据。
+        :return: 完整的帧列表。
+        """
+        frames = []
+        view = memoryview(chunk)
+        offset = 0
+        if self._pending:
+            # 先补全上一个块遗留的帧
+            need = self._missing()
+            while need and offset < len(view):
+                take = min(need, len(view) - offset)
+                self._pending += view[offset:offset + take]
+                offset += take
+                need = self._missing()
+            if need is None:
+                self._drop()
+                return frames
+            if need:
+                return frames
+            frames.append(bytes(self._pending))
+            self.frames += 1
+            self._pending.clear()
+
+        end = len(view)
+        while end - offset >= _TPKT_HEADER.size:
+            version, _, length = _TPKT_HEADER.unpack_from(view, offset)
+            if version != 3 or not S7_OFFSET <= length <= self.max_frame:
+                self._drop()
+                return frames
+            if end - offset < length:
+                break
+            frames.append(view[offset:offset + length])
+            self.frames += 1
+            offset += length
+        if offset < end:
+            self._pending += view[offset:]
+        return frames
+
+    def _missing(self) -> int | None:
+        # 当前缓冲的帧还缺少的字节数，首部无效时返回 None
+        if len(self._pending) < _TPKT_HEADER.size:
+            return _TPKT_HEADER.size - len(self._pending)
+        version, _, length = _TPKT_HEADER.unpack_from(self._pending)
+        if version != 3 or not S7_OFFSET <= length <= self.max_frame:
+            return None
+        return length - len(self._pending)
+
+    def _drop(self):
+        self.errors += 1
+        self._pending.clear()
+
+
+@dataclass(frozen=True)
+class S7Response:
+    """
+    一个应答帧的分类结果。
+
+    :param kind: 帧类型：job、ack、ack_data、userdata、cc、dr 等，无法识别时为 invalid。
+    :param rosctr: S7 首部的 ROSCTR，非 S7 帧为 None。
+    :param pdu_reference: S7 首部的 pdu 引用。
+    :param error_class: 错误类别。Ack/Ack_Data 取自首部，Userdata 取自参数中的错误码高字节。
+    :param error_code: 错误码。
+    """
+    kind: str
+    rosctr: int | None = None
+    pdu_reference: int | None = None
+    error_class: int | None = None
+    error_code: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.kind not in ("invalid", "dr", "er") and not self.error_class and not self.error_code
+
+    @property
+    def error(self) -> int:
+        """
+        错误类别与错误码组合成的 16 位错误号，例如 0x8104。
+        """
+        return ((self.error_class or 0) << 8) | (self.error_code or 0)
+
+    def __str__(self):
+        if self.error_class is None:
+            return self.kind
+        name = ERROR_CLASSES.get(self.error_class, "unknown")
+        return f"{self.kind} error=0x{self.error:04x} ({name})"
+
+
+INVALID = S7Response("invalid")
+
+
+def classify(frame) -> S7Response:
+    """
+    按固定偏移解析一个完整的 TPKT 帧。
+
+    :param frame: bytes、bytearray 或 memoryview。
+    """
+    if len(frame) < S7_OFFSET - 1 or frame[0] != 3:
+        return INVALID
+    pdu_type = frame[5] & 0xF0
+    if pdu_type != 0xF0:
+        return S7Response(_COTP_KINDS.get(pdu_type, "invalid"))
+    if len(frame) < S7_OFFSET + 10 or frame[S7_OFFSET] != 0x32:
+        return INVALID
+    rosctr = frame[S7_OFFSET + 1]
+    kind = _ROSCTR_KINDS.get(rosctr, "invalid")
+    pdu_reference = (frame[S7_OFFSET + 4] << 8) | frame[S7_OFFSET + 5]
+    if rosctr in (0x02, 0x03):
+        if len(frame) < S7_OFFSET + 12:
+            return INVALID
+        return S7Response(kind, rosctr, pdu_reference, frame[S7_OFFSET + 10], frame[S7_OFFSET + 11])
+    if rosctr == 0x07:
+        # Userdata 应答的参数为 12 字节，最后两个字节为错误码
+        parameter_length = (frame[S7_OFFSET + 6] << 8) | frame[S7_OFFSET + 7]
+        if parameter_length >= 12 and len(frame) >= S7_OFFSET + 10 + 12:
+            return S7Response(kind, rosctr, pdu_reference, frame[S7_OFFSET + 20], frame[S7_OFFSET + 21])
+    return S7Response(kind, rosctr, pdu_reference)
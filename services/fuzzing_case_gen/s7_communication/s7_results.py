@@ -0,0 +1,341 @@
+"""
+列式、只追加的测试用例结果存储。
+
+boofuzz 的 sqlite 日志在高速率下写入缓慢，事后查询也很慢。ResultsStore 为每个测试用例追加一条定长记录：
+用例编号、字段、变异哈希、发送/接收时间、应答签名以及连接结果。记录按列存放：每个段（segment）是一个目录，
+每一列是一个定长数组文件，先在内存中缓冲，每 batch_size 条批量追加到各列文件末尾；
+一个段写满 segment_records 条后开始新的段。字段名称经过字典编码，只在记录中保存 4 字节的编号。
+
+查询按列扫描：只读取条件涉及的列（安装了 numpy 时以 memmap 方式向量化过滤），再取出匹配记录的其它列，
+例如 store.select(field="read_var.*.address", outcome="timeout") 找出 address 字段上所有超时的用例。
+
+目录结构：
+
+1. fields.json：字段名称字典，下标即字段编号；
+2. segment-000001/：case.u64、field.u32、mutation.u64、send.f64、recv.f64、signature.u64、outcome.u8。
+"""
+import fnmatch
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，没有安装时逐条扫描
+    np = None
+
+# 列名 -> array 类型码（均为小端定长）
+COLUMNS = {
+    "case": "Q",
+    "field": "I",
+    "mutation": "Q",
+    "send": "d",
+    "recv": "d",
+    "signature": "Q",
+    "outcome": "B",
+}
+_NUMPY_TYPES = {"Q": "<u8", "I": "<u4", "d": "<f8", "B": "u1"}
+_EXTENSIONS = {"Q": "u64", "I": "u32", "d": "f64", "B": "u8"}
+# 连接结果：正常应答、错误应答（S7 错误码或断开连接请求）、无法解析的应答、超时、连接被重置
+OUTCOMES = ("ok", "error", "invalid", "timeout", "reset")
+_FIELDS_FILE = "fields.json"
+
+
+def mutation_hash(data: bytes) -> int:
+    """
+    变异数据的 64 位哈希。
+    """
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+@dataclass
+class ResultRecord:
+    """
+    一个测试用例的结果。
+
+    :param case: 测试用例编号。
+    :param field: 被变异字段的 qualified name，同时变异多个字段时以逗号分隔。
+    :param mutation: 变异数据的 64 位哈希。
+    :param send: 发送时间（time.time()）。
+    :param recv: 收到应答的时间，没有应答时为 None。
+    :param signature: 应答签名的十六进制摘要，没有应答时为 None。
+    :param outcome: 连接结果，取值见 OUTCOMES。
+    """
+    case: int
+    field: str
+    mutation: int
+    send: float
+    recv: float | None
+    signature: str | None
+    outcome: str
+
+
+def _column_file(segment: str, column: str) -> str:
+    return os.path.join(segment, f"{column}.{_EXTENSIONS[COLUMNS[column]]}")
+
+
+class ResultsStore:
+    """
+    列式结果存储。
+
+    :param path: 存储目录，不存在时自动创建；已有数据时在其后追加。
+    :param batch_size: 缓冲多少条记录后批量写入。
+    :param segment_records: 每个段最多保存的记录数。
+    """
+
+    def __init__(self, path: str, batch_size: int = 4096, segment_records: int = 1 << 22):
+        self.path = path
+        self.batch_size = batch_size
+        self.segment_records = segment_records
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        fields_file = os.path.join(path, _FIELDS_FILE)
+        self.fields: list[str] = []
+        if os.path.exists(fields_file):
+            with open(fields_file, encoding="utf-8") as f:
+                self.fields = json.load(f)
+        self._field_ids = {name: i for i, name in enumerate(self.fields)}
+        self._fields_dirty = False
+        self._buffer = {column: array(code) for column, code in COLUMNS.items()}
+        self._segment_count = self._segment_size(self.segments()[-1]) if self.segments() else 0
+
+    def segments(self) -> list[str]:
+        """
+        按顺序排列的段目录。
+        """
+        names = sorted(name for name in os.listdir(self.path) if name.startswith("segment-"))
+        return [os.path.join(self.path, name) for name in names]
+
+    @staticmethod
+    def _segment_size(segment: str) -> int:
+        return os.path.getsize(_column_file(segment, "case")) // 8
+
+    def __len__(self):
+        with self._lock:
+            return sum(self._segment_size(segment) for segment in self.segments()) + len(self._buffer["case"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _field_id(self, field: str) -> int:
+        field_id = self._field_ids.get(field)
+        if field_id is None:
+            field_id = self._field_ids[field] = len(self.fields)
+            self.fields.append(field)
+            self._fields_dirty = True
+        return field_id
+
+    def append(
+        self,
+        case: int,
+        field: str,
+        mutation: int,
+        send: float,
+        recv: float | None,
+        signature: str | None,
+        outcome: str,
+    ):
+        """
+        追加一条记录，缓冲区满时批量写入。参数含义见 ResultRecord。
+
+        :raises ValueError: 未知的连接结果。
+        """
+        if outcome not in OUTCOMES:
+            raise ValueError(f"未知的连接结果 {outcome}")
+        with self._lock:
+            buffer = self._buffer
+            buffer["case"].append(case)
+            buffer["field"].append(self._field_id(field))
+            buffer["mutation"].append(mutation)
+            buffer["send"].append(send)
+            buffer["recv"].append(math.nan if recv is None else recv)
+            buffer["signature"].append(0 if signature is None else int(signature, 16))
+            buffer["outcome"].append(OUTCOMES.index(outcome))
+            if len(buffer["case"]) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        """
+        把缓冲区中的记录写入段文件。
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+    def _flush(self):
+        if self._fields_dirty:
+            fields_file = os.path.join(self.path, _FIELDS_FILE)
+            with open(fields_file + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.fields, f, ensure_ascii=False)
+            os.replace(fields_file + ".tmp", fields_file)
+            self._fields_dirty = False
+        written = 0
+        pending = len(self._buffer["case"])
+        while written < pending:
+            segments = self.segments()
+            if not segments or self._segment_count >= self.segment_records:
+                segment = os.path.join(self.path, f"segment-{len(segments) + 1:06d}")
+                os.makedirs(segment)
+                self._segment_count = 0
+            else:
+                segment = segments[-1]
+            count = min(pending - written, self.segment_records - self._segment_count)
+            for column, values in self._buffer.items():
+                chunk = values[written:written + count]
+                if sys.byteorder != "little":
+                    chunk.byteswap()
+                with open(_column_file(segment, column), "ab") as f:
+                    chunk.tofile(f)
+            self._segment_count += count
+            written += count
+        for values in self._buffer.values():
+            del values[:]
+
+    def _read(self, segment: str, column: str):
+        filename = _column_file(segment, column)
+        code = COLUMNS[column]
+        if np is not None:
+            if not os.path.getsize(filename):
+                return np.empty(0, dtype=_NUMPY_TYPES[code])
+            return np.memmap(filename, dtype=_NUMPY_TYPES[code], mode="r")
+        values = array(code)
+        with open(filename, "rb") as f:
+            values.frombytes(f.read())
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+    def _matching_fields(self, field: str) -> set[int]:
+        # 支持 qualified name 或通配符，例如 read_var.*.address
+        return {i for i, name in enumerate(self.fields) if name == field or fnmatch.fnmatchcase(name, field)}
+
+    def _scan(self, field, outcome, case_range, signature, after) -> Iterator[tuple[str, list[int]]]:
+        """
+        依次产生 (段目录, 该段中匹配记录的下标)。
+        """
+        self.flush()
+        field_ids = None if field is None else self._matching_fields(field)
+        outcome_ids = None
+        if outcome is not None:
+            outcomes = [outcome] if isinstance(outcome, str) else list(outcome)
+            outcome_ids = {OUTCOMES.index(name) for name in outcomes}
+        signature_value = None if signature is None else int(signature, 16)
+        for segment in self.segments():
+            if np is not None:
+                mask = np.ones(self._segment_size(segment), dtype=bool)
+                if field_ids is not None:
+                    mask &= np.isin(self._read(segment, "field"), list(field_ids))
+                if outcome_ids is not None:
+                    mask &= np.isin(self._read(segment, "outcome"), list(outcome_ids))
+                if case_range is not None:
+                    cases = self._read(segment, "case")
+                    mask &= (cases >= case_range[0]) & (cases <= case_range[1])
+                if signature_value is not None:
+                    mask &= self._read(segment, "signature") == np.uint64(signature_value)
+                if after is not None:
+                    mask &= self._read(segment, "send") >= after
+                yield segment, np.flatnonzero(mask).tolist()
+                continue
+            columns = {}
+            conditions = []
+            if field_ids is not None:
+                columns["field"] = self._read(segment, "field")
+                conditions.append(lambda i: columns["field"][i] in field_ids)
+            if outcome_ids is not None:
+                columns["outcome"] = self._read(segment, "outcome")
+                conditions.append(lambda i: columns["outcome"][i] in outcome_ids)
+            if case_range is not None:
+                columns["case"] = self._read(segment, "case")
+                conditions.append(lambda i: case_range[0] <= columns["case"][i] <= case_range[1])
+            if signature_value is not None:
+                columns["signature"] = self._read(segment, "signature")
+                conditions.append(lambda i: columns["signature"][i] == signature_value)
+            if after is not None:
+                columns["send"] = self._read(segment, "send")
+                conditions.append(lambda i: columns["send"][i] >= after)
+            indexes = range(self._segment_size(segment))
+            yield segment, [i for i in indexes if all(condition(i) for condition in conditions)]
+
+    def count(
+        self,
+        field: str | None = None,
+        outcome: str | list[str] | None = None,
+        case_range: tuple[int, int] | None = None,
+        signature: str | None = None,
+        after: float | None = None,
+    ) -> int:
+        """
+        满足条件的记录数，参数含义见 select。
+        """
+        return sum(len(indexes) for _, indexes in self._scan(field, outcome, case_range, signature, after))
+
+    def select(
+        self,
+        field: str | None = None,
+        outcome: str | list[str] | None = None,
+        case_range: tuple[int, int] | None = None,
+        signature: str | None = None,
+        after: float | None = None,
+        limit: int | None = None,
+    ) -> list[ResultRecord]:
+        """
+        查询满足所有条件的记录。
+
+        :param field: 字段的 qualified name 或通配符，例如 read_var.*.address。
+        :param outcome: 一个或多个连接结果，例如 timeout。
+        :param case_range: 用例编号区间（两端均包含）。
+        :param signature: 应答签名的十六进制摘要。
+        :param after: 只查询该时间之后发送的用例。
+        :param limit: 最多返回的记录数。
+        """
+        records = []
+        for segment, indexes in self._scan(field, outcome, case_range, signature, after):
+            if not indexes:
+                continue
+            if limit is not None:
+                indexes = indexes[:limit - len(records)]
+            columns = {column: self._read(segment, column) for column in COLUMNS}
+            for i in indexes:
+                recv = float(columns["recv"][i])
+                signature_value = int(columns["signature"][i])
+                records.append(ResultRecord(
+                    case=int(columns["case"][i]),
+                    field=self.fields[int(columns["field"][i])],
+                    mutation=int(columns["mutation"][i]),
+                    send=float(columns["send"][i]),
+                    recv=None if math.isnan(recv) else recv,
+                    signature=None if not signature_value else f"{signature_value:016x}",
+                    outcome=OUTCOMES[int(columns["outcome"][i])],
+                ))
+            if limit is not None and len(records) >= limit:
+                break
+        return records
+
+
+def outcome(responses: list, connection_lost: bool = False) -> str:
+    """
+    根据一个测试用例应答的分类结果判断连接结果。
+
+    :param responses: 应答中各帧的 S7Response。
+    :param connection_lost: 收发时连接是否被重置或中止。
+    """
+    if connection_lost:
+        return "reset"
+    if not responses:
+        return "timeout"
+    if any(response.kind == "invalid" for response in responses):
+        return "invalid"
+    if not all(response.ok for response in responses):
+        return "error"
+    return "ok"
@@ -0,0 +1,228 @@
+"""
+环形缓冲日志。
+
+在应答很快的目标上，boofuzz 为每个测试用例把完整的发送、接收数据写入 sqlite 和文本日志，占用了相当一部分单个用例的耗时。
+RingBufferLogger 只在内存中保留最近 slots 个测试用例的完整记录：每个用例占用一个预先分配的定长槽位，
+发送、接收的数据以及日志信息按 [类型 1 字节][长度 4 字节][数据] 依次复制到槽位中，超出槽位大小的部分被截断，
+因此单个用例的开销与内存占用都有上界。正常情况下只累加计数；出现失败、错误、超时（收到空应答）
+或者会话报告新颖的应答签名时，在该用例结束后把尚未写出的用例写入 dump_dir 下的一个 json 文件。
+"""
+import json
+import os
+import struct
+import time
+from array import array
+
+from boofuzz.ifuzz_logger import IFuzzLogger
+
+# 槽位中的事件类型
+SEND = 1
+RECV = 2
+INFO = 3
+STEP = 4
+CHECK = 5
+FAIL = 6
+ERROR = 7
+_EVENT_NAMES = {SEND: "send", RECV: "recv", INFO: "info", STEP: "step", CHECK: "check", FAIL: "fail", ERROR: "error"}
+_EVENT_HEADER = struct.Struct("<BI")
+
+
+class RingBufferLogger(IFuzzLogger):
+    """
+    只在发生异常时写盘的环形缓冲日志。
+
+    :param dump_dir: 写出环形缓冲的目录，第一次写出时创建。
+    :param slots: 保留的最近测试用例数。
+    :param slot_bytes: 每个测试用例最多记录的字节数，包括每个事件 5 字节的首部。
+    """
+
+    def __init__(self, dump_dir: str, slots: int = 256, slot_bytes: int = 4096):
+        if slots < 1 or slot_bytes < _EVENT_HEADER.size:
+            raise ValueError(f"环形缓冲大小 {slots} x {slot_bytes} 不合法")
+        self.dump_dir = dump_dir
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        # 所有槽位共用一块预先分配的内存
+        self._buffer = bytearray(slots * slot_bytes)
+        self._view = memoryview(self._buffer)
+        self._used = array("I", [0]) * slots
+        self._truncated = array("B", [0]) * slots
+        self._indexes = array("q", [0]) * slots
+        self._opened = array("d", [0.0]) * slots
+        self._names: list[str] = [""] * slots
+        # 已打开的测试用例总数，当前用例位于 (_sequence - 1) % slots；_dumped 为已写出的用例数
+        self._sequence = 0
+        self._dumped = 0
+        self._slot = -1
+        self._pending: str | None = None
+        self.counters = {
+            "cases": 0,
+            "sends": 0,
+            "recvs": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "timeouts": 0,
+            "failures": 0,
+            "errors": 0,
+            "truncated": 0,
+            "dumps": 0,
+        }
+        # 日志方法内累计的耗时（纳秒），用于衡量单个用例的日志开销
+        self._elapsed_ns = 0
+
+    def _append(self, kind: int, data) -> None:
+        slot = self._slot
+        if slot < 0:
+            return
+        used = self._used[slot]
+        start = slot * self.slot_bytes + used
+        room = self.slot_bytes - used - _EVENT_HEADER.size
+        if room < 0:
+            self._truncated[slot] = 1
+            return
+        length = len(data)
+        if length > room:
+            length = room
+            self._truncated[slot] = 1
+        _EVENT_HEADER.pack_into(self._buffer, start, kind, length)
+        start += _EVENT_HEADER.size
+        self._view[start:start + length] = memoryview(data)[:length]
+        self._used[slot] = used + _EVENT_HEADER.size + length
+
+    def _text(self, kind: int, description) -> None:
+        started = time.perf_counter_ns()
+        self._append(kind, str(description).encode("utf-8"))
+        self._elapsed_ns += time.perf_counter_ns() - started
+
+    def trigger(self, reason: str):
+        """
+        要求在当前测试用例结束后写出环形缓冲，同一个用例中只保留第一个原因。
+
+        :param reason: 写出的原因，例如 novel。
+        """
+        if self._pending is None:
+            self._pending = reason
+
+    def open_test_case(self, test_case_id, name, index, *args, **kwargs):
+        started = time.perf_counter_ns()
+        slot = self._slot = self._sequence % self.slots
+        self._sequence += 1
+        if self._sequence - self._dumped > self.slots:
+            # 覆盖了尚未写出的最旧用例
+            self._dumped = self._sequence - self.slots
+        self._used[slot] = 0
+        self._truncated[slot] = 0
+        self._indexes[slot] = index if isinstance(index, int) else -1
+        self._opened[slot] = time.time()
+        self._names[slot] = name
+        self.counters["cases"] += 1
+        self._elapsed_ns += time.perf_counter_ns() - started
+
+    def open_test_step(self, description):
+        self._text(STEP, description)
+
+    def log_send(self, data):
+        started = time.perf_counter_ns()
+        self.counters["sends"] += 1
+        self.counters["bytes_sent"] += len(data)
+        self._append(SEND, data)
+        self._elapsed_ns += time.perf_counter_ns() - started
+
+    def log_recv(self, data):
+        started = time.perf_counter_ns()
+        self.counters["recvs"] += 1
+        if data:
+            self.counters["bytes_received"] += len(data)
+        else:
+            self.counters["timeouts"] += 1
+            self.trigger("timeout")
+        self._append(RECV, data or b"")
+        self._elapsed_ns += time.perf_counter_ns() - started
+
+    def log_info(self, description):
+        self._text(INFO, description)
+
+    def log_check(self, description):
+        self._text(CHECK, description)
+
+    def log_pass(self, description=""):
+        pass
+
+    def log_fail(self, description=""):
+        self.counters["failures"] += 1
+        self.trigger("failure")
+        self._text(FAIL, description)
+
+    def log_error(self, description):
+        self.counters["errors"] += 1
+        self.trigger("error")
+        self._text(ERROR, description)
+
+    def close_test_case(self):
+        if self._slot >= 0 and self._truncated[self._slot]:
+            self.counters["truncated"] += 1
+        if self._pending is not None:
+            self.dump(self._pending)
+        self._slot = -1
+
+    def close_test(self):
+        if self._pending is not None:
+            self.dump(self._pending)
+
+    def cases(self) -> list[dict]:
+        """
+        尚未写出的测试用例，按时间顺序排列。
+        """
+        records = []
+        for sequence in range(max(self._dumped, self._sequence - self.slots), self._sequence):
+            slot = sequence % self.slots
+            base = slot * self.slot_bytes
+            events = []
+            position = 0
+            while position < self._used[slot]:
+                kind, length = _EVENT_HEADER.unpack_from(self._buffer, base + position)
+                position += _EVENT_HEADER.size
+                data = bytes(self._view[base + position:base + position + length])
+                position += length
+                if kind in (SEND, RECV):
+                    events.append({"type": _EVENT_NAMES[kind], "data": data.hex()})
+                else:
+                    events.append({"type": _EVENT_NAMES[kind], "description": data.decode("utf-8", "replace")})
+            records.append({
+                "index": self._indexes[slot],
+                "name": self._names[slot],
+                "timestamp": self._opened[slot],
+                "truncated": bool(self._truncated[slot]),
+                "events": events,
+            })
+        return records
+
+    def dump(self, reason: str) -> str | None:
+        """
+        把尚未写出的测试用例写入 dump_dir，没有需要写出的用例时返回 None。
+
+        :param reason: 写出的原因：failure、error、timeout、novel 等。
+        :return: 写出的文件路径。
+        """
+        self._pending = None
+        cases = self.cases()
+        if not cases:
+            return None
+        os.makedirs(self.dump_dir, exist_ok=True)
+        self.counters["dumps"] += 1
+        filename = os.path.join(self.dump_dir, f"ring-{self.counters['dumps']:06d}-{reason}.json")
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump({"reason": reason, "cases": cases}, f, ensure_ascii=False)
+        self._dumped = self._sequence
+        return filename
+
+    def stats(self) -> dict:
+        """
+        计数器以及每个测试用例在日志方法内的平均耗时（微秒）。
+        """
+        cases = self.counters["cases"]
+        return {
+            **self.counters,
+            "overhead_us": self._elapsed_ns / cases / 1000 if cases else 0.0,
+            "memory_bytes": len(self._buffer),
+        }
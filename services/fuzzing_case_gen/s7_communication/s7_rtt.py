@@ -0,0 +1,119 @@
+"""
+自适应接收超时。
+
+固定 5 秒的接收超时意味着 PLC 每丢弃一个变异数据包，就要白白等待 5 秒。RTTEstimator 从正常应答中学习
+目标的往返时延分布，把接收超时设为最近若干个样本的高分位数（同时不低于 SRTT + 4 * RTTVAR）加上余量；
+发生超时后按倍数退避，之后每收到一个应答再逐步恢复，避免目标变慢时把应答误判为无应答。
+样本不足时使用初始超时，因此在学习到时延分布之前不会漏判。
+"""
+import bisect
+import math
+from collections import deque
+
+
+class RTTEstimator:
+    """
+    往返时延估计器。
+
+    :param initial: 样本不足时使用的超时（秒）。
+    :param minimum: 超时的下限（秒）。
+    :param maximum: 超时的上限（秒），退避后也不会超过该值。
+    :param percentile: 采用的时延分位数。
+    :param margin: 在分位数之上增加的余量（秒）。
+    :param window: 计算分位数的最近样本数。
+    :param min_samples: 开始自适应所需的样本数。
+    :param backoff: 每次超时后超时乘以的倍数。
+    """
+
+    def __init__(
+        self,
+        initial: float = 5.0,
+        minimum: float = 0.05,
+        maximum: float = 5.0,
+        percentile: float = 99.0,
+        margin: float = 0.05,
+        window: int = 512,
+        min_samples: int = 16,
+        backoff: float = 2.0,
+    ):
+        if not 0 < minimum <= maximum:
+            raise ValueError(f"超时范围 [{minimum}, {maximum}] 不合法")
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.backoff_factor = backoff
+        self._window: deque[float] = deque(maxlen=window)
+        self._sorted: list[float] = []
+        # RFC 6298 的平滑往返时延及其偏差
+        self.srtt: float | None = None
+        self.rttvar = 0.0
+        self.backoff = 1.0
+        self.samples = 0
+        self.timeouts = 0
+        self.min_rtt = math.inf
+        self.max_rtt = 0.0
+
+    def observe(self, rtt: float):
+        """
+        记录一个正常应答的往返时延（秒），并逐步恢复退避。
+        """
+        if len(self._window) == self._window.maxlen:
+            oldest = self._window[0]
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._window.append(rtt)
+        bisect.insort(self._sorted, rtt)
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.samples += 1
+        self.min_rtt = min(self.min_rtt, rtt)
+        self.max_rtt = max(self.max_rtt, rtt)
+        self.backoff = max(1.0, self.backoff / self.backoff_factor)
+
+    def timed_out(self):
+        """
+        记录一次接收超时，下一次的超时按倍数退避。
+        """
+        self.timeouts += 1
+        self.backoff = min(self.backoff * self.backoff_factor, self.maximum / self.minimum)
+
+    def quantile(self, percentile: float) -> float | None:
+        """
+        最近样本的分位数，没有样本时为 None。
+        """
+        if not self._sorted:
+            return None
+        rank = min(len(self._sorted) - 1, max(0, math.ceil(percentile / 100 * len(self._sorted)) - 1))
+        return self._sorted[rank]
+
+    def timeout(self) -> float:
+        """
+        当前的接收超时（秒）。
+        """
+        if len(self._window) < self.min_samples:
+            return self.initial
+        base = max(self.quantile(self.percentile), self.srtt + 4 * self.rttvar) + self.margin
+        return min(self.maximum, max(self.minimum, base * self.backoff))
+
+    def stats(self) -> dict:
+        """
+        时延统计：样本数、超时次数、最小/中位/p90/p99/最大时延、SRTT、RTTVAR 以及当前超时与退避倍数。
+        """
+        return {
+            "samples": self.samples,
+            "timeouts": self.timeouts,
+            "min": None if not self.samples else self.min_rtt,
+            "p50": self.quantile(50),
+            "p90": self.quantile(90),
+            "p99": self.quantile(99),
+            "max": None if not self.samples else self.max_rtt,
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "timeout": self.timeout(),
+            "backoff": self.backoff,
+        }
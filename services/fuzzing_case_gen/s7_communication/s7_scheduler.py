@@ -0,0 +1,121 @@
+"""
+应答引导的变异调度。
+
+boofuzz 按声明顺序逐个遍历可变异字段，每个字段的预算固定，与 PLC 的应答无关。
+FieldScheduler 把每个可变异字段的变异值按编号切分为若干个连续的取值区间（臂），
+用 UCB1 在这些臂之间分配预算：产生新的应答签名或连接失败的测试用例得到奖励，
+预算随之向有收获的字段和取值区间倾斜。每个臂内部按编号顺序取用例，任何用例最多执行一次。
+"""
+import math
+from dataclasses import dataclass
+
+from .s7_template import S7RequestTemplate
+
+
+@dataclass
+class Arm:
+    """
+    一个字段的一段取值区间。
+
+    :param field: 字段的 qualified name。
+    :param start: 区间内第一个变异的全局编号（从 1 开始）。
+    :param end: 区间内最后一个变异的全局编号（包含）。
+    :param cursor: 下一个要执行的编号。
+    :param pulls: 已执行的用例数。
+    :param rewards: 累计奖励。
+    """
+    field: str
+    start: int
+    end: int
+    cursor: int = 0
+    pulls: int = 0
+    rewards: float = 0.0
+
+    def __post_init__(self):
+        self.cursor = self.start
+
+    @property
+    def exhausted(self) -> bool:
+        return self.cursor > self.end
+
+    @property
+    def mean(self) -> float:
+        return self.rewards / self.pulls if self.pulls else 0.0
+
+
+class FieldScheduler:
+    """
+    基于 UCB1 的字段/取值区间调度器。
+
+    :param template: 编译后的 Request 模板。
+    :param buckets: 每个字段最多切分的取值区间数。
+    :param exploration: UCB1 的探索系数，越大越倾向于尝试执行次数少的臂。
+    """
+
+    def __init__(self, template: S7RequestTemplate, buckets: int = 8, exploration: float = 1.0):
+        self.exploration = exploration
+        self.arms: list[Arm] = []
+        for k, field_index in enumerate(template.fuzzable_indexes):
+            indexes = template.mutation_range(k)
+            if not indexes:
+                continue
+            size = math.ceil(len(indexes) / buckets)
+            for start in range(indexes.start, indexes.stop, size):
+                end = min(start + size, indexes.stop)
+                # 全局编号从 1 开始，与 total_mutant_index 一致
+                self.arms.append(Arm(template.fields[field_index].name, start + 1, end))
+        self.pulls = 0
+        # 已经取出、尚未反馈的用例编号 -> 臂
+        self._pending: dict[int, Arm] = {}
+
+    def _score(self, arm: Arm) -> float:
+        if not arm.pulls:
+            return math.inf
+        return arm.mean + self.exploration * math.sqrt(2 * math.log(self.pulls) / arm.pulls)
+
+    def next_case(self) -> int | None:
+        """
+        选择下一个要执行的测试用例。未执行过的臂按声明顺序优先。
+
+        :return: 测试用例编号（从 1 开始），所有用例都已执行时返回 None。
+        """
+        candidates = [arm for arm in self.arms if not arm.exhausted]
+        if not candidates:
+            return None
+        arm = max(candidates, key=self._score)
+        case = arm.cursor
+        arm.cursor += 1
+        self._pending[case] = arm
+        return case
+
+    def feedback(self, case: int, reward: float):
+        """
+        反馈一个测试用例的结果。
+
+        :param case: next_case 返回的编号。
+        :param reward: 奖励，产生新的应答签名或连接失败时为 1，否则为 0。
+        """
+        arm = self._pending.pop(case)
+        arm.pulls += 1
+        arm.rewards += reward
+        self.pulls += 1
+
+    def __iter__(self):
+        """
+        不需要反馈时依次取出用例编号，用于预览调度顺序。
+        """
+        while (case := self.next_case()) is not None:
+            self.feedback(case, 0.0)
+            yield case
+
+    def stats(self) -> list[dict]:
+        """
+        按字段汇总的执行次数与奖励，按奖励从多到少排序。
+        """
+        fields: dict[str, dict] = {}
+        for arm in self.arms:
+            row = fields.setdefault(arm.field, {"field": arm.field, "cases": 0, "pulls": 0, "rewards": 0.0})
+            row["cases"] += arm.end - arm.start + 1
+            row["pulls"] += arm.pulls
+            row["rewards"] += arm.rewards
+        return sorted(fields.values(), key=lambda row: row["rewards"], reverse=True)
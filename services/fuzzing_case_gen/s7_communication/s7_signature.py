@@ -0,0 +1,194 @@
+"""
+应答签名去重与新颖性索引。
+
+长时间模糊测试同一个功能会收到大量几乎相同的应答。每个应答被归一化为签名：
+帧类型/ROSCTR、错误类别、错误码、参数中的功能码以及第一个数据项的返回码，
+签名哈希后放入内存索引，记录出现次数以及首次产生该签名的测试用例编号。
+只有新颖的签名才会交给 on_novel 回调完整保存，索引的条目数有上限。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+
+from .s7_response import S7_OFFSET, S7Response, classify
+
+
+@dataclass(frozen=True)
+class ResponseSignature:
+    """
+    应答签名。
+
+    :param kind: classify 得到的帧类型。
+    :param rosctr: S7 首部的 ROSCTR。
+    :param error_class: 错误类别。
+    :param error_code: 错误码。
+    :param function: 参数中的功能码，Userdata 为功能组与子功能组合成的 16 位值。
+    :param return_code: 第一个数据项的返回码，没有数据时为 None。
+    """
+    kind: str
+    rosctr: int | None = None
+    error_class: int | None = None
+    error_code: int | None = None
+    function: int | None = None
+    return_code: int | None = None
+
+    @property
+    def digest(self) -> str:
+        """
+        签名的 64 位哈希，十六进制字符串。
+        """
+        fields = (self.kind, self.rosctr, self.error_class, self.error_code, self.function, self.return_code)
+        return hashlib.blake2b(repr(fields).encode(), digest_size=8).hexdigest()
+
+
+def signature(frame, response: S7Response | None = None) -> ResponseSignature:
+    """
+    计算一个完整 TPKT 帧的签名。
+
+    :param frame: bytes、bytearray 或 memoryview。
+    :param response: 该帧的 classify 结果，已经分类过时传入以避免重复解析。
+    """
+    response = classify(frame) if response is None else response
+    if response.rosctr is None:
+        return ResponseSignature(response.kind)
+    # Ack/Ack_Data 首部 12 字节，其余 10 字节
+    header = 12 if response.rosctr in (0x02, 0x03) else 10
+    parameter = S7_OFFSET + header
+    parameter_length = (frame[S7_OFFSET + 6] << 8) | frame[S7_OFFSET + 7]
+    data = parameter + parameter_length
+    function = None
+    if parameter_length and len(frame) > parameter:
+        function = frame[parameter]
+        if response.rosctr == 0x07 and parameter_length >= 7 and len(frame) >= parameter + 7:
+            # Userdata 参数：类型/功能组在第 6 个字节的低 4 位，子功能在第 7 个字节
+            function = ((frame[parameter + 5] & 0x0F) << 8) | frame[parameter + 6]
+    return_code = frame[data] if len(frame) > data else None
+    return ResponseSignature(
+        response.kind, response.rosctr, response.error_class, response.error_code, function, return_code
+    )
+
+
+@dataclass
+class SignatureEntry:
+    """
+    索引中的一个签名。
+
+    :param signature: 签名。
+    :param digest: 签名的哈希。
+    :param count: 出现次数。
+    :param first_case: 首次产生该签名的测试用例编号。
+    :param last_case: 最近一次产生该签名的测试用例编号。
+    """
+    signature: ResponseSignature
+    digest: str
+    count: int
+    first_case: int
+    last_case: int
+
+    def to_dict(self) -> dict:
+        return dict(asdict(self.signature), digest=self.digest, count=self.count,
+                    first_case=self.first_case, last_case=self.last_case)
+
+
+class SignatureIndex:
+    """
+    一次模糊测试的应答签名索引。
+
+    条目数达到 max_entries 后淘汰最久未出现的签名，被淘汰的签名再次出现时重新视为新颖。
+
+    :param max_entries: 最多保留的签名数。
+    :param on_novel: 出现新颖签名时的回调，参数为 (SignatureEntry, 完整的应答帧 bytes)。
+    """
+
+    def __init__(self, max_entries: int = 4096, on_novel=None):
+        self.max_entries = max_entries
+        self.on_novel = on_novel
+        self._entries: OrderedDict[str, SignatureEntry] = OrderedDict()
+        # API 线程读取时会话线程可能正在写入
+        self._lock = threading.Lock()
+        self.total = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, digest: str):
+        return digest in self._entries
+
+    def observe(self, frame, case_index: int, response: S7Response | None = None) -> SignatureEntry | None:
+        """
+        记录一个应答帧。
+
+        :param frame: 完整的 TPKT 帧。
+        :param case_index: 产生该应答的测试用例编号。
+        :param response: 该帧的 classify 结果。
+        :return: 签名新颖时返回新的条目，否则返回 None。
+        """
+        sig = signature(frame, response)
+        digest = sig.digest
+        with self._lock:
+            self.total += 1
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.count += 1
+                entry.last_case = case_index
+                self._entries.move_to_end(digest)
+                return None
+            entry = SignatureEntry(sig, digest, 1, case_index, case_index)
+            self._entries[digest] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        if self.on_novel is not None:
+            self.on_novel(entry, bytes(frame))
+        return entry
+
+    def entries(self) -> list[SignatureEntry]:
+        """
+        所有签名，按出现次数从多到少排序。
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        return sorted(entries, key=lambda entry: entry.count, reverse=True)
+
+    def summary(self) -> dict:
+        """
+        索引的统计信息以及所有签名，可以直接序列化为 json。
+        """
+        entries = self.entries()
+        return {
+            "total": self.total,
+            "unique": len(entries),
+            "evicted": self.evicted,
+            "max_entries": self.max_entries,
+            "signatures": [entry.to_dict() for entry in entries],
+        }
+
+
+# 当前进程中正在运行的模糊测试的签名索引，键为 run_id，供 API 查询。会话在模糊测试结束时注销，
+# 异常退出未能注销的索引按登记顺序淘汰，最多保留 MAX_RUNS 个
+MAX_RUNS = 64
+_RUNS: OrderedDict[str, SignatureIndex] = OrderedDict()
+_RUNS_LOCK = threading.Lock()
+
+
+def register_run(run_id: str, index: SignatureIndex):
+    with _RUNS_LOCK:
+        _RUNS[run_id] = index
+        _RUNS.move_to_end(run_id)
+        while len(_RUNS) > MAX_RUNS:
+            _RUNS.popitem(last=False)
+
+
+def get_run(run_id: str) -> SignatureIndex | None:
+    return _RUNS.get(run_id)
+
+
+def unregister_run(run_id: str, index: SignatureIndex | None = None):
+    """
+    注销 run_id 的签名索引；给出 index 时只在登记的正是该索引时注销。
+    """
+    with _RUNS_LOCK:
+        if index is None or _RUNS.get(run_id) is index:
+            _RUNS.pop(run_id, None)
@@ -0,0 +1,282 @@
+"""
+S7 数据包字节模板编译器。
+
+boofuzz 每渲染一个测试用例都要遍历整棵 Request/Block 树并重新计算所有 Size 字段。
+这里在模糊测试开始前把 S7CommunicationGenerator 生成的 Request 编译成一份静态字节模板，
+同时记录每个可变异字段的偏移和需要随之修正的长度字段，渲染一个变异只需复制模板再打几个补丁。
+"""
+import bisect
+import struct
+from dataclasses import dataclass
+from typing import Callable
+
+from boofuzz.blocks import Block, Request, Size
+from boofuzz.fuzzable import Fuzzable
+from boofuzz.fuzzable_block import FuzzableBlock
+from boofuzz.mutation_context import MutationContext
+from .s7_gen import S7CommunicationGenerator
+
+# Size 字段的字节数到 struct 格式字符的映射
+_SIZE_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+@dataclass(frozen=True)
+class LengthFixup:
+    """
+    一个需要随变异字段长度变化而修正的 Size 字段。
+
+    :param offset: 长度字段在模板中的偏移。
+    :param packer: 预编译的 struct 对象，用于写回长度值。
+    :param value: 未变异时计算出的长度（已计入 Size 的 offset 与 inclusive）。
+    :param mask: 长度字段能表示的最大值掩码，超出部分与 boofuzz 一样被截断。
+    :param math: Size 字段的 math 函数。
+    """
+    offset: int
+    packer: struct.Struct
+    value: int
+    mask: int
+    math: Callable[[int], int]
+
+
+@dataclass(frozen=True)
+class TemplateField:
+    """
+    模板中的一个叶子字段（原语或 Size）。
+
+    :param name: 字段的 qualified name，例如 read_var.parameter.Block3.address。
+    :param offset: 字段在模板中的偏移。
+    :param length: 字段未变异时的长度。
+    :param primitive: 该字段对应的 boofuzz 原语对象。
+    :param fixups: 该字段长度变化时需要修正的长度字段。
+    """
+    name: str
+    offset: int
+    length: int
+    primitive: Fuzzable
+    fixups: tuple[LengthFixup, ...]
+
+    @property
+    def fuzzable(self) -> bool:
+        return self.primitive.fuzzable
+
+
+class S7RequestTemplate:
+    """
+    编译后的 S7 请求：一份默认字节模板、每个叶子字段的偏移表以及所有变异值的编码结果。
+
+    变异的编号与 boofuzz 遍历 Request.get_mutations() 的顺序一致，从 0 开始。
+    """
+
+    def __init__(self, name: str, template: bytes, fields: tuple[TemplateField, ...], mutations: dict[int, list]):
+        self.name = name
+        self.template = template
+        self.fields = fields
+        # 可变异字段在 fields 中的下标，及其变异值列表
+        self.fuzzable_indexes = tuple(sorted(mutations))
+        self.mutations = tuple(mutations[i] for i in self.fuzzable_indexes)
+        # 每个可变异字段第一个变异的全局编号，最后一项为变异总数
+        self._starts = [0]
+        for values in self.mutations:
+            self._starts.append(self._starts[-1] + len(values))
+
+    @property
+    def num_mutations(self) -> int:
+        """
+        变异总数，与 Request.num_mutations() 相同。
+        """
+        return self._starts[-1]
+
+    def field_index(self, name: str) -> int:
+        """
+        根据 qualified name 或字段名获取字段下标。
+
+        :param name: 字段的 qualified name 或最后一级名称。
+        :raises KeyError: 字段不存在。
+        :return: 字段在 fields 中的下标。
+        """
+        for index, template_field in enumerate(self.fields):
+            if name in (template_field.name, template_field.primitive.name):
+                return index
+        raise KeyError(name)
+
+    def locate(self, mutation_index: int) -> tuple[int, int]:
+        """
+        把全局变异编号转换为 (字段下标, 字段内变异编号)，复杂度 O(log n)。
+
+        :param mutation_index: 全局变异编号，从 0 开始。
+        :raises IndexError: 编号越界。
+        """
+        k, value_index = self._locate(mutation_index)
+        return self.fuzzable_indexes[k], value_index
+
+    def mutation_range(self, k: int) -> range:
+        """
+        第 k 个可变异字段的全局变异编号区间（从 0 开始）。
+
+        :param k: 可变异字段的序号，即在 fuzzable_indexes 中的下标。
+        """
+        return range(self._starts[k], self._starts[k + 1])
+
+    def _locate(self, mutation_index: int) -> tuple[int, int]:
+        if not 0 <= mutation_index < self.num_mutations:
+            raise IndexError(f"变异编号 {mutation_index} 超出范围 [0, {self.num_mutations})")
+        k = bisect.bisect_right(self._starts, mutation_index) - 1
+        return k, mutation_index - self._starts[k]
+
+    def render(self, field_index: int, value: bytes) -> bytearray:
+        """
+        把字段 field_index 替换为已编码的 value，并修正所有覆盖该字段的长度字段。
+
+        :param field_index: 字段在 fields 中的下标。
+        :param value: 已编码的字段值，长度可以与默认值不同。
+        :return: 渲染结果。
+        """
+        template_field = self.fields[field_index]
+        end = template_field.offset + template_field.length
+        buf = bytearray(self.template)
+        buf[template_field.offset:end] = value
+        delta = len(value) - template_field.length
+        if delta:
+            for fixup in template_field.fixups:
+                offset = fixup.offset + delta if fixup.offset >= end else fixup.offset
+                fixup.packer.pack_into(buf, offset, fixup.math(fixup.value + delta) & fixup.mask)
+        return buf
+
+    def render_fields(self, values: dict[int, bytes]) -> bytearray:
+        """
+        同时替换多个字段，长度字段按所有被覆盖字段的长度变化之和修正。
+
+        :param values: 字段下标 -> 已编码的字段值。
+        :return: 渲染结果，只替换一个字段时与 render 相同。
+        """
+        buf = bytearray()
+        position = 0
+        # (字段结束偏移, 长度变化)，用于计算其后长度字段的新位置
+        shifts = []
+        deltas: dict[int, tuple[LengthFixup, int]] = {}
+        for field_index in sorted(values):
+            template_field = self.fields[field_index]
+            value = values[field_index]
+            buf += self.template[position:template_field.offset]
+            buf += value
+            position = template_field.offset + template_field.length
+            delta = len(value) - template_field.length
+            if delta:
+                shifts.append((position, delta))
+                for fixup in template_field.fixups:
+                    deltas[fixup.offset] = (fixup, deltas.get(fixup.offset, (fixup, 0))[1] + delta)
+        buf += self.template[position:]
+        for fixup, delta in deltas.values():
+            offset = fixup.offset + sum(shift for end, shift in shifts if fixup.offset >= end)
+            fixup.packer.pack_into(buf, offset, fixup.math(fixup.value + delta) & fixup.mask)
+        return buf
+
+    def render_mutation(self, mutation_index: int) -> bytearray:
+        """
+        渲染第 mutation_index 个变异，结果与 boofuzz 渲染同一变异时完全一致。
+
+        :param mutation_index: 全局变异编号，从 0 开始。
+        """
+        k, value_index = self._locate(mutation_index)
+        return self.render(self.fuzzable_indexes[k], self.mutations[k][value_index])
+
+    def __iter__(self):
+        """
+        按 boofuzz 的顺序依次渲染所有变异。
+        """
+        for field_index, values in zip(self.fuzzable_indexes, self.mutations):
+            for value in values:
+                yield self.render(field_index, value)
+
+    def __len__(self):
+        return self.num_mutations
+
+
+def _leaves(block: FuzzableBlock):
+    for item in block.stack:
+        if isinstance(item, FuzzableBlock):
+            yield from _leaves(item)
+        else:
+            yield item
+
+
+def fuzzable_leaves(request: Request) -> list[Fuzzable]:
+    """
+    Request 中所有可变异的叶子字段，顺序与 S7RequestTemplate.fuzzable_indexes 一致。不渲染任何字段。
+    """
+    return [leaf for leaf in _leaves(request) if leaf.fuzzable]
+
+
+def _check_supported(request: Request):
+    for item in request.names.values():
+        if isinstance(item, Block) and (item.group or item.encoder or item.dep):
+            raise ValueError(f"无法编译 {item.qualified_name}：不支持带有 group/encoder/dep 的 Block")
+        if isinstance(item, Size):
+            if item.format != "binary" or item.length not in _SIZE_FORMATS:
+                raise ValueError(f"无法编译 {item.qualified_name}：仅支持 1/2/4/8 字节的二进制 Size")
+
+
+def compile_request(request: Request) -> S7RequestTemplate:
+    """
+    把一个 boofuzz Request 编译为字节模板。
+
+    :param request: S7CommunicationGenerator 生成的 Request。
+    :raises ValueError: Request 中含有无法静态编译的结构。
+    :return: 编译后的模板。
+    """
+    _check_supported(request)
+    leaves = list(_leaves(request))
+    offsets = []
+    rendered = bytearray()
+    for leaf in leaves:
+        offsets.append(len(rendered))
+        rendered += leaf.render(MutationContext())
+    template = bytes(rendered)
+    if template != request.render():
+        raise ValueError(f"无法编译 {request.name}：逐字段渲染结果与 Request.render() 不一致")
+
+    # 计算每个 Size 字段覆盖了哪些叶子字段
+    leaf_index = {id(leaf): i for i, leaf in enumerate(leaves)}
+    covering = [[] for _ in leaves]
+    for i, leaf in enumerate(leaves):
+        if not isinstance(leaf, Size) or leaf.block_name is None:
+            continue
+        target = request.resolve_name(leaf.context_path, leaf.block_name)
+        targets = list(_leaves(target)) if isinstance(target, FuzzableBlock) else [target]
+        value = leaf.offset + (leaf.length if leaf.inclusive else 0) + len(target.render(MutationContext()))
+        fixup = LengthFixup(
+            offset=offsets[i],
+            packer=struct.Struct(leaf.endian + _SIZE_FORMATS[leaf.length]),
+            value=value,
+            mask=(1 << leaf.length * 8) - 1,
+            math=leaf.math,
+        )
+        for covered in targets:
+            if covered is not leaf:
+                covering[leaf_index[id(covered)]].append(fixup)
+
+    fields = []
+    mutations = {}
+    for i, leaf in enumerate(leaves):
+        fields.append(TemplateField(
+            name=leaf.qualified_name,
+            offset=offsets[i],
+            length=(offsets[i + 1] if i + 1 < len(leaves) else len(template)) - offsets[i],
+            primitive=leaf,
+            fixups=tuple(covering[i]),
+        ))
+        if leaf.fuzzable:
+            # 变异值必须在生成器推进前编码，boofuzz 的部分变异是延迟绑定的闭包
+            mutations[i] = [leaf.render(MutationContext(mutations=m)) for m in leaf.get_mutations()]
+    return S7RequestTemplate(request.name, template, tuple(fields), mutations)
+
+
+def compile_function(function: str, fuzzable_list: list[bool] | None = None) -> S7RequestTemplate:
+    """
+    调用 S7CommunicationGenerator 的同名方法生成 Request 并编译。
+
+    :param function: 功能名称，例如 read_var、download。
+    :param fuzzable_list: 变异规则列表，含义与 S7CommunicationGenerator 中对应方法一致。
+    :return: 编译后的模板。
+    """
+    return compile_request(getattr(S7CommunicationGenerator, function)(fuzzable_list))
@@ -1,10 +1,35 @@
 """
 s7 协议原语创建指挥者
 """
+import os
+import time
+import uuid
+import weakref
+from boofuzz import constants
+from boofuzz.fuzz_logger import FuzzLogger
 from boofuzz.sessions import Session, Target
 from boofuzz.blocks.request import Request
-from model.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
-from model.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import S7CommunicationSocketConnection
+from boofuzz.mutation import Mutation
+from .s7_gen import S7CommunicationGenerator
+from .s7_communication_socket_connection import S7CommunicationSocketConnection
+from .s7_frame_cache import S7FrameCache
+from .s7_case_index import S7CaseIndex, S7MutationContext
+from .s7_template import fuzzable_leaves
+from .s7_response import TPKTReassembler, S7Response, classify
+from .s7_signature import SignatureIndex, register_run, signature, unregister_run
+from .s7_scheduler import FieldScheduler
+from .s7_pipeline import S7Pipeline
+from .s7_corpus import S7Corpus
+from .s7_combinatorial import CombinatorialCases
+from .s7_rtt import RTTEstimator
+from .s7_results import ResultsStore, mutation_hash, outcome
+from .s7_ring_log import RingBufferLogger
+from .s7_phases import PhaseTimer
+from .s7_metrics import register_session, unregister_session
+
+# 持久通道模式下视为通道失效的 S7 错误类别：0x81 应用关系错误、0x84 服务处理错误
+FATAL_ERROR_CLASSES = {0x81, 0x84}
+RECV_MAX_BYTES = 10000
 
 
 class S7CommunicationSession(Session):
@@ -12,35 +37,140 @@ class S7CommunicationSession(Session):
     S7CommunicationSession 针对于 S7 Communication 协议的模糊测试会话类，目前支持对7种功能进行模糊测试
     """
 
-    def __init__(self, ip: str = "192.168.101.172", port: int = 102) -> None:
-
+    def __init__(
+        self,
+        ip: str = "192.168.101.172",
+        port: int = 102,
+        persistent: bool = False,
+        run_id: str | None = None,
+        max_signatures: int = 4096,
+        on_novel_signature=None,
+        adaptive_timeout: bool = False,
+        results: ResultsStore | str | None = None,
+        ring_log: RingBufferLogger | int | None = None,
+        phase_timing: bool = False,
+        **kwargs,
+    ) -> None:
+        """
+        :param ip: 目标 PLC 的 ip。
+        :param port: 目标 PLC 的端口。
+        :param persistent: 是否启用持久通道模式。启用后 TCP 连接、COTP 连接以及建立通信在多个测试用例之间复用，
+            仅在目标关闭连接、不再应答或返回致命错误时重新建立。
+        :param run_id: 本次模糊测试的标识，用于查询应答签名索引，默认随机生成。
+        :param max_signatures: 应答签名索引最多保留的签名数。
+        :param on_novel_signature: 出现新颖应答签名时的回调，参数为 (run_id, SignatureEntry, 应答帧)，用于持久化。
+        :param adaptive_timeout: 是否根据目标应答的往返时延自适应接收超时，固定超时为 5 秒。
+        :param results: 列式结果存储或其目录，设置后为每个测试用例追加一条结果记录。
+        :param ring_log: 环形缓冲日志或其保留的测试用例数。设置后替换 boofuzz 的 sqlite 与文本日志，
+            只在失败、超时或出现新颖应答签名时把最近的测试用例写入 boofuzz-results/ring-<run_id>/；
+            此时忽略 db_filename，不创建结果数据库。
+        :param phase_timing: 是否按功能与字段统计每个测试用例前置回调、渲染、发送、等待应答以及后置回调的耗时。
+        :param kwargs: 其余参数原样传给 boofuzz Session。
+        """
+        # 自适应超时的往返时延估计器，未启用时为 None
+        self.rtt = RTTEstimator() if adaptive_timeout else None
+        self.connection = S7CommunicationSocketConnection(ip, port, rtt=self.rtt)
+        self.persistent = persistent
+        if persistent:
+            kwargs["reuse_target_connection"] = True
+        if ring_log is not None:
+            # boofuzz 总会创建 sqlite 日志；环形缓冲日志替换它之后只把它放在内存中，不留下空的结果数据库
+            kwargs["db_filename"] = ":memory:"
+        kwargs.setdefault("receive_data_after_fuzz", True)
+        # 分阶段计时器，未启用时为 None，此时不包装回调，热路径上没有额外开销
+        self.phases = PhaseTimer() if phase_timing else None
+        pre_send, post_test_case = S7CommunicationSession.cr_tpdu, S7CommunicationSession.s7c_post_callck
+        if self.phases is not None:
+            self.connection.track_send = True
+            pre_send = self.phases.timed("pre_send", pre_send)
+            post_test_case = self.phases.timed("post", post_test_case)
         super(S7CommunicationSession, self).__init__(
-            target=Target(S7CommunicationSocketConnection(ip, port)),
-            pre_send_callbacks=[S7CommunicationSession.cr_tpdu],
-            post_test_case_callbacks=[S7CommunicationSession.s7c_post_callck],
-            receive_data_after_fuzz=True,
+            target=Target(self.connection),
+            pre_send_callbacks=[pre_send],
+            post_test_case_callbacks=[post_test_case],
+            **kwargs,
         )
         self.s7_gen = S7CommunicationGenerator()
+        # 前置/后置数据包在整个会话中不变，只构建一次
+        self.frame_cache = S7FrameCache()
+        # 持久通道状态：通道是否可用、是否需要重新建立 TCP 连接
+        self._channel_ready = False
+        self._channel_stale = False
+        self.handshakes = 0
+        self.handshakes_saved = 0
+        self.reconnects = 0
+        # 应答流重组器以及上一个测试用例应答的分类结果、各类应答的累计次数
+        self.reassembler = TPKTReassembler()
+        self.last_responses: list[S7Response] = []
+        self.response_counts: dict[str, int] = {}
+        # 应答签名索引，只有新颖的签名交给 on_novel_signature 保存
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self._on_novel_signature = on_novel_signature
+        # 回调只弱引用会话，签名索引与登记表不延长会话的生命周期
+        novel_signature = weakref.WeakMethod(self._novel_signature)
+
+        def on_novel(entry, frame):
+            callback = novel_signature()
+            if callback is not None:
+                callback(entry, frame)
+
+        self.signatures = SignatureIndex(max_signatures, on_novel)
+        self.novel_signatures = 0
+        # 指标计数器，只在模糊测试线程中累加，由 s7_metrics 在抓取时读取：已执行的测试用例数、没有应答的用例数、
+        # 执行测试用例（不含暂停）的累计秒数以及第一个测试用例开始的时间（perf_counter）
+        self.cases_fuzzed = 0
+        self.timeouts = 0
+        self.busy_time = 0.0
+        self.fuzz_started: float | None = None
+        register_session(self.run_id, self)
+        if isinstance(ring_log, int):
+            ring_log = RingBufferLogger(os.path.join(constants.RESULTS_DIR, f"ring-{self.run_id}"), slots=ring_log)
+        self.ring_log = ring_log
+        if ring_log is not None:
+            self._fuzz_data_logger = FuzzLogger(fuzz_loggers=[ring_log])
+            for target in self.targets:
+                target.set_fuzz_data_logger(self._fuzz_data_logger)
+        # 启用后 start_fuzz 中各功能由 FieldScheduler 按应答分配预算，schedule_budget 为最多执行的用例数
+        self.scheduled = False
+        self.schedule_budget: int | None = None
+        self.scheduler: FieldScheduler | None = None
+        # 设置后 start_fuzz 中各功能按该强度的覆盖数组组合变异，combinatorial_values 为每个字段挑选的变异值个数
+        self.combinatorial_strength: int | None = None
+        self.combinatorial_values = 7
+        # start_fuzz 中各功能只模糊测试该编号区间（从 1 开始，两端均包含），None 表示全部
+        self.case_range: tuple[int, int | None] | None = None
+        # 列式结果存储，以及当前测试用例的发送/接收时间、被变异的字段和最后一个应答帧的签名
+        self.results = ResultsStore(results) if isinstance(results, str) else results
+        self._sent_at = 0.0
+        self._received_at: float | None = None
+        self._mutated_fields = ""
+        self._last_signature: str | None = None
 
     @staticmethod
     def cr_tpdu(target: Target, fuzz_data_logger, session: Session, sock):
         """
         cr_tpdu 起始回调，用于发送 CR 数据包以及其它功能的前置数据包，比如请求下载等。
         """
-        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
-        target.send(b"")
-        S7CommunicationSocketConnection.set_pdu_type("DT Data")
+        # 清除上一个测试用例的响应，避免发送失败时误判通道状态
+        session.last_recv = None
         # 获取当前被 fuzz 的请求对象
         request: Request = session.fuzz_node
-        req_name = request.name
-        if req_name == "set_up_communication":
-            pass
-        elif req_name == "download":
-            target.send(S7CommunicationGenerator.setup_communication().render())
-            target.send(S7CommunicationGenerator.request_download().render())
-        elif req_name == "upload":
-            target.send(S7CommunicationGenerator.setup_communication().render())
-            target.send(S7CommunicationGenerator.request_upload().render())
+        if not session.persistent:
+            # 每个测试用例都是新的连接，丢弃上一个连接中未完成的帧
+            session.reassembler.reset()
+            session.send_frame(session.frame_cache.connect_request(), fuzz_data_logger)
+            S7CommunicationSocketConnection.set_pdu_type("DT Data")
+            for frame in session.frame_cache.prologue(request.name):
+                session.send_frame(frame, fuzz_data_logger)
+            return
+
+        if session._channel_ready:
+            session.handshakes_saved += 1
+        else:
+            session.open_channel(target, fuzz_data_logger)
+        # 建立通信已经包含在通道中，只发送其余的前置数据包
+        for frame in session.frame_cache.prologue(request.name, exclude=("setup_communication",)):
+            session.exchange_frame(frame, fuzz_data_logger)
 
     @staticmethod
     def s7c_post_callck(target: Target, fuzz_data_logger, session: Session, sock):
@@ -49,12 +179,520 @@ class S7CommunicationSession(Session):
         """
         # 获取当前被 fuzz 的请求对象
         request: Request = session.fuzz_node
-        req_name = request.name
+        responses = session.classify_response(session.last_recv, fuzz_data_logger)
+        if not session.last_recv:
+            session.timeouts += 1
+        session.record_result(responses)
+        if not session.persistent:
+            for frame in session.frame_cache.epilogue(request.name):
+                session.send_frame(frame, fuzz_data_logger)
+            return
+
+        # 目标不再应答或返回致命错误时，下一个测试用例重新建立通道
+        fatal = any(r.error_class in FATAL_ERROR_CLASSES for r in responses if r.rosctr in (0x02, 0x03))
+        if not session.last_recv or fatal:
+            session._channel_ready = False
+            session._channel_stale = True
+            if fuzz_data_logger is not None:
+                fuzz_data_logger.log_info("S7 通道失效，下一个测试用例将重新建立连接")
+            return
+        for frame in session.frame_cache.epilogue(request.name):
+            session.exchange_frame(frame, fuzz_data_logger)
+
+    def channel_frames(self) -> list[bytes]:
+        """
+        持久通道模式下建立通道时发送的 S7 数据帧。对建立通信本身进行模糊测试时通道只包含 COTP 连接。
+        """
+        if self.fuzz_node is not None and self.fuzz_node.name == "set_up_communication":
+            return []
+        return [self.frame_cache.get("setup_communication")]
+
+    def open_channel(self, target: Target, fuzz_data_logger=None):
+        """
+        建立持久通道：必要时重新打开 TCP 连接，然后发送 CR TPDU 以及建立通信数据包并等待应答。
+
+        :param target: boofuzz 目标对象。
+        :param fuzz_data_logger: boofuzz 日志对象。
+        """
+        self._channel_ready = False
+        if self._channel_stale:
+            target.close()
+            target.open()
+            self.reassembler.reset()
+            self.reconnects += 1
+        # 任何一步失败都视为通道失效，下次重新打开连接
+        self._channel_stale = True
+        replies = [self.exchange_frame(self.frame_cache.connect_request(), fuzz_data_logger)]
+        S7CommunicationSocketConnection.set_pdu_type("DT Data")
+        for frame in self.channel_frames():
+            replies.append(self.exchange_frame(frame, fuzz_data_logger))
+        self.handshakes += 1
+        if all(replies):
+            self._channel_ready = True
+            self._channel_stale = False
+
+    def send_frame(self, frame: bytes, fuzz_data_logger=None):
+        """
+        直接发送一个已封装好的数据帧，并记录到模糊测试日志中。
+
+        :param frame: 完整的 TPKT/COTP/S7 数据帧。
+        :param fuzz_data_logger: boofuzz 日志对象，默认为 None 表示不记录。
+        """
+        self.connection.send_frame(frame)
+        if fuzz_data_logger is not None:
+            fuzz_data_logger.log_send(frame)
+
+    def exchange_frame(self, frame: bytes, fuzz_data_logger=None) -> bytes:
+        """
+        发送一个已封装好的数据帧并接收应答，持久通道模式下用于避免应答残留在接收缓冲区中。
+
+        :return: 收到的应答，超时或连接关闭时为空。
+        """
+        self.send_frame(frame, fuzz_data_logger)
+        reply = self.connection.recv(RECV_MAX_BYTES)
+        if fuzz_data_logger is not None:
+            fuzz_data_logger.log_recv(reply)
+        return reply
+
+    def classify_response(self, data: bytes | None, fuzz_data_logger=None) -> list[S7Response]:
+        """
+        把测试用例的应答送入重组器，对其中每个完整的帧分类并记录到日志中。
+
+        :param data: 本次接收到的数据，可能包含多个帧或不完整的帧。
+        :param fuzz_data_logger: boofuzz 日志对象，默认为 None 表示不记录。
+        :return: 各帧的分类结果，同时保存在 last_responses 中。
+        """
+        responses = []
+        for frame in self.reassembler.feed(data) if data else []:
+            response = classify(frame)
+            self._record_response(frame, response, fuzz_data_logger)
+            responses.append(response)
+        self.last_responses = responses
+        return responses
+
+    def _record_response(self, frame, response: S7Response, fuzz_data_logger=None):
+        # 统计应答类型并更新签名索引
+        self.response_counts[response.kind] = self.response_counts.get(response.kind, 0) + 1
+        novel = self.signatures.observe(frame, self.total_mutant_index, response)
+        if self.results is not None:
+            # 非持久模式下应答中还包含前置数据包的应答，测试用例的应答是最后一个帧
+            self._last_signature = novel.digest if novel is not None else signature(frame, response).digest
+        if novel is not None:
+            self.novel_signatures += 1
+            if self.ring_log is not None:
+                self.ring_log.trigger("novel")
+        if fuzz_data_logger is not None:
+            suffix = f"，新的应答签名 {novel.digest}" if novel is not None else ""
+            fuzz_data_logger.log_info(f"S7 应答：{response}{suffix}")
+
+    def _novel_signature(self, entry, frame: bytes):
+        if self._on_novel_signature is not None:
+            self._on_novel_signature(self.run_id, entry, frame)
+
+    def handshake_stats(self) -> dict:
+        """
+        持久通道模式的统计信息：实际握手次数、节省的握手次数以及重连次数。
+        """
+        return {
+            "handshakes": self.handshakes,
+            "handshakes_saved": self.handshakes_saved,
+            "reconnects": self.reconnects,
+        }
+
+    def record_result(self, responses: list[S7Response]):
+        """
+        把当前测试用例的结果追加到结果存储中，未设置结果存储时什么也不做。
+
+        :param responses: 本测试用例应答的分类结果。
+        """
+        if self.results is None:
+            return
+        self.results.append(
+            case=self.total_mutant_index,
+            field=self._mutated_fields,
+            mutation=mutation_hash(self.last_send or b""),
+            send=self._sent_at,
+            recv=self._received_at,
+            signature=self._last_signature,
+            outcome=outcome(responses, self.connection.connection_lost),
+        )
+
+    def timing_stats(self) -> dict | None:
+        """
+        本次模糊测试的往返时延统计，未启用自适应超时时为 None。
+        """
+        if self.rtt is None:
+            return None
+        return {"run_id": self.run_id, **self.rtt.stats()}
+
+    def _begin_run(self):
+        # 模糊测试期间才登记签名索引，供 API 查询；会话在创建时已登记指标，再次运行时重新登记
+        register_run(self.run_id, self.signatures)
+        register_session(self.run_id, self)
+
+    def _end_run(self):
+        # 结束后注销，进程中的登记表不随会话数增长，/metrics 也不再输出已结束的模糊测试；
+        # 已保存的新颖签名仍可从数据库查询
+        unregister_run(self.run_id, self.signatures)
+        unregister_session(self.run_id, self)
+
+    def _main_fuzz_loop(self, fuzz_case_iterator):
+        self._begin_run()
+        try:
+            super(S7CommunicationSession, self)._main_fuzz_loop(fuzz_case_iterator)
+        finally:
+            self._end_run()
+
+    def _fuzz_current_case(self, mutation_context):
+        # 累计执行测试用例的时间，扣除其中因暂停而等待的时间
+        started = time.perf_counter()
+        if self.fuzz_started is None:
+            self.fuzz_started = started
+        paused = self.cumulative_pause_time
+        try:
+            super(S7CommunicationSession, self)._fuzz_current_case(mutation_context)
+        finally:
+            self.busy_time += time.perf_counter() - started - (self.cumulative_pause_time - paused)
+            self.cases_fuzzed += 1
+
+    def transmit_fuzz(self, sock, node, edge, callback_data, mutation_context):
+        """
+        按编号构造的测试用例已经渲染完毕，直接发送其数据，不再渲染 Request。
+        """
+        frame = None
+        if not callback_data and isinstance(mutation_context, S7MutationContext):
+            callback_data = mutation_context.data
+            frame = mutation_context.frame
+        if self.results is not None:
+            self.connection.connection_lost = False
+            self._mutated_fields = ",".join(mutation_context.mutations) if mutation_context is not None else ""
+            self._last_signature = None
+            self._sent_at = time.time()
+        if frame is not None:
+            # 语料中的数据帧已经封装好 TPKT/COTP 首部，由连接直接发送，last_send 仍为 S7 数据
+            self.connection.send_framed = True
+            try:
+                self._transmit(sock, node, edge, frame, mutation_context)
+            finally:
+                self.connection.send_framed = False
+            self.last_send = callback_data
+        else:
+            self._transmit(sock, node, edge, callback_data, mutation_context)
+        if self.results is not None:
+            self._received_at = time.time() if self.last_recv else None
+
+    def _transmit(self, sock, node, edge, callback_data, mutation_context):
+        if self.phases is not None:
+            self._transmit_timed(sock, node, edge, callback_data, mutation_context)
+        else:
+            super(S7CommunicationSession, self).transmit_fuzz(sock, node, edge, callback_data, mutation_context)
+
+    def _transmit_timed(self, sock, node, edge, callback_data, mutation_context):
+        # 分别记录渲染、发送以及等待应答的耗时
+        fields = ",".join(mutation_context.mutations) if mutation_context is not None else ""
+        self.phases.begin_case(node.name, fields)
+        started = time.perf_counter_ns()
+        if not callback_data:
+            callback_data = self.fuzz_node.render(mutation_context)
+        rendered = time.perf_counter_ns()
+        self.phases.mark("render", rendered - started)
+        self.connection.send_finished_ns = None
+        super(S7CommunicationSession, self).transmit_fuzz(sock, node, edge, callback_data, mutation_context)
+        finished = time.perf_counter_ns()
+        sent = self.connection.send_finished_ns
+        if sent is None:
+            # 发送失败
+            self.phases.mark("send", finished - rendered)
+        else:
+            self.phases.mark("send", sent - rendered)
+            self.phases.mark("recv", finished - sent)
+
+    def phase_stats(self, unit: float = 1e3) -> dict | None:
+        """
+        各功能及字段每个阶段的耗时统计（默认单位为微秒），可以在运行中调用，未启用分阶段计时时为 None。
+        """
+        if self.phases is None:
+            return None
+        return {"run_id": self.run_id, "functions": self.phases.report(unit)}
+
+    def case_count(self, name: str | None = None) -> int:
+        """
+        已连接的 Request 的变异总数，按原语的变异个数计算，不编译字节模板，也不渲染任何测试用例。
+
+        :param name: Request 名称，默认为最近连接的 Request。
+        """
+        return S7CaseIndex.from_request(self.nodes[self._case_edge(name).dst]).total
+
+    def fuzz_range(self, start: int = 1, end: int | None = None, name: str | None = None):
+        """
+        只模糊测试编号在 [start, end] 内的测试用例，编号与 boofuzz 的 total_mutant_index 一致。
+        每个用例由字节模板按编号直接定位，不需要像 index_start 那样从第一个变异开始遍历。
+
+        :param start: 起始编号，从 1 开始。
+        :param end: 结束编号（包含），默认为变异总数。
+        :param name: Request 名称，默认为最近连接的 Request。
+        :raises IndexError: 编号区间超出范围。
+        """
+        edge = self._case_edge(name)
+        request: Request = self.nodes[edge.dst]
+        index = S7CaseIndex.from_request(request)
+        end = index.total if end is None else end
+        if not 1 <= start <= end <= index.total:
+            raise IndexError(f"编号区间 [{start}, {end}] 超出范围 [1, {index.total}]")
+        self._fuzz_case_range(edge, index, start, end)
+
+    def replay_corpus(self, corpus: S7Corpus | str, start: int | None = None, end: int | None = None):
+        """
+        重放 export_corpus 生成的语料文件：数据直接取自映射的文件，所变异的字段取自语料的字段表，
+        不再编译字节模板或渲染测试用例。
+        语料中的功能与变异规则对应的 Request 尚未连接时自动连接。
+
+        :param corpus: S7Corpus 或语料文件路径。
+        :param start: 起始编号，默认为语料的第一个用例。
+        :param end: 结束编号（包含），默认为语料的最后一个用例。
+        :raises ValueError: 会话中同名 Request 的变异与语料不一致。
+        :raises IndexError: 编号区间超出语料范围。
+        """
+        if isinstance(corpus, str):
+            with S7Corpus(corpus) as opened:
+                return self.replay_corpus(opened, start, end)
+        metadata = corpus.metadata
+        request = getattr(S7CommunicationGenerator, metadata["function"])(metadata["fuzzable_list"])
+        try:
+            edge = self._case_edge(request.name)
+        except ValueError:
+            edge = self.connect(request)
+        index = S7CaseIndex.from_request(self.nodes[edge.dst])
+        if index.total != metadata["total"]:
+            raise ValueError(f"会话中的 {request.name} 与语料文件 {corpus.filename} 的变异不一致")
+        start = corpus.start if start is None else start
+        end = corpus.end if end is None else end
+        if not corpus.start <= start <= end <= corpus.end:
+            raise IndexError(f"编号区间 [{start}, {end}] 超出语料范围 [{corpus.start}, {corpus.end}]")
+        self._fuzz_case_range(edge, index, start, end, corpus)
+
+    def _fuzz_case_range(self, edge, index: S7CaseIndex, start: int, end: int, corpus: S7Corpus | None = None):
+        self.total_mutant_index = 0
+        self.total_num_mutations = index.total
+        saved_range = self._index_start, self._index_end
+        self._index_start, self._index_end = start, end
+        try:
+            self._main_fuzz_loop(self._generate_case_range(index, [edge], self.nodes[edge.dst], start, end, corpus))
+        finally:
+            self._index_start, self._index_end = saved_range
+
+    def _generate_case_range(
+        self, index: S7CaseIndex, path: list, request: Request, start: int, end: int, corpus: S7Corpus | None = None
+    ):
+        fuzzable = fuzzable_leaves(request) if corpus is not None else None
+        for case in range(start, end + 1):
+            if corpus is not None:
+                # 超过 TPKT 长度上限的用例没有保存在语料中
+                if corpus.frame(case):
+                    yield self._corpus_context(corpus, fuzzable, path, request, case)
+                continue
+            self.fuzz_node = request
+            field_index, value_index = index.template.locate(case - 1)
+            request.mutant = index.template.fields[field_index].primitive
+            self.mutant_index = value_index + 1
+            self.total_mutant_index = case
+            yield index.mutation_context(case, path)
 
-        if req_name == "download":
-            target.send(S7CommunicationGenerator.end_download().render())
-        elif req_name == "upload":
-            target.send(S7CommunicationGenerator.end_upload().render())
+    def _corpus_context(
+        self, corpus: S7Corpus, fuzzable: list, path: list, request: Request, case: int
+    ) -> S7MutationContext:
+        # 语料中保存了各用例所变异的字段，不需要编译字节模板
+        k, value_index = corpus.locate(case)
+        primitive = fuzzable[k]
+        self.fuzz_node = request
+        request.mutant = primitive
+        self.mutant_index = value_index + 1
+        self.total_mutant_index = case
+        # 语料只保存数据帧，不保存字段的变异值，用例名称只用到字段名与编号
+        name = primitive.qualified_name
+        mutation = Mutation(value=None, qualified_name=name, index=value_index)
+        # 数据帧与 S7 数据都是映射内存的视图，发送时不复制
+        return S7MutationContext(
+            mutations={name: mutation}, message_path=path, data=corpus.payload(case), frame=corpus.frame(case)
+        )
+
+    def fuzz_scheduled(
+        self, budget: int | None = None, name: str | None = None, buckets: int = 8, exploration: float = 1.0
+    ) -> FieldScheduler:
+        """
+        由 FieldScheduler 决定测试用例的执行顺序：产生新的应答签名或连接失败的字段、取值区间获得更多预算。
+        用例编号与 fuzz_range 相同，每个用例最多执行一次。
+
+        :param budget: 最多执行的用例数，默认为变异总数。
+        :param name: Request 名称，默认为最近连接的 Request。
+        :param buckets: 每个字段最多切分的取值区间数。
+        :param exploration: UCB1 的探索系数。
+        :return: 调度器，可以通过 stats() 查看各字段的执行次数与奖励。
+        """
+        edge = self._case_edge(name)
+        request: Request = self.nodes[edge.dst]
+        index = S7CaseIndex.from_request(request)
+        self.scheduler = FieldScheduler(index.template, buckets, exploration)
+        budget = index.total if budget is None else min(budget, index.total)
+        self.total_mutant_index = 0
+        self.total_num_mutations = budget
+        saved_range = self._index_start, self._index_end
+        # 调度顺序下编号不是递增的，由生成器控制用例数
+        self._index_start, self._index_end = 1, None
+        try:
+            self._main_fuzz_loop(self._generate_scheduled(index, [edge], request, budget))
+        finally:
+            self._index_start, self._index_end = saved_range
+        return self.scheduler
+
+    def _generate_scheduled(self, index: S7CaseIndex, path: list, request: Request, budget: int):
+        scheduler = self.scheduler
+        for _ in range(budget):
+            case = scheduler.next_case()
+            if case is None:
+                return
+            self.fuzz_node = request
+            field_index, value_index = index.template.locate(case - 1)
+            request.mutant = index.template.fields[field_index].primitive
+            self.mutant_index = value_index + 1
+            self.total_mutant_index = case
+            novel = self.novel_signatures
+            self.last_recv = None
+            yield index.mutation_context(case, path)
+            # 生成器恢复时上一个用例（包括后置回调）已经执行完毕
+            reward = 1.0 if self.novel_signatures > novel or not self.last_recv else 0.0
+            scheduler.feedback(case, reward)
+
+    def fuzz_combinatorial(
+        self, strength: int = 2, name: str | None = None, max_values: int = 7
+    ) -> CombinatorialCases:
+        """
+        组合变异：每个测试用例同时变异多个字段，任意 strength 个字段的代表性取值组合至少被测试一次。
+        测试用例按覆盖数组逐个生成，总数事先未知，编号从 1 开始。
+
+        :param strength: 覆盖强度，2 即 pairwise。
+        :param name: Request 名称，默认为最近连接的 Request。
+        :param max_values: 每个字段最多挑选的变异值个数，另外还包括默认值。
+        :return: 组合测试用例，array.rows 为实际生成的用例数。
+        """
+        edge = self._case_edge(name)
+        request: Request = self.nodes[edge.dst]
+        cases = CombinatorialCases(S7CaseIndex.from_request(request).template, strength, max_values)
+        self.total_mutant_index = 0
+        self.total_num_mutations = None
+        saved_range = self._index_start, self._index_end
+        self._index_start, self._index_end = 1, None
+        try:
+            self._main_fuzz_loop(self._generate_combinations(cases, [edge], request))
+        finally:
+            self._index_start, self._index_end = saved_range
+        return cases
+
+    def _generate_combinations(self, cases: CombinatorialCases, path: list, request: Request):
+        template = cases.template
+        for combination in cases:
+            self.fuzz_node = request
+            # 日志中的类型取第一个被变异的字段
+            first: int | None = next(iter(combination.mutations), None)
+            request.mutant = request if first is None else template.fields[template.fuzzable_indexes[first]].primitive
+            self.mutant_index = combination.case
+            self.total_mutant_index = combination.case
+            yield cases.mutation_context(combination, path)
+
+    def fuzz_pipelined(
+        self, start: int = 1, end: int | None = None, name: str | None = None, max_amq: int = 8
+    ) -> dict:
+        """
+        流水线模式：按目标协商的 Max AmQ 让多个变异 PDU 同时在途，应答按 pdu 引用匹配回测试用例。
+        只适用于不需要前置/后置数据包（建立通信除外）的功能，例如读取变量、读取 SZL、启动/停止 PLC。
+
+        :param start: 起始编号，从 1 开始。
+        :param end: 结束编号（包含），默认为变异总数。
+        :param name: Request 名称，默认为最近连接的 Request。
+        :param max_amq: 请求的 Max AmQ，实际在途数量不超过目标协商的值。
+        :raises ValueError: 该功能需要前置/后置数据包，无法流水线发送。
+        :raises IndexError: 编号区间超出范围。
+        :return: 流水线统计信息：在途窗口、发送数、应答数、未应答数、无法匹配的应答数以及重连次数。
+        """
+        edge = self._case_edge(name)
+        request: Request = self.nodes[edge.dst]
+        if (
+            request.name == "set_up_communication"
+            or self.frame_cache.prologue(request.name, exclude=("setup_communication",))
+            or self.frame_cache.epilogue(request.name)
+        ):
+            raise ValueError(f"{request.name} 需要前置/后置数据包，无法流水线发送")
+        index = S7CaseIndex.from_request(request)
+        end = index.total if end is None else end
+        if not 1 <= start <= end <= index.total:
+            raise IndexError(f"编号区间 [{start}, {end}] 超出范围 [1, {index.total}]")
+        self.fuzz_node = request
+        self.total_num_mutations = end - start + 1
+        logger = self._fuzz_data_logger
+        pipeline = S7Pipeline(self.connection, self.frame_cache, max_amq)
+        # 流水线独占连接，结束后持久通道需要重新建立
+        self._channel_ready = False
+        pipeline.open()
+        last = time.perf_counter()
+        if self.fuzz_started is None:
+            self.fuzz_started = last
+        self._begin_run()
+        try:
+            cases = ((case, index.render(case)) for case in range(start, end + 1))
+            for result in pipeline.run(cases):
+                now = time.perf_counter()
+                self.busy_time += now - last
+                last = now
+                self.cases_fuzzed += 1
+                self.total_mutant_index = result.case
+                field, value_index = index.describe(result.case)
+                test_case_name = f"{request.name}:[{field}:{value_index}]"
+                logger.open_test_case(
+                    f"{result.case}: {test_case_name}", name=test_case_name, index=result.case,
+                    num_mutations=self.total_num_mutations,
+                )
+                logger.log_send(S7CommunicationSocketConnection.frame(result.data, "DT Data"))
+                self.last_send = result.data
+                self.last_recv = result.reply
+                self._mutated_fields = field
+                self._last_signature = None
+                self._sent_at, self._received_at = result.sent_at, result.received_at
+                if result.reply is None:
+                    self.timeouts += 1
+                    logger.log_fail("流水线中的测试用例没有收到应答")
+                else:
+                    logger.log_recv(result.reply)
+                    self._record_response(result.reply, result.response, logger)
+                self.record_result([] if result.response is None else [result.response])
+                # 环形缓冲日志在用例结束时写出失败、超时或新颖应答的用例
+                logger.close_test_case()
+        finally:
+            pipeline.close()
+            logger.close_test()
+            self._end_run()
+        return pipeline.stats()
+
+    def _case_edge(self, name: str | None = None):
+        """
+        获取从根节点到名为 name 的 Request 的边，默认为最近连接的 Request。
+        """
+        edges = [edge for edge in self.edges_from(self.root.id) if name is None or self.nodes[edge.dst].name == name]
+        if not edges:
+            raise ValueError(f"会话中没有名为 {name} 的 Request")
+        return edges[-1]
+
+    def run_cases(self):
+        """
+        模糊测试最近连接的 Request：启用 scheduled 时按应答调度，设置了 combinatorial_strength 时组合变异，设置了 case_range 时只测试该区间，否则测试全部变异。
+        """
+        if self.scheduled:
+            self.fuzz_scheduled(self.schedule_budget)
+        elif self.combinatorial_strength is not None:
+            self.fuzz_combinatorial(self.combinatorial_strength, max_values=self.combinatorial_values)
+        elif self.case_range is None:
+            self.fuzz()
+        else:
+            self.fuzz_range(*self.case_range)
 
     def set_up_communication(self, fuzzable_list: list[bool] | None = None):
         """
@@ -70,7 +708,7 @@ class S7CommunicationSession(Session):
         :type fuzzable_list: list[bool] | None, optional
         """
         self.connect(S7CommunicationGenerator.setup_communication(fuzzable_list))
-        self.fuzz()
+        self.run_cases()
 
     def read_var(self, fuzzable_list: list[int] | None = None):
         """
@@ -88,7 +726,7 @@ class S7CommunicationSession(Session):
         样例输入：0 0 0 0 0 0 0 1（表示仅对 Address 字段进行模糊测试）
         """
         self.connect(S7CommunicationGenerator.read_var(fuzzable_list))
-        self.fuzz()
+        self.run_cases()
 
     def read_szl(self, fuzzable_list: list[bool] | None = None):
         """
@@ -101,7 +739,7 @@ class S7CommunicationSession(Session):
         """
         print(fuzzable_list)
         self.connect(S7CommunicationGenerator.read_szl(fuzzable_list))
-        self.fuzz()
+        self.run_cases()
 
     def upload(self, fuzzable_list: list[bool] | None = None):
         """
@@ -116,7 +754,7 @@ class S7CommunicationSession(Session):
         """
         upload_req = S7CommunicationGenerator.upload(fuzzable_list)
         self.connect(upload_req)
-        self.fuzz()
+        self.run_cases()
 
     def download(self, fuzzable_list: list[bool] | None = None):
         """
@@ -144,7 +782,7 @@ class S7CommunicationSession(Session):
         # target.send(S7CommunicationGenerator.request_download().render())
         # # 模糊测试
         self.connect(download_req)
-        self.fuzz()
+        self.run_cases()
         # 发送结束下载数据包
         # target.send(S7CommunicationGenerator.end_download().render())
 
@@ -159,7 +797,7 @@ class S7CommunicationSession(Session):
         在启动该功能的模糊测试后，一般来说 PLC 上的 Run 状态指示灯会亮起。
         """
         self.connect(S7CommunicationGenerator.run_plc(fuzzable_list))
-        self.fuzz()
+        self.run_cases()
 
     def stop_plc(self, fuzzable_list: list[bool] | None = None):
         """
@@ -172,7 +810,7 @@ class S7CommunicationSession(Session):
         在启动该功能的模糊测试后，一般来说 PLC 上的 Stop 状态指示灯会亮起。
         """
         self.connect(S7CommunicationGenerator.stop_plc(fuzzable_list))
-        self.fuzz()
+        self.run_cases()
 
     def start_fuzz(self, function: str):
 
@@ -4,7 +4,7 @@
 import logging
 from sqlalchemy.orm import Session
 from sqlalchemy import select, insert, delete, exc
-from services.sql_model import FuzzTestCase, FuzzTestCaseGroup, Block, Primitive
+from services.sql_model import FuzzTestCase, FuzzTestCaseGroup, Block, Primitive, ResponseSignature
 from exceptions.database_error import DatabaseError, GroupNotExistError
 
 LITTLE_ENDIAN = '<'
@@ -203,4 +203,54 @@ class FuzzingService:
         """
         pass
         
-        
\ No newline at end of file
+        
+
+    def add_response_signature(self, run_id: str, entry, frame: bytes):
+        """
+        保存一次模糊测试中首次出现的应答签名。
+
+        :param run_id: 模糊测试标识。
+        :param entry: SignatureIndex 中的 SignatureEntry。
+        :param frame: 完整的应答帧。
+        :raises ValueError: 该签名已保存。
+        :raises DatabaseError: 其它异常。
+        """
+        signature = entry.signature
+        try:
+            with self.db as session:
+                stmt = insert(ResponseSignature).values(
+                    run_id=run_id,
+                    digest=entry.digest,
+                    kind=signature.kind,
+                    rosctr=signature.rosctr,
+                    error_class=signature.error_class,
+                    error_code=signature.error_code,
+                    function=signature.function,
+                    return_code=signature.return_code,
+                    first_case=entry.first_case,
+                    frame=frame,
+                )
+                session.execute(stmt)
+                session.commit()
+        except exc.IntegrityError as e:
+            logging.error("add_response_signature 违反唯一性约束 %s", e)
+            raise ValueError from e
+        except Exception as e:
+            logging.error("add_response_signature 异常 %s", e)
+            raise DatabaseError from e
+
+    def get_response_signatures(self, run_id: str) -> list[ResponseSignature]:
+        """
+        获取一次模糊测试保存的所有应答签名，按首次出现的测试用例编号排序。
+
+        :param run_id: 模糊测试标识。
+        """
+        try:
+            with self.db as session:
+                stmt = select(ResponseSignature).filter(ResponseSignature.run_id == run_id).order_by(
+                    ResponseSignature.first_case
+                )
+                return list(session.scalars(stmt))
+        except Exception as e:
+            logging.error("get_response_signatures 异常 %s", e)
+            raise DatabaseError from e
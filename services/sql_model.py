@@ -1,7 +1,7 @@
 """
 漏洞挖掘系统后端的数据库原型、结构
 """
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, UniqueConstraint, LargeBinary
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -163,3 +163,25 @@ class Primitive(Base):
     block = relationship("Block", back_populates="primitive")
     
     __table_args__ = (UniqueConstraint('name', 'case_id'),)
+
+
+class ResponseSignature(Base):
+    """
+    应答签名表，保存每次模糊测试中首次出现的应答签名及其完整应答帧。
+    以 run_id 和签名哈希 digest 定义唯一性约束，同一次模糊测试中的重复应答不再保存。
+    """
+    __tablename__ = "response_signatures"
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, index=True)
+    digest = Column(String)
+    kind = Column(String)
+    rosctr = Column(Integer, nullable=True)
+    error_class = Column(Integer, nullable=True)
+    error_code = Column(Integer, nullable=True)
+    function = Column(Integer, nullable=True)
+    return_code = Column(Integer, nullable=True)
+    # 首次产生该签名的测试用例编号
+    first_case = Column(Integer)
+    frame = Column(LargeBinary)
+
+    __table_args__ = (UniqueConstraint('run_id', 'digest'),)
@@ -0,0 +1,62 @@
+import struct
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.fuzzing_case_gen.s7_communication.s7_batch import BatchMutator, iter_frames
+from services.fuzzing_case_gen.s7_communication.s7_benchmark import benchmark_batch
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+
+
+class TestS7Batch:
+    """
+    测试策略：
+    1. 整数字段按原语的字节序编码（read_var 的 db_number 为大端，read_szl 的 szl_id 为小端）。
+    2. 每种策略生成的帧与逐个渲染模板并封装首部的结果一致。
+    3. 位翻转恰好翻转一位或相邻两位；相同种子产生相同的随机值。
+    4. iter_frames 返回的帧是批量缓冲区的视图。
+    5. 基准中批量变异与逐个渲染的输出一致。
+    """
+
+    def test_endian(self):
+        big = BatchMutator.from_function("read_var", "db_number", [True] * 8)
+        little = BatchMutator.from_function("read_szl", "szl_id", [True, True])
+        assert big._encode([0x1234]).tobytes() == struct.pack(">H", 0x1234)
+        assert little._encode([0x1234]).tobytes() == struct.pack("<H", 0x1234)
+
+    @pytest.mark.parametrize("function, field", [("read_var", "db_number"), ("download", "unknown")])
+    def test_frames_match_template(self, function, field):
+        mutator = BatchMutator.from_function(function, field, seed=7)
+        for strategy in ("boundary", "bitflip", "arithmetic", "random"):
+            values = mutator.values(strategy, 50)
+            frames = mutator.frames(values)
+            assert frames.flags["C_CONTIGUOUS"]
+            for value, frame in zip(values, frames):
+                expected = S7CommunicationSocketConnection.frame(
+                    mutator.template.render(mutator.field_index, value.tobytes()), "DT Data"
+                )
+                assert frame.tobytes() == expected
+
+    def test_bitflip_and_seed(self):
+        mutator = BatchMutator.from_function("upload", "upload_id")
+        flips = mutator.bitflip()
+        default = np.frombuffer(mutator.default, dtype=np.uint8)
+        changed = np.unpackbits(flips ^ default, axis=1).sum(axis=1)
+        assert changed.tolist() == [1] * 32 + [2] * 31
+        first = BatchMutator.from_function("upload", "upload_id", seed=1).random(100)
+        second = BatchMutator.from_function("upload", "upload_id", seed=1).random(100)
+        assert np.array_equal(first, second)
+
+    def test_iter_frames_zero_copy(self):
+        mutator = BatchMutator.from_function("read_var", "area")
+        frames = mutator.frames(mutator.boundary())
+        views = list(iter_frames(frames))
+        assert len(views) == len(frames) and bytes(views[1]) == frames[1].tobytes()
+        frames[1, 0] = 0xAA
+        assert views[1][0] == 0xAA
+
+    def test_benchmark_identical(self):
+        result = benchmark_batch("read_var", "db_number", 500)
+        assert result["identical"] and result["frames"] == 500
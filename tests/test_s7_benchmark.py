@@ -0,0 +1,36 @@
+import json
+from services.fuzzing_case_gen.s7_communication.s7_benchmark import compare, main, run_suite, summarize
+
+
+class TestS7Benchmark:
+    """
+    测试策略：
+    1. summarize 按最近秩法计算百分位数，空样本返回 0。
+    2. 对模拟器运行一个功能的基准，各项指标的用例数与设定一致。
+    3. 与基线比较时吞吐量下降超过阈值的指标被标记为回退，--fail-on-regression 时返回 1。
+    """
+
+    def test_summarize(self):
+        result = summarize([i / 1e6 for i in range(1, 101)])
+        assert (result["p50_us"], result["p90_us"], result["p99_us"]) == (50, 90, 99)
+        assert summarize([])["cases_per_sec"] == 0.0
+
+    def test_run_suite(self):
+        result = run_suite(["stop_plc"], max_cases=30)
+        metrics = result["functions"]["stop_plc"]
+        for metric in ("render_tree", "render_template", "framing", "roundtrip"):
+            assert metrics[metric]["cases"] == 30
+        assert metrics["build_ms"] > 0
+
+    def test_compare(self, tmp_path):
+        current = run_suite(["stop_plc"], max_cases=30)
+        baseline = json.loads(json.dumps(current))
+        baseline["functions"]["stop_plc"]["framing"]["cases_per_sec"] *= 10
+        rows = compare(current, baseline)
+        assert [row["metric"] for row in rows if row["regression"]] == ["framing"]
+
+        path = tmp_path / "baseline.json"
+        for metric in ("render_tree", "render_template", "framing", "roundtrip"):
+            baseline["functions"]["stop_plc"][metric]["cases_per_sec"] = 1e12
+        path.write_text(json.dumps(baseline))
+        assert main(["--functions", "stop_plc", "--cases", "30", "--baseline", str(path), "--fail-on-regression"]) == 1
@@ -0,0 +1,51 @@
+import itertools
+import pytest
+from boofuzz.mutation_context import MutationContext
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7_case_index import S7CaseIndex, case_id, parse_case_id
+from tests.test_s7_persistent import plc, make_session  # noqa: F401
+
+
+class TestS7CaseIndex:
+    """
+    测试策略：
+    1. 按编号渲染的结果与 boofuzz 遍历到同一编号时渲染的结果一致，变异总数一致。
+    2. 测试用例标识可以往返解析，格式错误时抛出 ValueError。
+    3. fuzz_range 只发送区间内的用例，且发送的数据与按编号渲染的结果一致。
+    4. 变异总数按原语计数，不编译字节模板；模板在第一次渲染时才编译。
+    """
+
+    @pytest.mark.parametrize("function, fuzzable_list", [("read_var", [True] * 8), ("download", [False] * 4 + [True])])
+    def test_render_matches_boofuzz_order(self, function, fuzzable_list):
+        request = getattr(S7CommunicationGenerator, function)(fuzzable_list)
+        index = S7CaseIndex.from_request(request)
+        assert index.total == request.num_mutations()
+        for case in (1, index.total // 2, index.total):
+            mutations = next(itertools.islice(request.get_mutations(), case - 1, None))
+            assert index.render(case) == request.render(MutationContext(mutations=mutations))
+            assert index.describe(case)[0] == mutations[0].qualified_name
+
+    def test_total_without_compiling(self):
+        index = S7CaseIndex.from_function("setup_communication", [True] * 3)
+        assert index.total == 3 * 65536 and index._template is None
+        assert index.describe(65537) == ("set_up_communication.parameter.max_amq_called", 0)
+        assert index._template is not None
+
+    def test_case_id_round_trip(self):
+        identifier = case_id("read_var", [False] * 7 + [True], 42)
+        assert identifier == "read_var:00000001:42"
+        assert parse_case_id(identifier) == ("read_var", [False] * 7 + [True], 42)
+        assert parse_case_id("run_plc:default:1") == ("run_plc", None, 1)
+        with pytest.raises(ValueError):
+            parse_case_id("read_var:0001:1")
+
+    @pytest.mark.parametrize("persistent", [False, True])
+    def test_fuzz_range(self, plc, tmp_path, persistent):
+        session = make_session(plc, tmp_path, persistent)
+        session.fuzz_range(150, 154)
+        index = S7CaseIndex.from_function("stop_plc", [True])
+        fuzzed = [p for p in plc.payloads if p[10:11] == b"\x29"]
+        assert fuzzed == [index.render(case) for case in range(150, 155)]
+        assert session.total_mutant_index == 154
+        with pytest.raises(IndexError):
+            session.fuzz_range(1, index.total + 1)
@@ -0,0 +1,94 @@
+import math
+from itertools import combinations, product
+
+import pytest
+from boofuzz.mutation import Mutation
+from boofuzz.mutation_context import MutationContext
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7_combinatorial import (
+    CombinatorialCases,
+    CoveringArray,
+    interesting_values,
+)
+from services.fuzzing_case_gen.s7_communication.s7_template import compile_request
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+
+def covers(rows, value_counts, strength):
+    covered = set()
+    for row in rows:
+        for fields in combinations(range(len(value_counts)), strength):
+            covered.add((fields, tuple(row[field] for field in fields)))
+    return all(
+        (fields, values) in covered
+        for fields in combinations(range(len(value_counts)), strength)
+        for values in product(*(range(value_counts[field]) for field in fields))
+    )
+
+
+class TestS7Combinatorial:
+    """
+    测试策略：
+    1. 覆盖数组满足 t 强度覆盖：任意 t 个字段的任意取值组合都出现在某一行中，行数远小于笛卡尔积；强度不小于字段数时即笛卡尔积。
+    2. 挑选的代表性取值去重且不超过上限。
+    3. 同时替换多个字段的渲染结果与逐个字段替换一致，变长字段会修正长度字段。
+    4. 会话组合变异：向模拟器发送每个组合用例，日志中的用例名称列出所有被变异的字段。
+    """
+
+    @pytest.mark.parametrize("value_counts, strength", [([3] * 4, 2), ([8] * 8, 2), ([5, 2, 4, 3, 6], 3), ([2, 3], 2)])
+    def test_covering_array(self, value_counts, strength):
+        array = CoveringArray(value_counts, strength)
+        rows = list(array)
+        assert covers(rows, value_counts, strength)
+        assert array.rows == len(rows) and len(set(rows)) == len(rows)
+        assert len(rows) <= math.prod(value_counts)
+        if strength == 2 and len(value_counts) == 8:
+            assert len(rows) < 8 ** 3
+
+    def test_full_strength_and_errors(self):
+        assert sorted(CoveringArray([2, 3], strength=5)) == list(product(range(2), range(3)))
+        with pytest.raises(ValueError):
+            CoveringArray([2, 0])
+        with pytest.raises(ValueError):
+            CoveringArray([2, 2], strength=0)
+
+    def test_interesting_values(self):
+        values = [b"\x00", b"\x00", b"\x01", b"\x02", b"\x03", b"\x04"]
+        assert interesting_values(values, 10) == [0, 2, 3, 4, 5]
+        chosen = interesting_values(values, 3)
+        assert len(chosen) == 3 and chosen[0] == 0 and len({values[i] for i in chosen}) == 3
+
+    def test_render_fields(self):
+        request = S7CommunicationGenerator.download([True] * 5)
+        template = compile_request(request)
+        block_number, unknown = template.field_index("block number"), template.field_index("unknown")
+        values = {block_number: b"\x31" * 9, unknown: b"\xaa" * 40}
+        assert template.render_fields({unknown: values[unknown]}) == template.render(unknown, values[unknown])
+        mutations = {
+            template.fields[i].name: Mutation(value=value, qualified_name=template.fields[i].name, index=0)
+            for i, value in values.items()
+        }
+        # 与 boofuzz 同时变异两个原语的渲染结果一致，文件名长度、参数长度与数据长度均被修正
+        assert template.render_fields(values) == request.render(MutationContext(mutations=mutations))
+        cases = CombinatorialCases(template, strength=2, max_values=3)
+        assert sum(1 for _ in cases) == cases.array.rows
+
+    def test_session_combinatorial(self, tmp_path):
+        names = []
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session._fuzz_data_logger.open_test_case = lambda test_case_id, name, index, *args, **kwargs: \
+                names.append(name)
+            session.connect(S7CommunicationGenerator.read_var([False] * 3 + [True] * 5))
+            cases = session.fuzz_combinatorial(strength=2, max_values=3)
+            assert emulator.stats.functions[0x04] == cases.array.rows
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        assert session.signatures.total == cases.array.rows == len(names)
+        assert any(name.count("read_var.") >= 3 for name in names)
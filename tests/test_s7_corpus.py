@@ -0,0 +1,110 @@
+import multiprocessing
+import pytest
+from services.fuzzing_case_gen.s7_communication import s7_case_index
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_case_index import S7CaseIndex
+from services.fuzzing_case_gen.s7_communication.s7_corpus import S7Corpus, export_corpus
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+FUZZABLE_LIST = [False] * 6 + [True, True]
+
+
+def read_frame(filename, case):
+    with S7Corpus(filename) as corpus:
+        return bytes(corpus.frame(case))
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    filename = str(tmp_path / "read_var.corpus")
+    export_corpus(filename, "read_var", FUZZABLE_LIST, start=5, end=104)
+    return filename
+
+
+class TestS7Corpus:
+    """
+    测试策略：
+    1. 语料中每个用例的数据帧与按编号渲染并封装首部的结果一致，编号区间、元数据以及所变异的字段正确。
+    2. 数据帧是映射内存的视图；编号超出语料范围、文件格式错误或版本不受支持时抛出异常。
+    3. 其它进程打开同一个语料文件得到相同的数据帧。
+    4. 会话重放语料，直接发送映射内存中的每个数据帧，不复制、不重新封装，也不编译字节模板。
+    """
+
+    def test_frames_match_render(self, corpus_file):
+        index = S7CaseIndex.from_function("read_var", FUZZABLE_LIST)
+        with S7Corpus(corpus_file) as corpus:
+            assert len(corpus) == 100
+            assert corpus.metadata["function"] == "read_var"
+            assert corpus.metadata["fuzzable_list"] == FUZZABLE_LIST
+            cases = []
+            for case, frame in corpus:
+                cases.append(case)
+                assert bytes(frame) == S7CommunicationSocketConnection.frame(index.render(case), "DT Data")
+                assert bytes(corpus.payload(case)) == index.render(case)
+                field_index, value_index = index.template.locate(case - 1)
+                assert corpus.locate(case) == (index.template.fuzzable_indexes.index(field_index), value_index)
+                frame.release()
+            assert cases == list(range(5, 105))
+
+    def test_views_and_errors(self, corpus_file, tmp_path):
+        with S7Corpus(corpus_file) as corpus:
+            frame = corpus.frame(5)
+            assert isinstance(frame, memoryview) and frame.readonly
+            frame.release()
+            with pytest.raises(IndexError):
+                corpus.frame(4)
+            with pytest.raises(IndexError):
+                corpus.frame(105)
+        bad = tmp_path / "bad.corpus"
+        bad.write_bytes(b"not a corpus file at all, just some bytes")
+        with pytest.raises(ValueError):
+            S7Corpus(str(bad))
+        # 版本 1 的文件没有字段表，不再支持
+        old = bytearray(open(corpus_file, "rb").read())
+        old[8:12] = (1).to_bytes(4, "little")
+        bad.write_bytes(bytes(old))
+        with pytest.raises(ValueError):
+            S7Corpus(str(bad))
+
+    def test_shared_across_processes(self, corpus_file):
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            remote = pool.apply(read_frame, (corpus_file, 42))
+        assert remote == read_frame(corpus_file, 42)
+
+    def test_session_replay(self, corpus_file, tmp_path, monkeypatch):
+        def compile_request(request):
+            raise AssertionError("重放语料时不应编译字节模板")
+
+        monkeypatch.setattr(s7_case_index, "compile_request", compile_request)
+        names = []
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.record_result = lambda responses: names.append(session.fuzz_node.mutant.name)
+            frames = []
+            send_frame = session.connection.send_frame
+
+            def record_frame(frame):
+                frames.append(frame)
+                return send_frame(frame)
+
+            session.connection.send_frame = record_frame
+            session.replay_corpus(corpus_file, start=10, end=39)
+            # 持久通道中的建立通信之外，恰好发送了 30 个读取变量请求
+            assert emulator.stats.functions[0x04] == 30
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        assert session.signatures.total == 30
+        views = [frame for frame in frames if isinstance(frame, memoryview)]
+        with S7Corpus(corpus_file) as corpus:
+            assert [bytes(view) for view in views] == [bytes(corpus.frame(case)) for case in range(10, 40)]
+        monkeypatch.undo()
+        index = S7CaseIndex.from_function("read_var", FUZZABLE_LIST)
+        expected = [index.template.fields[index.template.locate(case - 1)[0]].primitive.name for case in range(10, 40)]
+        assert len(names) == 30 and names == expected
+        with pytest.raises(IndexError):
+            session.replay_corpus(corpus_file, start=1, end=10)
@@ -0,0 +1,106 @@
+import socket
+import struct
+import time
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_response import classify
+from services.fuzzing_case_gen.s7_communication.s7_frame_cache import S7FrameCache
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import (
+    ConnectionState,
+    EmulatorConfig,
+    EmulatorThread,
+    S7PLCEmulator,
+)
+
+
+def exchange(sock, frame):
+    """
+    发送一帧并读取一个完整的应答帧，连接被断开时返回空。
+    """
+    try:
+        sock.sendall(frame)
+        header = sock.recv(4)
+    except ConnectionError:
+        return b""
+    if not header:
+        return b""
+    length = struct.unpack("!H", header[2:])[0]
+    body = b""
+    while len(body) < length - 4:
+        body += sock.recv(length - 4 - len(body))
+    return header + body
+
+
+@pytest.fixture
+def frames():
+    return S7FrameCache()
+
+
+class TestS7Emulator:
+    """
+    测试策略：
+    1. CR TPDU 得到 CC 应答，建立通信返回协商后的 PDU 长度，读取变量、读取 SZL 返回成功的数据项。
+    2. 未建立 COTP 连接就发送 DT 数据时断开连接，不支持的功能返回 0x81 错误类别。
+    3. error_rate 为 1 时所有 Job 请求都返回注入的错误。
+    4. 崩溃后断开连接并拒绝新连接，崩溃持续时间结束后恢复，之后的请求正常应答，不会再次崩溃。
+    5. 持久通道模式的会话对模拟器执行模糊测试，所有用例都得到应答。
+    """
+
+    def test_handle_frames(self, frames):
+        emulator = S7PLCEmulator()
+        state = ConnectionState()
+        cc = emulator.handle_frame(frames.connect_request(), state)
+        assert cc[5] == 0xD0
+        setup = emulator.handle_frame(frames.get("setup_communication"), state)
+        assert classify(setup).error_class == 0x00
+        assert setup[-2:] == (480).to_bytes(2, "big")
+        read_var = emulator.handle_frame(frames.get("read_var"), state)
+        assert classify(read_var).error_class == 0x00 and read_var[7 + 14] == 0xFF
+        read_szl = emulator.handle_frame(frames.get("read_szl"), state)
+        assert read_szl[7 + 1] == 0x07 and read_szl[7 + 22] == 0xFF
+        unsupported = S7CommunicationSocketConnection.frame(bytes.fromhex("32010000000000020000ee00"), "DT Data")
+        assert classify(emulator.handle_frame(unsupported, state)).error_class == 0x81
+
+    def test_dt_before_connect(self, frames):
+        assert S7PLCEmulator().handle_frame(frames.get("setup_communication")) is None
+
+    def test_error_injection(self, frames):
+        with EmulatorThread(EmulatorConfig(error_rate=1.0, seed=1)) as emulator:
+            with socket.create_connection(("127.0.0.1", emulator.port)) as sock:
+                exchange(sock, frames.connect_request())
+                for _ in range(3):
+                    assert classify(exchange(sock, frames.get("read_var"))).error_class == 0x84
+            assert emulator.stats.errors_injected == 3
+
+    def test_crash_and_recover(self, frames):
+        with EmulatorThread(EmulatorConfig(crash_after=2, crash_duration=0.2)) as emulator:
+            with socket.create_connection(("127.0.0.1", emulator.port)) as sock:
+                exchange(sock, frames.connect_request())
+                assert exchange(sock, frames.get("read_var"))
+                # 第 2 个请求使模拟器崩溃，连接被断开
+                assert exchange(sock, frames.get("read_var")) == b""
+            with socket.create_connection(("127.0.0.1", emulator.port)) as sock:
+                assert exchange(sock, frames.connect_request()) == b""
+            time.sleep(0.3)
+            with socket.create_connection(("127.0.0.1", emulator.port)) as sock:
+                assert exchange(sock, frames.connect_request())
+                # 恢复后不会因请求数已超过 crash_after 而再次崩溃
+                assert exchange(sock, frames.get("setup_communication"))
+                assert exchange(sock, frames.get("read_var"))
+            assert emulator.stats.crashes == 1
+
+    def test_session_against_emulator(self, tmp_path):
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 7 + [True]))
+            session.fuzz_range(1, 30)
+            assert emulator.stats.connections == 1
+            assert session.handshake_stats()["handshakes_saved"] == 29
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
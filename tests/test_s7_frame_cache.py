@@ -0,0 +1,31 @@
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7_frame_cache import S7FrameCache
+
+
+class TestS7FrameCache:
+    """
+    测试策略：
+    1. 第一次获取未命中并构建帧，之后命中缓存且返回同一对象。
+    2. 不同的生成器参数对应不同的缓存项。
+    3. 下载功能的前置/后置帧按顺序包含建立通信、请求下载、结束下载。
+    """
+
+    def test_hit_and_miss(self):
+        cache = S7FrameCache()
+        first = cache.get("setup_communication")
+        assert cache.get("setup_communication") is first
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.get("setup_communication", [False, False, True])
+        assert cache.stats() == {"hits": 1, "misses": 2, "frames": 2}
+
+    def test_prologue_and_epilogue(self):
+        cache = S7FrameCache()
+        setup, request_download = cache.prologue("download")
+        assert setup.endswith(S7CommunicationGenerator.setup_communication().render())
+        assert request_download.endswith(S7CommunicationGenerator.request_download().render())
+        assert cache.epilogue("download")[0].endswith(S7CommunicationGenerator.end_download().render())
+        assert cache.prologue("read_var") == []
+
+    def test_connect_request(self):
+        cache = S7FrameCache()
+        assert cache.connect_request() == bytes.fromhex("0300001611e00000000f00c1020101c2020201c0010a")
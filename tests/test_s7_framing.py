@@ -0,0 +1,79 @@
+import socket
+import struct
+import threading
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_template import compile_function
+
+PDU_TYPES = ["CR Connect Request", "DT Data"]
+
+
+@pytest.fixture(autouse=True)
+def reset_pdu_type():
+    yield
+    S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+
+
+def sent_bytes(framing, pdu_type, payloads):
+    """
+    通过 socketpair 发送 payloads，返回对端收到的全部字节。
+    """
+    connection = S7CommunicationSocketConnection("127.0.0.1", 102, framing=framing)
+    connection._sock, peer = socket.socketpair()
+    S7CommunicationSocketConnection.set_pdu_type(pdu_type)
+    chunks = []
+
+    def read_until_closed():
+        while True:
+            chunk = peer.recv(65536)
+            if not chunk:
+                return
+            chunks.append(chunk)
+
+    # 对端边发边收，避免 socketpair 缓冲区写满后阻塞发送
+    reader = threading.Thread(target=read_until_closed, daemon=True)
+    reader.start()
+    try:
+        for payload in payloads:
+            connection.send(payload)
+    finally:
+        connection._sock.shutdown(socket.SHUT_WR)
+        reader.join(timeout=10)
+        connection._sock.close()
+        peer.close()
+    return b"".join(chunks)
+
+
+class TestS7Framing:
+    """
+    测试策略：
+    1. struct 封装与 scapy 封装对 CR、DT 两种 pdu 类型的输出逐字节一致。
+    2. 下载功能 Data 字段的所有变异（长度各不相同）经 sendmsg 发送后与 scapy 路径发送的字节一致。
+    3. 超过 TPKT 长度上限的数据两种方式都抛出 struct.error。
+    4. 不支持的 pdu 类型、封装方式抛出 ValueError。
+    """
+
+    @pytest.mark.parametrize("pdu_type", PDU_TYPES)
+    @pytest.mark.parametrize("payload", [b"", b"\x32\x01", b"A" * 1000])
+    def test_frame_matches_scapy(self, pdu_type, payload):
+        expected = S7CommunicationSocketConnection.frame_scapy(payload, pdu_type)
+        assert S7CommunicationSocketConnection.frame(payload, pdu_type) == expected
+
+    @pytest.mark.parametrize("pdu_type", PDU_TYPES)
+    def test_sendmsg_matches_scapy(self, pdu_type):
+        payloads = [bytes(data) for data in compile_function("download", [False] * 4 + [True])]
+        assert sent_bytes("native", pdu_type, payloads) == sent_bytes("scapy", pdu_type, payloads)
+
+    @pytest.mark.parametrize("framing", ["native", "scapy"])
+    def test_oversized_frame(self, framing):
+        # TPKT 长度字段最大为 65535
+        with pytest.raises(struct.error):
+            sent_bytes(framing, "DT Data", [b"A" * 65536])
+
+    def test_unsupported_pdu_type(self):
+        with pytest.raises(ValueError):
+            S7CommunicationSocketConnection.set_pdu_type("CC Connect Confirm")
+        with pytest.raises(ValueError):
+            S7CommunicationSocketConnection("127.0.0.1", 102, framing="raw")
@@ -0,0 +1,165 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from api import fuzz_job_api
+from controller.fuzz_job_controller import FuzzJobController
+from exceptions.fuzz_job_error import JobNotExistError, JobStateError
+from schema.fuzz_job_schema import FuzzJobCreate
+from services.fuzz_jobs import FuzzJobManager
+from services.fuzz_metrics import FuzzMetricsService
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorConfig, EmulatorThread
+
+FUZZABLE = [False] * 6 + [True, True]
+
+
+def wait_for(condition, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.05)
+
+
+def wait_stable(value, window: float = 0.5, timeout: float = 60.0):
+    # 等待取值在 window 秒内不再变化，返回稳定后的值
+    deadline = time.monotonic() + timeout
+    previous = value()
+    while True:
+        time.sleep(window)
+        current = value()
+        if current == previous:
+            return current
+        assert time.monotonic() < deadline, "等待超时"
+        previous = current
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = FuzzJobManager(max_workers=1, results_dir=str(tmp_path), poll_interval=0.05)
+    yield manager
+    manager.shutdown()
+
+
+class TestS7Jobs:
+    """
+    测试策略：
+    1. 提交时校验功能名称、变异规则长度与编号区间，不合法时报错且不登记任务；计算变异总数不渲染测试用例。
+    2. 任务在工作进程中执行并立即返回，超出工作进程数的任务排队，结束后可以读到结果。
+    3. 暂停后已执行的测试用例数不再增加，恢复后继续；取消终止工作进程，已结束的任务不能再暂停或取消。
+    4. 接口只能操作本用户的任务，不存在的任务返回 404，状态冲突返回 409，参数不合法返回 422。
+    5. 工作进程上报的指标快照出现在父进程的 /metrics 中，以任务 id 为 run_id，任务结束后不再输出。
+    """
+
+    def test_submit_validation(self, manager):
+        with pytest.raises(ValueError):
+            manager.submit("no_such_function", "127.0.0.1")
+        with pytest.raises(ValueError):
+            manager.submit("__init__", "127.0.0.1")
+        # S7CommunicationGenerator 中构造首部等的辅助方法不是可以模糊测试的功能
+        with pytest.raises(ValueError):
+            manager.submit("define_header", "127.0.0.1")
+        with pytest.raises(ValueError):
+            manager.submit("read_var", "127.0.0.1", fuzzable_list=[True])
+        with pytest.raises(ValueError):
+            manager.submit("read_var", "127.0.0.1", fuzzable_list=FUZZABLE, start=10, end=5)
+        assert manager.jobs() == []
+        with pytest.raises(JobNotExistError):
+            manager.get("missing")
+
+    def test_submit_large_function(self, manager):
+        # 变异总数不渲染测试用例，提交几十万个变异的任务也立即返回
+        manager.shutdown()
+        started = time.perf_counter()
+        with pytest.raises(JobStateError):
+            manager.submit("setup_communication", "127.0.0.1", fuzzable_list=[True] * 3)
+        assert time.perf_counter() - started < 0.5
+
+    def test_queue_and_results(self, manager):
+        with EmulatorThread() as emulator:
+            first = manager.submit("read_var", "127.0.0.1", emulator.port, FUZZABLE, 1, 20,
+                                   user_id=1, persistent=True)
+            second = manager.submit("read_var", "127.0.0.1", emulator.port, FUZZABLE, 21, 30, user_id=2)
+            assert first.status in ("queued", "running") and second.status == "queued"
+            assert first.job_id != second.job_id
+            wait_for(lambda: second.status not in ("queued", "running"))
+        assert first.status == second.status == "completed", (first.error, second.error)
+        assert first.started_at <= first.finished_at <= second.started_at
+        assert first.cases == first.result["cases"] == 20 and second.cases == 10
+        assert second.result["index_start"] == 21 and second.result["index_end"] == 30
+        info = second.to_dict()
+        assert info["total"] == 10 and info["target"] == f"127.0.0.1:{emulator.port}"
+        assert [job.job_id for job in manager.jobs(user_id=1)] == [first.job_id]
+        assert manager.jobs(status="completed") == [first, second]
+
+    def test_pause_resume_cancel(self, manager):
+        with EmulatorThread() as emulator:
+            job = manager.submit("read_var", "127.0.0.1", emulator.port, FUZZABLE, persistent=True)
+            queued = manager.submit("read_var", "127.0.0.1", emulator.port, FUZZABLE)
+            with pytest.raises(JobStateError):
+                manager.resume(job.job_id)
+            wait_for(lambda: job.cases > 5)
+            assert manager.pause(job.job_id).status == "paused"
+            with pytest.raises(JobStateError):
+                manager.pause(job.job_id)
+            # 暂停在当前测试用例结束后生效，工作进程每 0.1 秒同步一次暂停标志与进度
+            paused_at = wait_stable(lambda: job.cases)
+            time.sleep(1.0)
+            assert job.cases == paused_at
+            manager.resume(job.job_id)
+            wait_for(lambda: job.cases > paused_at)
+            assert manager.cancel(queued.job_id).status == "cancelled" and queued.started_at is None
+            assert manager.cancel(job.job_id).status == "cancelled"
+            wait_for(lambda: not job.process.is_alive())
+            for action in (manager.cancel, manager.pause):
+                with pytest.raises(JobStateError):
+                    action(job.job_id)
+        time.sleep(0.2)
+        assert job.status == queued.status == "cancelled" and job.result is None
+        assert queued.process is None
+
+    def test_metrics(self, manager):
+        service = FuzzMetricsService(manager.snapshots)
+        # 应答延迟使任务在抓取时仍在运行
+        with EmulatorThread(EmulatorConfig(latency=0.02)) as emulator:
+            job = manager.submit("read_var", "127.0.0.1", emulator.port, FUZZABLE, persistent=True,
+                                 adaptive_timeout=True)
+            wait_for(lambda: job.cases > 20 and job.snapshot() is not None and job.snapshot()["cases"] > 20)
+            text = service.render()
+            labels = f'{{run_id="{job.job_id}"}}'
+            assert f"s7_fuzz_cases_total{labels}" in text and f"s7_fuzz_workers{labels} 1" in text
+            assert f'run_id="{job.job_id}",worker="0",quantile="0.99"' in text
+            manager.cancel(job.job_id)
+        assert job.job_id not in service.render()
+
+    def test_api(self, manager):
+        controller = FuzzJobController(manager)
+        with EmulatorThread() as emulator:
+            create = FuzzJobCreate(function="read_var", ip="127.0.0.1", port=emulator.port,
+                                   fuzzable_list=FUZZABLE, end=5)
+            info = asyncio.run(fuzz_job_api.submit_job(create, user_id=7, controller=controller))
+            assert info["status"] in ("queued", "running") and info["user_id"] == 7
+            job_id = info["job_id"]
+            wait_for(lambda: manager.get(job_id).status == "completed")
+        assert asyncio.run(fuzz_job_api.get_job(job_id, user_id=7, controller=controller))["cases"] == 5
+        assert [item["job_id"] for item in asyncio.run(
+            fuzz_job_api.list_jobs("completed", user_id=7, controller=controller))] == [job_id]
+        assert asyncio.run(fuzz_job_api.list_jobs(None, user_id=8, controller=controller)) == []
+        for handler, user_id, job, code in (
+            (fuzz_job_api.get_job, 8, job_id, 404),
+            (fuzz_job_api.cancel_job, 7, "missing", 404),
+            (fuzz_job_api.pause_job, 7, job_id, 409),
+            (fuzz_job_api.resume_job, 7, job_id, 409),
+            (fuzz_job_api.cancel_job, 7, job_id, 409),
+        ):
+            with pytest.raises(HTTPException) as error:
+                asyncio.run(handler(job, user_id=user_id, controller=controller))
+            assert error.value.status_code == code
+        for create in (
+            FuzzJobCreate(function="read_var", ip="127.0.0.1", start=10 ** 9),
+            FuzzJobCreate(function="define_header", ip="127.0.0.1"),
+        ):
+            with pytest.raises(HTTPException) as error:
+                asyncio.run(fuzz_job_api.submit_job(create, user_id=7, controller=controller))
+            assert error.value.status_code == 422
+        routes = {(route.path, method) for route in fuzz_job_api.router.routes for method in route.methods}
+        assert ("/fuzz/jobs", "POST") in routes and ("/fuzz/jobs/{job_id}/resume", "POST") in routes
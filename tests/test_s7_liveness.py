@@ -0,0 +1,88 @@
+import time
+from boofuzz.sessions import Session
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorConfig, EmulatorThread
+from services.fuzzing_case_gen.s7_communication.s7_liveness import (
+    ALIVE, DEAD, DEGRADED, LivenessProber, ProbeSample,
+)
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestS7Liveness:
+    """
+    测试策略：
+    1. 目标正常时探测器判定存活，复用一条连接（只建立一次 TCP/COTP/建立通信），并记录 ping 时延的时间序列。
+    2. 目标崩溃后在数个探测间隔内判定宕机并暂停关联的会话，恢复后判定存活并继续会话。
+    3. ping 时延超过基线的倍数加绝对余量时判定性能下降；基线极小时超过倍数但不超过余量的抖动不判定性能下降。
+    4. 目标无法连接时判定宕机，时间序列记录失败的阶段。
+    """
+
+    def test_alive(self):
+        with EmulatorThread() as emulator:
+            with LivenessProber("127.0.0.1", emulator.port, interval=0.01) as prober:
+                assert prober.wait_alive(2.0)
+                assert wait_for(lambda: prober.probes >= 10)
+            assert emulator.stats.connections == 1
+        assert prober.state == ALIVE and prober.alive
+        series = prober.series()
+        assert series[0]["connect"] is not None and all(row["connect"] is None for row in series[1:])
+        assert all(row["ok"] and row["stage"] == "szl" and row["latency"] < 0.5 for row in series)
+        assert series == sorted(series, key=lambda row: row["timestamp"])
+
+    def test_pause_and_resume(self):
+        changes = []
+        session = Session(web_port=None, fuzz_loggers=[], db_filename=":memory:")
+        with EmulatorThread(EmulatorConfig(crash_duration=0.5)) as emulator:
+            prober = LivenessProber(
+                "127.0.0.1", emulator.port, interval=0.02, timeout=0.1,
+                on_change=lambda old, new, sample: changes.append(new),
+            )
+            prober.attach(session)
+            with prober:
+                assert prober.wait_alive(2.0)
+                crashed = time.monotonic()
+                emulator.call(emulator.emulator.crash)
+                assert wait_for(lambda: prober.state == DEAD)
+                assert time.monotonic() - crashed < 0.3
+                assert session.is_paused
+                assert wait_for(lambda: prober.state == ALIVE)
+                assert not session.is_paused
+        assert changes[0] == ALIVE and DEAD in changes and changes[-1] == ALIVE
+        assert any(not row["ok"] for row in prober.series())
+
+    def test_degraded(self):
+        with EmulatorThread(EmulatorConfig(latency=0.001)) as emulator:
+            with LivenessProber("127.0.0.1", emulator.port, interval=0.01, timeout=1.0, degraded_factor=5) as prober:
+                assert wait_for(lambda: prober.probes >= 10)
+                emulator.emulator.config.latency = 0.1
+                assert wait_for(lambda: prober.state == DEGRADED)
+                emulator.emulator.config.latency = 0.001
+                assert wait_for(lambda: prober.state == ALIVE)
+        assert max(row["latency"] for row in prober.series() if row["ok"]) >= 0.1
+
+    def test_degraded_floor(self):
+        prober = LivenessProber("127.0.0.1", 102, degraded_factor=5, degraded_delta=0.01)
+        for _ in range(10):
+            prober._record(ProbeSample(time.time(), True, "szl", latency=0.00005))
+        # 回环上的调度抖动：远超基线的 5 倍，但不超过绝对余量
+        prober._record(ProbeSample(time.time(), True, "szl", latency=0.002))
+        assert prober.state == ALIVE
+        prober._record(ProbeSample(time.time(), True, "szl", latency=0.02))
+        assert prober.state == DEGRADED
+        prober._loop.close()
+
+    def test_unreachable(self):
+        with EmulatorThread() as emulator:
+            port = emulator.port
+        with LivenessProber("127.0.0.1", port, interval=0.01, timeout=0.1) as prober:
+            assert wait_for(lambda: prober.state == DEAD)
+            assert not prober.wait_alive(0.05)
+        assert {row["stage"] for row in prober.series()} == {"tcp"}
+        assert prober.stats()["latency_p50"] is None
@@ -0,0 +1,108 @@
+import asyncio
+import gc
+from api import metrics_api
+from services.fuzz_metrics import FuzzMetricsService
+from services.fuzzing_case_gen.s7_communication.s7_metrics import register_session, sessions, snapshot, unregister_session
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+
+def parse(text: str) -> dict[str, float]:
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+def run_session(tmp_path, run_id: str, cases: int = 30, **kwargs) -> S7CommunicationSession:
+    with EmulatorThread() as emulator:
+        session = S7CommunicationSession(
+            "127.0.0.1", emulator.port, persistent=True, web_port=None, run_id=run_id,
+            db_filename=str(tmp_path / f"{run_id}.db"), fuzz_loggers=[], **kwargs,
+        )
+        session.connect(S7CommunicationGenerator.read_var([False] * 6 + [True, True]))
+        session.fuzz_range(1, cases)
+    S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+    return session
+
+
+class TestS7Metrics:
+    """
+    测试策略：
+    1. 会话创建时自动登记，模糊测试期间保持登记，结束或被回收后不再出现在登记表中。
+    2. 会话的快照给出测试用例数、超时数、往返时延分位数与利用率。
+    3. 同一个 run_id 的多个工作线程汇总输出，速率按相邻两次抓取之间的增量计算。
+    4. /metrics 接口返回 Prometheus 文本格式。
+    """
+
+    def test_registry(self, tmp_path):
+        session = S7CommunicationSession(web_port=None, fuzz_loggers=[], run_id="metrics-registry",
+                                         db_filename=str(tmp_path / "run.db"))
+        assert sessions()["metrics-registry"] == [session]
+        unregister_session("metrics-registry", session)
+        assert "metrics-registry" not in sessions()
+
+    def test_finished_run_unregistered(self, tmp_path):
+        running = []
+        session = run_session(tmp_path, "metrics-finished", cases=10,
+                              on_novel_signature=lambda run_id, entry, frame: running.append(run_id in sessions()))
+        assert running and all(running)
+        assert "metrics-finished" not in sessions() and session.cases_fuzzed == 10
+        # 没有运行过的会话被回收后也不再登记
+        idle = S7CommunicationSession(web_port=None, fuzz_loggers=[], run_id="metrics-idle",
+                                      db_filename=str(tmp_path / "idle.db"))
+        assert "metrics-idle" in sessions()
+        del idle
+        gc.collect()
+        assert "metrics-idle" not in sessions()
+
+    def test_snapshot(self, tmp_path):
+        session = run_session(tmp_path, "metrics-snapshot", adaptive_timeout=True)
+        item = snapshot(session)
+        assert item["cases"] == 30 and item["timeouts"] == 0 and item["novel_responses"] >= 1
+        assert item["responses"]["ack_data"] >= 30
+        assert 0 < item["rtt"][0.5] <= item["rtt"][0.99] < 1.0
+        assert 0 < item["busy"] <= item["elapsed"] and 0 < item["utilization"] <= 1.0
+        # 分阶段计时中的等待应答耗时也可以作为往返时延
+        assert snapshot(run_session(tmp_path, "metrics-phases", cases=5, phase_timing=True))["rtt"] is not None
+        assert snapshot(S7CommunicationSession(web_port=None, fuzz_loggers=[], db_filename=str(tmp_path / "x.db")))[
+            "rtt"] is None
+
+    def test_render(self, tmp_path):
+        first = run_session(tmp_path, "metrics-render", cases=10)
+        second = run_session(tmp_path, "metrics-render", cases=20, adaptive_timeout=True)
+        # 模拟两个仍在运行的工作线程
+        register_session("metrics-render", first)
+        register_session("metrics-render", second)
+        service = FuzzMetricsService()
+        text = service.render()
+        assert "# TYPE s7_fuzz_cases_total counter" in text
+        values = parse(text)
+        assert values['s7_fuzz_cases_total{run_id="metrics-render"}'] == 30
+        assert values['s7_fuzz_workers{run_id="metrics-render"}'] == 2
+        assert values['s7_fuzz_timeouts_total{run_id="metrics-render"}'] == 0
+        assert values['s7_fuzz_cases_per_second{run_id="metrics-render"}'] > 0
+        assert values['s7_fuzz_rtt_seconds{run_id="metrics-render",worker="1",quantile="0.99"}'] > 0
+        assert 0 < values['s7_fuzz_worker_utilization{run_id="metrics-render",worker="0"}'] <= 1
+        # 两次抓取之间没有新的测试用例
+        values = parse(service.render())
+        assert values['s7_fuzz_cases_per_second{run_id="metrics-render"}'] == 0
+        first.cases_fuzzed += 5
+        assert parse(service.render())['s7_fuzz_cases_total{run_id="metrics-render"}'] == 35
+        unregister_session("metrics-render")
+        assert "metrics-render" not in service.render() and second is not None
+
+    def test_api(self, tmp_path):
+        session = run_session(tmp_path, "metrics-api", cases=5)
+        register_session(session.run_id, session)
+        assert any(route.path == "/metrics" for route in metrics_api.router.routes)
+        response = asyncio.run(metrics_api.get_metrics())
+        assert response.status_code == 200 and response.media_type.startswith("text/plain; version=0.0.4")
+        assert parse(response.body.decode())['s7_fuzz_cases_total{run_id="metrics-api"}'] == 5
+        unregister_session(session.run_id)
@@ -0,0 +1,80 @@
+import struct
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorConfig, EmulatorThread
+from services.fuzzing_case_gen.s7_communication.s7_minimize import ReplayOracle, S7Minimizer, ddmin
+from services.fuzzing_case_gen.s7_communication.s7_replay import S7Replayer
+
+# read_var 中各字段在 S7 数据中的偏移：首部 10 字节、function、item_count 之后是 item
+TRANSPORT_SIZE, AREA = 15, 20
+
+
+class TestS7Minimize:
+    """
+    测试策略：
+    1. ddmin 返回 1-最小的子序列；空序列也能触发时返回空序列。
+    2. 变长的数据字段被删减到触发崩溃的最少字节，长度字段与 Size 语义一致；多余的变异字段恢复默认值。
+    3. 定长字段只保留触发崩溃的字段与字节；相同的候选用例只测试一次。
+    4. 按编号或原始数据构造崩溃用例；无法复现时抛出异常。
+    5. 以模拟器为目标、重放为 oracle 最小化一个组合变异的崩溃用例。
+    """
+
+    def test_ddmin(self):
+        assert ddmin(range(20), lambda keep: {3, 7} <= set(keep)) == [3, 7]
+        assert ddmin(range(8), lambda keep: True) == []
+        assert ddmin([5], lambda keep: 5 in keep) == [5]
+
+    def test_variable_field(self):
+        minimizer = S7Minimizer.from_function("download", [True] * 5, lambda s7: b"\xde\xad" in s7)
+        data = minimizer.template.field_index("unknown")
+        block_number = minimizer.template.field_index("block number")
+        payload = bytes(range(50)) + b"\xde\xad" + bytes(range(100, 148))
+        result = minimizer.minimize({data: payload, block_number: b"999999"})
+        assert result.values == {data: b"\xde\xad"}
+        assert result.fields == ["download.data.unknown"]
+        assert result.data.endswith(b"\xde\xad")
+        # S7 首部中的数据长度随数据字段一起修正
+        assert struct.unpack_from("!H", result.data, 8)[0] == 2
+        assert result.tests == len(minimizer.cache)
+
+    def test_fixed_fields(self):
+        oracle_calls = []
+
+        def oracle(s7):
+            oracle_calls.append(s7)
+            return s7[TRANSPORT_SIZE] == 0xFF and s7[AREA] == 0x00
+
+        minimizer = S7Minimizer.from_function("read_var", [True] * 8, oracle)
+        default = minimizer.template.template
+        payload = bytearray(default)
+        payload[12:24] = bytes([0xAA, 0xBB, 0xCC, 0xFF, 0x12, 0x34, 0x56, 0x78, 0x00, 0x99, 0x98, 0x97])
+        values = minimizer.values_from_payload(bytes(payload))
+        assert len(values) == 8
+        result = minimizer.minimize(values)
+        # 未命名 item 的 Block 名称取决于创建顺序，只比较字段名
+        assert [name.rsplit(".", 1)[1] for name in result.fields] == ["transport_size", "area"]
+        expected = bytearray(default)
+        expected[TRANSPORT_SIZE], expected[AREA] = 0xFF, 0x00
+        assert result.data == bytes(expected)
+        assert len(oracle_calls) == len(set(oracle_calls)) == result.tests
+        assert result.cache_hits > 0
+
+    def test_case_and_errors(self):
+        minimizer = S7Minimizer.from_function("download", [False] * 4 + [True], lambda s7: False)
+        values = minimizer.values_from_case(5)
+        rendered = minimizer.render(values)
+        assert minimizer.values_from_payload(rendered) == values
+        with pytest.raises(ValueError):
+            minimizer.minimize(values)
+        with pytest.raises(ValueError):
+            S7Minimizer.from_function("download", [True] * 5, bool).values_from_payload(b"\x32" * 80)
+
+    def test_emulator(self):
+        crash = lambda s7: len(s7) > AREA and s7[TRANSPORT_SIZE] == 0xFF and s7[AREA] == 0x00
+        with EmulatorThread(EmulatorConfig(crash_on=crash, crash_duration=0.05)) as emulator:
+            replayer = S7Replayer("127.0.0.1", emulator.port, "read_var", timeout=0.3, recover_timeout=3)
+            minimizer = S7Minimizer.from_function("read_var", [True] * 8, ReplayOracle(replayer))
+            fields = {name: minimizer.template.field_index(name) for name in ("transport_size", "area", "db_number")}
+            values = {fields["transport_size"]: b"\xff", fields["area"]: b"\x00", fields["db_number"]: b"\x12\x34"}
+            result = minimizer.minimize(values)
+        assert set(result.values) == {fields["transport_size"], fields["area"]}
+        assert emulator.stats.crashes >= 2
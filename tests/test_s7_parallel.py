@@ -0,0 +1,41 @@
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_parallel import shard_ranges, plan_shards, run_parallel
+from tests.test_s7_persistent import plc  # noqa: F401
+
+
+class TestS7Parallel:
+    """
+    测试策略：
+    1. 分片区间互不相交且完整覆盖 1..total。
+    2. 并发数受 connections_per_target 限制，分片轮流分配给各目标。
+    3. 多进程执行的用例数之和等于变异总数，合并报告中的失败编号为全局编号。
+    """
+
+    @pytest.mark.parametrize("total, shards", [(10, 3), (3, 8), (210, 4), (0, 2)])
+    def test_shard_ranges(self, total, shards):
+        ranges = shard_ranges(total, shards)
+        covered = [i for start, end in ranges for i in range(start, end + 1)]
+        assert covered == list(range(1, total + 1))
+
+    def test_plan_respects_connections_per_target(self, tmp_path):
+        targets = [("10.0.0.1", 102), ("10.0.0.2", 102)]
+        specs = plan_shards("read_var", [True] * 8, targets, workers=8, connections_per_target=2, results_dir=str(tmp_path))
+        assert len(specs) == 4
+        assert [(s["ip"]) for s in specs] == ["10.0.0.1", "10.0.0.2"] * 2
+        assert len({s["db_filename"] for s in specs}) == 4
+
+    @pytest.mark.parametrize("plc", [50], indirect=True)
+    def test_run_parallel(self, plc, tmp_path):
+        report = run_parallel(
+            "stop_plc",
+            [True],
+            [plc.server_address],
+            workers=3,
+            connections_per_target=3,
+            results_dir=str(tmp_path),
+            report_filename=str(tmp_path / "report.json"),
+            persistent=True,
+        )
+        assert report["cases"] == 210
+        assert len(report["shards"]) == 3
+        assert (tmp_path / "report.json").exists()
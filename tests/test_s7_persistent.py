@@ -0,0 +1,129 @@
+import socketserver
+import struct
+import threading
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_response import classify
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+
+CC = bytes.fromhex("0300001611d0000f000100c0010ac1020101c2020201")
+
+
+def ack_data(error_class=0x00):
+    s7 = bytes([0x32, 0x03, 0, 0, 0, 0, 0, 0, 0, 0, error_class, 0])
+    return struct.pack("!BBHBBB", 3, 0, 7 + len(s7), 2, 0xF0, 0x80) + s7
+
+
+class FakePLC(socketserver.ThreadingTCPServer):
+    """
+    收到一帧回复一帧的 PLC，对每 fatal_every 个停止 PLC 请求返回应用关系错误。
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fatal_every=0):
+        super().__init__(("127.0.0.1", 0), PLCHandler)
+        self.fatal_every = fatal_every
+        self.connections = 0
+        self.stop_requests = 0
+        # 收到的所有 S7 数据（不含 TPKT、COTP 首部）
+        self.payloads = []
+
+
+class PLCHandler(socketserver.BaseRequestHandler):
+    def recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        while True:
+            header = self.recv_exact(4)
+            if header is None:
+                return
+            body = self.recv_exact(struct.unpack("!H", header[2:])[0] - 4)
+            if body is None:
+                return
+            if body[1] == 0xE0:
+                self.request.sendall(CC)
+                continue
+            server.payloads.append(body[3:])
+            error_class = 0x00
+            # COTP DT 首部 3 字节，S7 Job 首部 10 字节之后是功能码
+            if len(body) > 13 and body[13] == 0x29:
+                server.stop_requests += 1
+                if server.fatal_every and server.stop_requests % server.fatal_every == 0:
+                    error_class = 0x81
+            self.request.sendall(ack_data(error_class))
+
+
+@pytest.fixture
+def plc(request):
+    server = FakePLC(getattr(request, "param", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+
+
+def make_session(plc, tmp_path, persistent, **kwargs):
+    session = S7CommunicationSession(
+        "127.0.0.1",
+        plc.server_address[1],
+        persistent=persistent,
+        web_port=None,
+        db_filename=str(tmp_path / "run.db"),
+        fuzz_loggers=[],
+        **kwargs,
+    )
+    session.connect(S7CommunicationGenerator.stop_plc([True]))
+    return session
+
+
+def run_session(plc, tmp_path, persistent, cases=20):
+    session = make_session(plc, tmp_path, persistent, index_end=cases)
+    session.fuzz()
+    return session
+
+
+class TestS7PersistentSession:
+    """
+    测试策略：
+    1. 默认模式下每个测试用例都重新建立 TCP 连接。
+    2. 持久模式下所有测试用例复用同一个连接，只握手一次，其余均计为节省的握手。
+    3. 持久模式下目标返回致命错误类别后，下一个测试用例重新连接并握手。
+    4. 应答分类只从 Ack/Ack_Data 应答的首部中取错误类别。
+    """
+
+    def test_default_reconnects_every_case(self, plc, tmp_path):
+        session = run_session(plc, tmp_path, persistent=False)
+        assert plc.connections == 20
+        assert session.handshake_stats()["handshakes_saved"] == 0
+
+    def test_persistent_reuses_channel(self, plc, tmp_path):
+        session = run_session(plc, tmp_path, persistent=True)
+        assert plc.connections == 1
+        assert session.handshake_stats() == {"handshakes": 1, "handshakes_saved": 19, "reconnects": 0}
+
+    @pytest.mark.parametrize("plc", [5], indirect=True)
+    def test_persistent_reconnects_on_fatal_error(self, plc, tmp_path):
+        session = run_session(plc, tmp_path, persistent=True)
+        # 第 5、10、15、20 个用例返回致命错误，最后一个之后不再有用例
+        assert plc.connections == 4
+        assert session.handshake_stats() == {"handshakes": 4, "handshakes_saved": 16, "reconnects": 3}
+
+    def test_error_class(self):
+        assert classify(ack_data(0x81)).error_class == 0x81
+        assert classify(CC).error_class is None
+        assert classify(b"").error_class is None
@@ -0,0 +1,121 @@
+import random
+import threading
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_phases import LogHistogram, PhaseTimer, PHASES
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+
+class TestS7Phases:
+    """
+    测试策略：
+    1. 对数直方图的分位数与精确值的相对误差不超过子桶宽度，小于子桶个数的值精确记录，超出上限的值按上限记录。
+    2. 直方图可以合并，参数不一致时报错。
+    3. 另一个线程记录时不加锁读取分位数不会出错：count 已增加而 min/max 尚未设置时返回 None。
+    4. 计时包装保留回调名称，各阶段耗时在后置回调结束时归入 (功能, 字段, 阶段)，报告按功能汇总。
+    5. 会话启用分阶段计时后每个测试用例记录全部阶段；未启用时不包装回调。
+    """
+
+    def test_histogram_accuracy(self):
+        rng = random.Random(1)
+        histogram = LogHistogram(significant_bits=7)
+        values = sorted(int(rng.lognormvariate(10, 2)) for _ in range(20000))
+        for value in values:
+            histogram.record(value)
+        for percentile in (50, 90, 99, 99.9):
+            exact = values[int(-(-len(values) * percentile // 100)) - 1]
+            assert histogram.percentile(percentile) == pytest.approx(exact, rel=2 ** -6)
+        assert histogram.min == values[0] and histogram.max == values[-1] and histogram.count == 20000
+        small = LogHistogram()
+        for value in (3, 3, 100):
+            small.record(value)
+        assert small.percentile(50) == 3 and small.percentile(100) == 100
+        small.record(1 << 50)
+        assert small.max == small.highest
+        assert LogHistogram().percentile(50) is None
+        with pytest.raises(ValueError):
+            LogHistogram(significant_bits=0)
+
+    def test_histogram_merge(self):
+        a, b = LogHistogram(), LogHistogram()
+        for value in range(1000):
+            (a if value % 2 else b).record(value * 1000)
+        a.merge(b)
+        assert a.count == 1000 and a.min == 0 and a.max == 999000
+        assert a.percentile(50) == pytest.approx(499000, rel=2 ** -6)
+        with pytest.raises(ValueError):
+            a.merge(LogHistogram(significant_bits=5))
+
+    def test_histogram_concurrent_read(self):
+        partial = LogHistogram()
+        partial.counts[partial._index(5)] += 1
+        partial.count = 1
+        assert partial.percentile(50) is None
+        histogram = LogHistogram()
+        stop = threading.Event()
+
+        def write():
+            value = 0
+            while not stop.is_set():
+                histogram.record(value)
+                value += 1
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(20000):
+                result = histogram.percentile(99)
+                assert result is None or result >= 0
+        finally:
+            stop.set()
+            writer.join()
+        assert histogram.count and histogram.percentile(99) <= histogram.max
+
+    def test_timer(self):
+        timer = PhaseTimer()
+
+        def cr_tpdu():
+            pass
+
+        pre_send = timer.timed("pre_send", cr_tpdu)
+        post = timer.timed("post", lambda: None)
+        assert pre_send.__name__ == "cr_tpdu"
+        for case in range(10):
+            pre_send()
+            timer.begin_case("read_var", "read_var.item.address" if case % 2 else "read_var.item.area")
+            timer.mark("send", 1000)
+            timer.mark("recv", 50000 + case)
+            post()
+        # 没有执行到后置回调的用例被丢弃
+        pre_send()
+        report = timer.report()
+        phases = report["read_var"]["phases"]
+        assert list(phases) == ["pre_send", "send", "recv", "post", "total"]
+        assert phases["send"]["count"] == 10 and phases["send"]["p50"] == 1.0
+        assert phases["total"]["count"] == 10
+        assert report["read_var"]["fields"]["read_var.item.address"]["recv"]["count"] == 5
+        assert set(PHASES) >= set(phases)
+
+    def test_session_phases(self, tmp_path):
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None, phase_timing=True,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 6 + [True, True]))
+            session.fuzz_range(1, 30)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        stats = session.phase_stats()
+        assert stats["run_id"] == session.run_id
+        phases = stats["functions"]["read_var"]["phases"]
+        assert list(phases) == list(PHASES)
+        assert all(phase["count"] == 30 for phase in phases.values())
+        assert phases["total"]["p50"] >= phases["recv"]["p50"]
+        assert all(field.startswith("read_var.") for field in stats["functions"]["read_var"]["fields"])
+        plain = S7CommunicationSession(web_port=None, fuzz_loggers=[], db_filename=str(tmp_path / "plain.db"))
+        assert plain.phase_stats() is None and not plain.connection.track_send
+        assert plain._callback_monitor.on_pre_send == [S7CommunicationSession.cr_tpdu]
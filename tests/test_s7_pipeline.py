@@ -0,0 +1,81 @@
+import time
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_case_index import S7CaseIndex
+from services.fuzzing_case_gen.s7_communication.s7_frame_cache import S7FrameCache
+from services.fuzzing_case_gen.s7_communication.s7_pipeline import S7Pipeline, negotiated_amq, setup_frame
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import (
+    ConnectionState,
+    EmulatorConfig,
+    EmulatorThread,
+    S7PLCEmulator,
+)
+
+
+def make_session(port, tmp_path, request):
+    session = S7CommunicationSession(
+        "127.0.0.1", port, web_port=None, db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+    )
+    session.connect(request)
+    return session
+
+
+class TestS7Pipeline:
+    """
+    测试策略：
+    1. 建立通信请求指定的 AmQ，并从应答中取出协商的 AmQ。
+    2. 流水线中每个测试用例都收到 pdu 引用与自己相同的应答，且恰好一次。
+    3. 应答有延迟时，流水线的耗时明显少于逐个发送。
+    4. 需要前置/后置数据包的功能不能流水线发送。
+    """
+
+    def test_negotiated_amq(self):
+        emulator = S7PLCEmulator(EmulatorConfig(max_amq=4))
+        state = ConnectionState(cotp_connected=True)
+        assert negotiated_amq(emulator.handle_frame(setup_frame(S7FrameCache(), 16), state)) == 4
+        assert negotiated_amq(emulator.handle_frame(setup_frame(S7FrameCache(), 2), state)) == 2
+        assert negotiated_amq(S7FrameCache().connect_request()) is None
+        assert negotiated_amq(b"") is None
+
+    def test_replies_matched_by_reference(self):
+        index = S7CaseIndex.from_function("read_var", [False] * 6 + [True, True])
+        with EmulatorThread(EmulatorConfig(max_amq=8, jitter=0.005, seed=3)) as emulator:
+            pipeline = S7Pipeline(S7CommunicationSocketConnection("127.0.0.1", emulator.port, recv_timeout=1.0))
+            assert pipeline.open() == 8
+            cases = range(1, 61)
+            results = list(pipeline.run((case, index.render(case)) for case in cases))
+            pipeline.close()
+        assert sorted(result.case for result in results) == list(cases)
+        for result in results:
+            assert result.response.pdu_reference == int.from_bytes(result.data[4:6], "big")
+            # 除 pdu 引用外与按编号渲染的数据一致
+            expected = index.render(result.case)
+            assert result.data[:4] == expected[:4] and result.data[6:] == expected[6:]
+        assert pipeline.stats()["answered"] == 60 and pipeline.stats()["unmatched"] == 0
+
+    def test_pipelined_faster(self, tmp_path):
+        request = S7CommunicationGenerator.read_var([False] * 7 + [True])
+        with EmulatorThread(EmulatorConfig(max_amq=8, latency=0.01)) as emulator:
+            session = make_session(emulator.port, tmp_path, request)
+            started = time.perf_counter()
+            stats = session.fuzz_pipelined(1, 40)
+            pipelined = time.perf_counter() - started
+            assert stats["window"] == 8 and stats["answered"] == 40
+            assert session.signatures.total == 40
+
+            session = make_session(emulator.port, tmp_path, request)
+            started = time.perf_counter()
+            session.fuzz_pipelined(1, 40, max_amq=1)
+            sequential = time.perf_counter() - started
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        assert sequential > 0.4
+        assert pipelined < sequential / 2
+
+    def test_rejects_stateful_functions(self, tmp_path):
+        session = make_session(102, tmp_path, S7CommunicationGenerator.download([False] * 4 + [True]))
+        with pytest.raises(ValueError):
+            session.fuzz_pipelined()
@@ -0,0 +1,65 @@
+import inspect
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator, READ_VAR_ITEM
+from services.fuzzing_case_gen.s7_communication.s7_case_index import S7CaseIndex
+from services.fuzzing_case_gen.s7_communication.s7_read_var import ReadVarCases
+from services.fuzzing_case_gen.s7_communication.s7_template import compile_request
+
+ITEMS = [(0x12, 0x0A, 0x10, 0x02, 0x0010, db, 0x84, db * 8) for db in range(1, 4)]
+FUZZABLE_LISTS = [[True] * 8, [False] * 8, [False] * 5 + [True, False, True]]
+
+
+class TestS7ReadVar:
+    """
+    测试策略：
+    1. 多 item 请求中 item_count 与 parameter_length 与 item 个数一致，item 个数或变异规则不合法时抛出异常。
+    2. 延迟枚举的编号、顺序与渲染结果与 boofuzz 遍历 read_var_items 生成的 Request 完全一致。
+    3. 只有一个默认 item 时与原有的 read_var 一致。
+    4. 大量 item 时按编号随机渲染与顺序遍历一致，遍历为生成器。
+    """
+
+    def test_request(self):
+        data = S7CommunicationGenerator.read_var_items(ITEMS, FUZZABLE_LISTS).render()
+        assert data[10:12] == bytes([0x04, 3])
+        assert int.from_bytes(data[6:8], "big") == 2 + 12 * 3 == len(data) - 10
+        with pytest.raises(ValueError):
+            S7CommunicationGenerator.read_var_items([])
+        with pytest.raises(ValueError):
+            S7CommunicationGenerator.read_var_items([READ_VAR_ITEM] * 256)
+        with pytest.raises(ValueError):
+            ReadVarCases(ITEMS, FUZZABLE_LISTS[:2])
+
+    def test_matches_boofuzz(self):
+        request = S7CommunicationGenerator.read_var_items(ITEMS, FUZZABLE_LISTS)
+        template = compile_request(request)
+        cases = ReadVarCases(ITEMS, FUZZABLE_LISTS)
+        assert cases.total == template.num_mutations == request.num_mutations()
+        assert cases.default() == request.render()
+        for (case, payload), expected in zip(cases, template):
+            assert payload == bytes(expected) == cases.render(case)
+            field_index, value_index = template.locate(case - 1)
+            name = template.fields[field_index].name
+            item_index, field, field_value_index = cases.describe(case)
+            assert name.endswith(f"item{item_index}.{field}") and value_index == field_value_index
+        with pytest.raises(IndexError):
+            cases.render(cases.total + 1)
+
+    def test_single_item_matches_read_var(self):
+        index = S7CaseIndex.from_function("read_var", [True] * 8)
+        cases = ReadVarCases([READ_VAR_ITEM], [[True] * 8])
+        assert cases.total == index.total
+        assert all(payload == index.render(case) for case, payload in cases)
+
+    def test_many_items(self):
+        items = [(0x12, 0x0A, 0x10, 0x02, 0x0001, db, 0x84, db * 8) for db in range(150)]
+        cases = ReadVarCases(items, [[True] * 8] * len(items))
+        iterator = iter(cases)
+        assert inspect.isgenerator(iterator)
+        samples = {1, 2, cases.total // 3, cases.total // 2, cases.total}
+        seen = 0
+        for case, payload in iterator:
+            seen += 1
+            if case in samples:
+                assert payload == cases.render(case)
+                assert payload[11] == 150 and len(payload) == 12 + 12 * 150
+        assert seen == cases.total
@@ -0,0 +1,96 @@
+import sqlite3
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_case_index import S7CaseIndex
+from services.fuzzing_case_gen.s7_communication.s7_corpus import export_corpus
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorConfig, EmulatorThread
+from services.fuzzing_case_gen.s7_communication.s7_replay import (
+    ReplayCase,
+    S7Replayer,
+    cases_from_corpus,
+    cases_from_indexes,
+    cases_from_run_log,
+    parse_cases,
+)
+
+FUZZABLE_LIST = [False] * 6 + [True, True]
+CRASH_CASE = 7
+
+
+@pytest.fixture
+def crash_payload():
+    return S7CaseIndex.from_function("read_var", FUZZABLE_LIST).render(CRASH_CASE)
+
+
+class TestS7Replay:
+    """
+    测试策略：
+    1. 编号列表的解析；按编号、语料文件与运行日志得到的用例数据一致，日志中截断的数据按编号重新渲染；
+       语料的功能或变异规则与重放参数不一致时报错。
+    2. 重放到模拟器：只有使模拟器崩溃的用例被报告为复现，其它用例正常应答。
+    3. 目标崩溃后等待其恢复再重放后续用例；一直不恢复时跳过后续用例。
+    4. 带前置数据包的功能按 CR、前置数据包、变异数据包的顺序发送。
+    """
+
+    def test_case_sources(self, tmp_path):
+        assert parse_cases("1,5, 10-12") == [1, 5, 10, 11, 12]
+        index = S7CaseIndex.from_function("read_var", FUZZABLE_LIST)
+        expected = [ReplayCase(case, index.render(case)) for case in (3, 4)]
+        assert cases_from_indexes("read_var", FUZZABLE_LIST, [3, 4]) == expected
+        corpus = str(tmp_path / "read_var.corpus")
+        export_corpus(corpus, "read_var", FUZZABLE_LIST, start=1, end=10)
+        assert cases_from_corpus(corpus, [3, 4]) == expected
+        assert len(cases_from_corpus(corpus)) == 10
+        assert cases_from_corpus(corpus, [3], "read_var", FUZZABLE_LIST) == expected[:1]
+        with pytest.raises(ValueError):
+            cases_from_corpus(corpus, [3], "download")
+        with pytest.raises(ValueError):
+            cases_from_corpus(corpus, [3], "read_var", [True] * 8)
+
+        db = str(tmp_path / "run.db")
+        database = sqlite3.connect(db)
+        database.execute("CREATE TABLE cases (name text, number integer, timestamp TEXT)")
+        database.execute(
+            "CREATE TABLE steps (test_case_index integer, type text, description text, data blob, "
+            "timestamp TEXT, is_truncated BOOLEAN)"
+        )
+        for case, truncated in ((3, False), (4, True), (5, False)):
+            database.execute("INSERT INTO cases VALUES (?, ?, '')", [f"read_var.{case}", case])
+            database.execute("INSERT INTO steps VALUES (?, 'send', '', ?, '', 0)", [case, b"\x03\x00\x00\x16"])
+            data = index.render(case)[:4] if truncated else index.render(case)
+            database.execute("INSERT INTO steps VALUES (?, 'send', '', ?, '', ?)", [case, data, truncated])
+            if case != 5:
+                database.execute("INSERT INTO steps VALUES (?, 'fail', 'no response', NULL, '', 0)", [case])
+        database.commit()
+        database.close()
+        assert cases_from_run_log(db, "read_var", FUZZABLE_LIST) == expected
+        assert [case.case for case in cases_from_run_log(db, failed_only=False)] == [3, 5]
+
+    def test_reproduce(self, crash_payload):
+        config = EmulatorConfig(crash_on=lambda s7: s7 == crash_payload, crash_duration=0.3)
+        with EmulatorThread(config) as emulator:
+            replayer = S7Replayer("127.0.0.1", emulator.port, "read_var", timeout=0.5, recover_timeout=5)
+            cases = cases_from_indexes("read_var", FUZZABLE_LIST, [CRASH_CASE - 1, CRASH_CASE, CRASH_CASE + 1])
+            results = replayer.replay(cases)
+            assert [result.reproduced for result in results] == [False, True, False]
+            assert results[0].reason == "ok" and results[0].response.startswith("ack_data")
+            assert results[1].reason in ("no_reply", "connection_reset")
+            assert emulator.stats.crashes == 1
+
+    def test_target_stays_down(self, crash_payload):
+        config = EmulatorConfig(crash_on=lambda s7: s7 == crash_payload)
+        with EmulatorThread(config) as emulator:
+            replayer = S7Replayer("127.0.0.1", emulator.port, "read_var", repeat=3, timeout=0.3, recover_timeout=0.5)
+            cases = cases_from_indexes("read_var", FUZZABLE_LIST, [CRASH_CASE, 1, 2])
+            results = replayer.replay(cases)
+            assert results[0].reproduced and results[0].attempts == 1
+            assert [result.reason for result in results[1:]] == ["skipped", "skipped"]
+
+    def test_prologue(self):
+        with EmulatorThread() as emulator:
+            replayer = S7Replayer("127.0.0.1", emulator.port, "download", timeout=0.5)
+            results = replayer.replay(cases_from_indexes("download", [True] * 5, [1, 2]))
+            assert [result.reason for result in results] == ["ok", "ok"]
+            # 每个用例及其后的探测各发送一次建立通信
+            assert emulator.stats.functions[0xF0] == 4
+            assert emulator.stats.functions[0xFA] == 2
+            assert emulator.stats.functions[0xFB] == 2
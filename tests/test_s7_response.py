@@ -0,0 +1,82 @@
+import struct
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_response import TPKTReassembler, classify
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+CC = bytes.fromhex("0300001611d0000f000100c0010ac1020101c2020201")
+
+
+def dt(s7: bytes) -> bytes:
+    return struct.pack("!BBHBBB", 3, 0, 7 + len(s7), 2, 0xF0, 0x80) + s7
+
+
+def ack_data(error_class=0x00, error_code=0x00, pdu_reference=1):
+    return dt(struct.pack("!BBHHHHBB", 0x32, 0x03, 0, pdu_reference, 0, 0, error_class, error_code))
+
+
+def userdata(error_code=0x0000):
+    parameter = bytes([0x00, 0x01, 0x12, 0x08, 0x12, 0x84, 0x01, 0x01, 0x00, 0x00]) + struct.pack("!H", error_code)
+    return dt(struct.pack("!BBHHHH", 0x32, 0x07, 0, 7, len(parameter), 0) + parameter)
+
+
+class TestS7Response:
+    """
+    测试策略：
+    1. 一个块中的多个帧全部被切分出来，并且是原数据的 memoryview 切片。
+    2. 跨越多个块的帧在最后一个块到达后才返回，内容完整。
+    3. 无效的 TPKT 首部被丢弃并计入 errors，之后的帧仍能正常切分。
+    4. classify 区分 COTP 连接确认、Ack_Data 错误、Userdata 错误以及无效帧。
+    5. 会话对模拟器的每个测试用例应答进行分类并累计次数。
+    """
+
+    def test_multiple_frames_in_one_chunk(self):
+        chunk = ack_data(pdu_reference=1) + ack_data(pdu_reference=2) + CC
+        reassembler = TPKTReassembler()
+        frames = reassembler.feed(chunk)
+        assert [bytes(frame) for frame in frames] == [ack_data(pdu_reference=1), ack_data(pdu_reference=2), CC]
+        assert all(isinstance(frame, memoryview) for frame in frames)
+        assert reassembler.pending == 0 and reassembler.frames == 3
+
+    def test_frame_split_across_chunks(self):
+        stream = ack_data(pdu_reference=1) + ack_data(pdu_reference=2)
+        reassembler = TPKTReassembler()
+        frames = []
+        # 逐字节输入，包括在 TPKT 首部中间切分
+        for i in range(len(stream)):
+            frames += reassembler.feed(stream[i:i + 1])
+        assert [bytes(frame) for frame in frames] == [ack_data(pdu_reference=1), ack_data(pdu_reference=2)]
+        assert reassembler.pending == 0
+
+    def test_invalid_header_dropped(self):
+        reassembler = TPKTReassembler()
+        assert reassembler.feed(b"\x05\x00\x00\x10garbage") == []
+        assert reassembler.errors == 1 and reassembler.pending == 0
+        assert [bytes(frame) for frame in reassembler.feed(CC)] == [CC]
+
+    def test_classify(self):
+        assert classify(CC).kind == "cc"
+        error = classify(ack_data(0x81, 0x04, pdu_reference=9))
+        assert (error.kind, error.pdu_reference, error.error) == ("ack_data", 9, 0x8104)
+        assert not error.ok and "application relationship" in str(error)
+        assert classify(ack_data()).ok
+        assert classify(userdata()).ok
+        assert classify(userdata(0xD401)).error == 0xD401
+        assert classify(b"\x03\x00").kind == "invalid"
+        assert classify(dt(b"\x72\x01")).kind == "invalid"
+
+    def test_session_classifies_replies(self, tmp_path):
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 7 + [True]))
+            session.fuzz_range(1, 10)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        assert sum(session.response_counts.values()) == 10
+        assert set(session.response_counts) <= {"ack", "ack_data"}
+        assert len(session.last_responses) == 1
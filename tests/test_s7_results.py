@@ -0,0 +1,127 @@
+import time
+from services.fuzzing_case_gen.s7_communication import s7_results
+from services.fuzzing_case_gen.s7_communication.s7_results import ResultsStore, mutation_hash, outcome
+from services.fuzzing_case_gen.s7_communication.s7_response import S7Response
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+FIELDS = ["read_var.item.address", "read_var.item.area", "read_var.item.length"]
+
+
+def fill(store: ResultsStore, count: int):
+    for case in range(1, count + 1):
+        timed_out = case % 10 == 0
+        store.append(
+            case=case,
+            field=FIELDS[case % 3],
+            mutation=mutation_hash(case.to_bytes(4, "big")),
+            send=1000.0 + case,
+            recv=None if timed_out else 1000.0 + case + 0.01,
+            signature=None if timed_out else f"{case % 4 + 1:016x}",
+            outcome="timeout" if timed_out else "ok",
+        )
+
+
+class TestS7Results:
+    """
+    测试策略：
+    1. 记录按批写入段文件，段写满后开始新的段；重新打开存储后在其后追加，字段字典保持不变。
+    2. 按字段（支持通配符）、连接结果、用例区间、应答签名查询，记录的各列原样还原，没有应答时为 None。
+    3. 没有安装 numpy 时逐条扫描，结果与向量化查询一致。
+    4. 连接结果由应答分类与连接是否被重置决定。
+    5. 会话设置结果存储后为每个测试用例追加一条记录，流水线模式也是如此。
+    6. 十万条记录的写入与查询都在数秒内完成。
+    """
+
+    def test_segments_and_reopen(self, tmp_path):
+        with ResultsStore(str(tmp_path), batch_size=16, segment_records=100) as store:
+            fill(store, 250)
+            assert len(store) == 250
+        assert len(store.segments()) == 3
+        store = ResultsStore(str(tmp_path), batch_size=16, segment_records=100)
+        assert store.fields == FIELDS[1:] + FIELDS[:1]
+        store.append(251, "read_var.item.db", 1, 2000.0, None, None, "reset")
+        assert len(store) == 251
+        store.close()
+        assert len(store.segments()) == 3
+        assert ResultsStore(str(tmp_path)).select(outcome="reset")[0].field == "read_var.item.db"
+
+    def test_query(self, tmp_path):
+        store = ResultsStore(str(tmp_path), batch_size=7, segment_records=64)
+        fill(store, 300)
+        timeouts = store.select(field="read_var.*.address", outcome="timeout")
+        assert [r.case for r in timeouts] == [c for c in range(1, 301) if c % 30 == 0]
+        assert all(r.recv is None and r.signature is None for r in timeouts)
+        assert store.count(outcome=["timeout", "reset"]) == 30
+        assert store.count(case_range=(10, 19)) == 10
+        assert store.count(signature=f"{2:016x}") == len([c for c in range(1, 301) if c % 4 == 1 and c % 10])
+        assert store.count(after=1290.0) == 11
+        record = store.select(case_range=(7, 7))[0]
+        assert record.field == FIELDS[1] and record.outcome == "ok"
+        assert record.mutation == mutation_hash((7).to_bytes(4, "big"))
+        assert record.send == 1007.0 and record.recv == 1007.01 and record.signature == f"{4:016x}"
+        assert len(store.select(limit=5)) == 5
+        assert store.count(field="write_var.*") == 0
+
+    def test_without_numpy(self, tmp_path, monkeypatch):
+        store = ResultsStore(str(tmp_path), batch_size=10, segment_records=50)
+        fill(store, 120)
+        expected = store.select(field="*.length", outcome="ok", case_range=(20, 100))
+        monkeypatch.setattr(s7_results, "np", None)
+        assert store.select(field="*.length", outcome="ok", case_range=(20, 100)) == expected
+        assert store.count(signature=f"{1:016x}") == len([c for c in range(1, 121) if c % 4 == 0 and c % 10])
+
+    def test_outcome(self):
+        ok = S7Response("ack_data", 0x03, 1)
+        error = S7Response("ack_data", 0x03, 1, 0x85, 0x00)
+        assert outcome([ok]) == "ok"
+        assert outcome([]) == "timeout"
+        assert outcome([ok, error]) == "error"
+        assert outcome([error, S7Response("invalid", None, None)]) == "invalid"
+        assert outcome([], connection_lost=True) == "reset"
+
+    def test_session_results(self, tmp_path):
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None, results=str(tmp_path / "results"),
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 6 + [True, True]))
+            session.fuzz_range(1, 20)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        session.results.close()
+        records = ResultsStore(str(tmp_path / "results")).select()
+        assert [r.case for r in records] == list(range(1, 21))
+        assert all(r.field.startswith("read_var.") and r.signature for r in records)
+        assert all(r.outcome in ("ok", "error") and r.recv >= r.send for r in records)
+        assert len({r.mutation for r in records}) > 1
+
+    def test_pipelined_results(self, tmp_path):
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, web_port=None, results=str(tmp_path / "results"),
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 7 + [True]))
+            stats = session.fuzz_pipelined(1, 20)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        session.results.close()
+        records = ResultsStore(str(tmp_path / "results")).select()
+        assert sorted(r.case for r in records) == list(range(1, 21)) and stats["answered"] == 20
+        assert all(r.field.startswith("read_var.") and r.field.endswith(".address") and r.signature for r in records)
+        assert all(r.outcome in ("ok", "error") and r.recv >= r.send > 0 for r in records)
+
+    def test_scale(self, tmp_path):
+        store = ResultsStore(str(tmp_path))
+        started = time.perf_counter()
+        fill(store, 100_000)
+        store.flush()
+        assert time.perf_counter() - started < 5.0
+        started = time.perf_counter()
+        assert store.count(field="*.address", outcome="timeout") == 3333
+        assert len(store.select(field="*.address", outcome="timeout")) == 3333
+        assert time.perf_counter() - started < 2.0
@@ -0,0 +1,113 @@
+import json
+import os
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7_ring_log import RingBufferLogger
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+
+def run_case(logger: RingBufferLogger, index: int, reply: bytes = b"\x03\x00\x00\x04"):
+    logger.open_test_case(f"case{index}", name=f"read_var.item.address:{index}", index=index)
+    logger.open_test_step("Fuzzing Node 'read_var'")
+    logger.log_send(index.to_bytes(2, "big") * 8)
+    logger.log_recv(reply)
+    logger.close_test_case()
+
+
+def load(filename: str) -> dict:
+    with open(filename, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestS7RingLog:
+    """
+    测试策略：
+    1. 正常情况下不写盘，只保留最近 slots 个测试用例，最旧的用例被覆盖。
+    2. 超时（空应答）、失败、错误或 trigger 时在用例结束后写出尚未写出的用例，同一用例不会被写出两次。
+    3. 超出槽位大小的数据被截断并计数，不影响相邻槽位。
+    4. 会话启用环形缓冲日志后不再创建 sqlite 结果数据库，新颖的应答签名触发写出，单个用例的日志开销有上界。
+    5. 流水线模式下每个用例结束时写出，新颖应答的用例不会在写出前被之后的用例覆盖。
+    """
+
+    def test_ring_wraps_without_dumping(self, tmp_path):
+        logger = RingBufferLogger(str(tmp_path / "ring"), slots=4, slot_bytes=256)
+        for index in range(1, 11):
+            run_case(logger, index)
+        assert not os.path.exists(tmp_path / "ring")
+        cases = logger.cases()
+        assert [case["index"] for case in cases] == [7, 8, 9, 10]
+        assert [event["type"] for event in cases[0]["events"]] == ["step", "send", "recv"]
+        assert cases[-1]["events"][1]["data"] == ((10).to_bytes(2, "big") * 8).hex()
+        assert logger.stats()["cases"] == 10 and logger.stats()["memory_bytes"] == 1024
+        with pytest.raises(ValueError):
+            RingBufferLogger(str(tmp_path), slots=0)
+
+    def test_dump_triggers(self, tmp_path):
+        logger = RingBufferLogger(str(tmp_path), slots=8, slot_bytes=256)
+        for index in range(1, 4):
+            run_case(logger, index)
+        run_case(logger, 4, reply=b"")
+        dumped = load(os.path.join(tmp_path, "ring-000001-timeout.json"))
+        assert dumped["reason"] == "timeout" and [case["index"] for case in dumped["cases"]] == [1, 2, 3, 4]
+        assert dumped["cases"][-1]["events"][-1] == {"type": "recv", "data": ""}
+        run_case(logger, 5)
+        logger.open_test_case("case6", name="case6", index=6)
+        logger.trigger("novel")
+        logger.log_fail("目标没有应答")
+        logger.close_test_case()
+        dumped = load(os.path.join(tmp_path, "ring-000002-novel.json"))
+        assert [case["index"] for case in dumped["cases"]] == [5, 6]
+        assert dumped["cases"][-1]["events"] == [{"type": "fail", "description": "目标没有应答"}]
+        run_case(logger, 7)
+        logger.close_test()
+        stats = logger.stats()
+        assert stats["dumps"] == 2 and stats["timeouts"] == 1 and stats["failures"] == 1
+
+    def test_truncation(self, tmp_path):
+        logger = RingBufferLogger(str(tmp_path), slots=2, slot_bytes=64)
+        logger.open_test_case("case1", name="case1", index=1)
+        logger.log_send(b"\xaa" * 100)
+        logger.log_recv(b"\xbb" * 10)
+        logger.close_test_case()
+        run_case(logger, 2, reply=b"\x01")
+        first, second = logger.cases()
+        assert first["truncated"] and first["events"] == [{"type": "send", "data": "aa" * 59}]
+        assert not second["truncated"] and second["events"][-1] == {"type": "recv", "data": "01"}
+        assert logger.stats()["truncated"] == 1
+
+    def test_session_ring_log(self, tmp_path):
+        logger = RingBufferLogger(str(tmp_path / "ring"), slots=16)
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None, ring_log=logger,
+                db_filename=str(tmp_path / "run.db"),
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 6 + [True, True]))
+            session.fuzz_range(1, 40)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        stats = logger.stats()
+        assert stats["cases"] == 40 and stats["sends"] >= 40 and stats["timeouts"] == 0
+        # 每个新颖的签名都会写出一次
+        dumps = sorted(os.listdir(tmp_path / "ring"))
+        assert dumps and all(name.endswith("-novel.json") for name in dumps)
+        assert len(dumps) == stats["dumps"] <= session.novel_signatures
+        assert stats["overhead_us"] < 200
+        assert not (tmp_path / "run.db").exists()
+
+    def test_pipelined_ring_log(self, tmp_path):
+        logger = RingBufferLogger(str(tmp_path / "ring"), slots=4)
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, web_port=None, ring_log=logger, db_filename=str(tmp_path / "run.db"),
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 6 + [True, True]))
+            session.fuzz_pipelined(1, 40)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        # 每个新颖的签名在其用例结束时写出，不会被之后的用例覆盖
+        dumps = sorted(os.listdir(tmp_path / "ring"))
+        assert logger.stats()["cases"] == 40
+        assert len(dumps) == logger.stats()["dumps"] == session.novel_signatures > 1
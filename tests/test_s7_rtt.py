@@ -0,0 +1,125 @@
+import socket
+import time
+import pytest
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7_frame_cache import S7FrameCache
+from services.fuzzing_case_gen.s7_communication.s7_rtt import RTTEstimator
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorConfig, EmulatorThread
+
+
+class TestS7RTT:
+    """
+    测试策略：
+    1. 样本不足时使用初始超时；之后超时为高分位数加余量，并限制在上下限之间；滑动窗口淘汰旧样本。
+    2. 超时后按倍数退避且不超过上限，收到应答后逐步恢复。
+    3. 连接记录发送到应答的往返时延；目标不再应答时在自适应超时内返回，而不是固定的 5 秒。
+    4. 会话启用自适应超时后给出本次模糊测试的时延统计。
+    5. 连续发送多个请求时，只有收到全部应答才记录往返时延；非持久模式下只收到 CC 时不记录。
+    """
+
+    def test_estimator(self):
+        rtt = RTTEstimator(initial=5.0, minimum=0.01, maximum=5.0, margin=0.01, window=8, min_samples=4)
+        for sample in (0.02, 0.03, 0.02):
+            rtt.observe(sample)
+        assert rtt.timeout() == 5.0
+        rtt.observe(0.04)
+        assert rtt.timeout() == pytest.approx(max(0.04, rtt.srtt + 4 * rtt.rttvar) + 0.01)
+        for _ in range(8):
+            rtt.observe(0.001)
+        # 窗口中只剩最近的 8 个样本
+        assert rtt.quantile(100) == 0.001 and rtt.samples == 12
+        assert rtt.timeout() >= 0.01
+        with pytest.raises(ValueError):
+            RTTEstimator(minimum=0)
+
+    def test_backoff(self):
+        rtt = RTTEstimator(minimum=0.01, maximum=1.0, margin=0.0, min_samples=1)
+        for _ in range(20):
+            rtt.observe(0.1)
+        base = rtt.timeout()
+        rtt.timed_out()
+        assert rtt.timeout() == pytest.approx(min(1.0, base * 2))
+        for _ in range(10):
+            rtt.timed_out()
+        assert rtt.timeout() == 1.0 and rtt.timeouts == 11
+        for _ in range(20):
+            rtt.observe(0.1)
+        assert rtt.backoff == 1.0 and rtt.timeout() == pytest.approx(base, rel=0.05)
+
+    def test_connection_adaptive(self):
+        frame_cache = S7FrameCache()
+        setup = frame_cache.get("setup_communication")
+        read_var = frame_cache.get("read_var")
+        config = EmulatorConfig(latency=0.005, crash_mode="hang", crash_on=lambda s7: s7[10] == 0x04)
+        with EmulatorThread(config) as emulator:
+            rtt = RTTEstimator(min_samples=4)
+            connection = S7CommunicationSocketConnection("127.0.0.1", emulator.port, rtt=rtt)
+            connection.open()
+            connection.send_frame(frame_cache.connect_request())
+            assert connection.recv(10000)
+            for _ in range(10):
+                connection.send_frame(setup)
+                assert connection.recv(10000)
+            assert rtt.samples == 11 and rtt.timeout() < 1.0
+            # 读取变量请求使模拟器停止应答
+            connection.send_frame(read_var)
+            started = time.perf_counter()
+            assert connection.recv(10000) == b""
+            assert time.perf_counter() - started < 1.0
+            assert rtt.timeouts == 1
+            connection.close()
+
+    def test_session_timing(self, tmp_path):
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None, adaptive_timeout=True,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 6 + [True, True]))
+            session.fuzz_range(1, 30)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        stats = session.timing_stats()
+        assert stats["run_id"] == session.run_id
+        assert stats["samples"] >= 30 and stats["timeouts"] == 0
+        assert stats["p50"] <= stats["p99"] <= stats["max"]
+        plain = S7CommunicationSession(web_port=None, fuzz_loggers=[], db_filename=str(tmp_path / "x.db"))
+        assert plain.timing_stats() is None
+
+    def test_outstanding_requests(self):
+        frame_cache = S7FrameCache()
+        setup = frame_cache.get("setup_communication")
+        reply = frame_cache.connect_request()
+        rtt = RTTEstimator(min_samples=1)
+        connection = S7CommunicationSocketConnection("127.0.0.1", 102, rtt=rtt)
+        connection._sock, peer = socket.socketpair()
+        try:
+            connection.send_frame(frame_cache.connect_request())
+            connection.send_frame(setup)
+            connection.send_frame(setup)
+            peer.sendall(reply)
+            assert connection.recv(10000) == reply
+            assert rtt.samples == 0 and rtt.timeouts == 0
+            connection.send_frame(setup)
+            connection.send_frame(setup)
+            peer.sendall(reply + reply)
+            assert connection.recv(10000) == reply + reply
+            assert rtt.samples == 1
+        finally:
+            connection._sock.close()
+            peer.close()
+
+    def test_session_non_persistent(self, tmp_path):
+        with EmulatorThread(EmulatorConfig(latency=0.02)) as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, web_port=None, adaptive_timeout=True,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 6 + [True, True]))
+            session.fuzz_range(1, 10)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        # 每个测试用例第一次收到的只是 CC，不能当作测试用例的往返时延
+        assert session.timing_stats()["samples"] == 0
@@ -0,0 +1,53 @@
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication.s7_scheduler import FieldScheduler
+from services.fuzzing_case_gen.s7_communication.s7_template import compile_function
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+
+class TestS7Scheduler:
+    """
+    测试策略：
+    1. 不反馈奖励时调度器恰好给出每个编号一次，并先尝试每个字段的每个取值区间。
+    2. 只对某个字段给出奖励时，该字段获得大部分预算。
+    3. 会话按调度顺序对模拟器执行指定数量的用例，编号互不相同，统计信息与执行数一致。
+    """
+
+    def test_covers_every_case_once(self):
+        template = compile_function("read_var", [False] * 5 + [True, True, False])
+        scheduler = FieldScheduler(template, buckets=4)
+        cases = list(scheduler)
+        assert sorted(cases) == list(range(1, template.num_mutations + 1))
+        first_cases = cases[:len(scheduler.arms)]
+        assert first_cases == [arm.start for arm in scheduler.arms]
+
+    def test_budget_shifts_to_rewarded_field(self):
+        template = compile_function("read_var", [False] * 5 + [True, True, True])
+        scheduler = FieldScheduler(template, buckets=4, exploration=0.2)
+        area = template.fields[template.field_index("area")].name
+        for _ in range(300):
+            case = scheduler.next_case()
+            arm = scheduler._pending[case]
+            scheduler.feedback(case, 1.0 if arm.field == area else 0.0)
+        stats = {row["field"]: row for row in scheduler.stats()}
+        assert stats[area]["pulls"] == max(row["pulls"] for row in stats.values())
+        assert stats[area]["pulls"] > 150 or stats[area]["pulls"] == stats[area]["cases"]
+
+    def test_session_scheduled(self, tmp_path):
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[],
+            )
+            session.connect(S7CommunicationGenerator.read_var([False] * 6 + [True, True]))
+            scheduler = session.fuzz_scheduled(budget=40, buckets=4)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        assert scheduler.pulls == 40
+        assert sum(row["pulls"] for row in scheduler.stats()) == 40
+        assert len({arm.field for arm in scheduler.arms}) == 2
+        assert session.signatures.total == 40
+        # 会导致区域错误的 area 变异产生了新的签名
+        assert sum(row["rewards"] for row in scheduler.stats()) >= 2
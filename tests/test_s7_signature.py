@@ -0,0 +1,127 @@
+import struct
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from services.database import Base
+from services.fuzzing_services import FuzzingService
+from controller.fuzzing_controller import FuzzingController
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator
+from services.fuzzing_case_gen.s7_communication.s7c_manager import S7CommunicationSession
+from services.fuzzing_case_gen.s7_communication import s7_signature
+from services.fuzzing_case_gen.s7_communication.s7_signature import (
+    SignatureIndex, get_run, register_run, signature, unregister_run,
+)
+from services.fuzzing_case_gen.s7_communication.s7_communication_socket_connection import (
+    S7CommunicationSocketConnection,
+)
+from services.fuzzing_case_gen.s7_communication.s7_emulator import EmulatorThread
+
+CC = bytes.fromhex("0300001611d0000f000100c0010ac1020101c2020201")
+
+
+def read_var_ack(return_code=0xFF, pdu_reference=1, value=b"\x00"):
+    parameter = b"\x04\x01"
+    data = bytes([return_code, 0x04]) + struct.pack("!H", len(value) * 8) + value
+    s7 = struct.pack("!BBHHHHBB", 0x32, 0x03, 0, pdu_reference, len(parameter), len(data), 0, 0) + parameter + data
+    return struct.pack("!BBHBBB", 3, 0, 7 + len(s7), 2, 0xF0, 0x80) + s7
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'signatures.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+class TestS7Signature:
+    """
+    测试策略：
+    1. 签名只与 ROSCTR、错误、功能码以及返回码有关，与 pdu 引用和数据内容无关。
+    2. 索引对重复签名计数并保留首次出现的测试用例编号，只对新颖签名调用回调。
+    3. 条目数超过上限后淘汰最久未出现的签名。
+    4. 会话对模拟器的应答建立索引，模糊测试期间可以通过 run_id 查询，结束后注销。
+    5. 新颖签名保存到数据库后，控制器在模糊测试结束后仍能查询到完整应答帧，不存在的 run_id 返回 404。
+    """
+
+    def test_signature_normalization(self):
+        ok = signature(read_var_ack(pdu_reference=1, value=b"\x01"))
+        assert ok == signature(read_var_ack(pdu_reference=2, value=b"\x02"))
+        assert (ok.kind, ok.function, ok.return_code) == ("ack_data", 0x04, 0xFF)
+        assert signature(read_var_ack(return_code=0x0A)).digest != ok.digest
+        assert signature(CC).kind == "cc"
+
+    def test_index_counts_and_first_case(self):
+        novel = []
+        index = SignatureIndex(on_novel=lambda entry, frame: novel.append(frame))
+        frames = [read_var_ack(), read_var_ack(pdu_reference=7), read_var_ack(return_code=0x05), read_var_ack()]
+        results = [index.observe(frame, case) for case, frame in enumerate(frames, 1)]
+        assert [result is not None for result in results] == [True, False, True, False]
+        assert novel == [frames[0], frames[2]]
+        top = index.entries()[0]
+        assert (top.count, top.first_case, top.last_case) == (3, 1, 4)
+        assert index.summary()["total"] == 4 and len(index) == 2
+
+    def test_index_bounded(self):
+        index = SignatureIndex(max_entries=2)
+        for case, return_code in enumerate([1, 2, 3], 1):
+            index.observe(read_var_ack(return_code=return_code), case)
+        assert len(index) == 2 and index.evicted == 1
+        assert signature(read_var_ack(return_code=1)).digest not in index
+
+    def test_registry_bounded(self, monkeypatch):
+        monkeypatch.setattr(s7_signature, "MAX_RUNS", 2)
+        indexes = [SignatureIndex() for _ in range(3)]
+        for i, index in enumerate(indexes):
+            register_run(f"bounded-{i}", index)
+        assert get_run("bounded-0") is None and get_run("bounded-2") is indexes[2]
+        # 同一 run_id 下的其它索引不会被注销
+        unregister_run("bounded-2", indexes[1])
+        assert get_run("bounded-2") is indexes[2]
+        unregister_run("bounded-1")
+        unregister_run("bounded-2", indexes[2])
+        assert get_run("bounded-1") is None and get_run("bounded-2") is None
+
+    def test_session_index(self, tmp_path, db):
+        service = FuzzingService(db)
+        running = []
+
+        def on_novel(run_id, entry, frame):
+            running.append(get_run(run_id))
+            service.add_response_signature(run_id, entry, frame)
+
+        with EmulatorThread() as emulator:
+            session = S7CommunicationSession(
+                "127.0.0.1", emulator.port, persistent=True, web_port=None,
+                db_filename=str(tmp_path / "run.db"), fuzz_loggers=[], on_novel_signature=on_novel,
+            )
+            assert get_run(session.run_id) is None
+            session.connect(S7CommunicationGenerator.read_var([False] * 7 + [True]))
+            session.fuzz_range(1, 20)
+        S7CommunicationSocketConnection.set_pdu_type("CR Connect Request")
+        assert running and all(index is session.signatures for index in running)
+        assert get_run(session.run_id) is None
+        summary = session.signatures.summary()
+        assert summary["total"] == 20
+        assert sum(entry["count"] for entry in summary["signatures"]) == 20
+        assert summary["signatures"][-1]["first_case"] >= 1
+
+        controller = FuzzingController(db)
+        result = controller.get_response_signatures(session.run_id)
+        assert not result["running"] and result["unique"] == summary["unique"]
+        assert all(entry["frame"] for entry in result["signatures"])
+        assert len(service.get_response_signatures(session.run_id)) == summary["unique"]
+
+    def test_saved_signatures(self, db):
+        service = FuzzingService(db)
+        index = SignatureIndex(on_novel=lambda entry, frame: service.add_response_signature("saved", entry, frame))
+        index.observe(read_var_ack(), 3)
+        index.observe(read_var_ack(), 4)
+        result = FuzzingController(db).get_response_signatures("saved")
+        assert not result["running"]
+        assert [(s["first_case"], s["frame"]) for s in result["signatures"]] == [(3, read_var_ack().hex())]
+        with pytest.raises(HTTPException) as e:
+            FuzzingController(db).get_response_signatures("missing")
+        assert e.value.status_code == 404
@@ -0,0 +1,39 @@
+import pytest
+from boofuzz.mutation_context import MutationContext
+from services.fuzzing_case_gen.s7_communication.s7_gen import S7CommunicationGenerator, FUZZABLE_FIELD_COUNTS
+from services.fuzzing_case_gen.s7_communication.s7_template import compile_request, compile_function
+
+
+class TestS7RequestTemplate:
+    """
+    测试策略：
+    1. 模板渲染的每个变异都与 boofuzz Request.render() 逐字节一致（含长度字段修正）。
+    2. 变异总数与 Request.num_mutations() 一致。
+    3. 变异编号越界时抛出 IndexError。
+    """
+
+    @pytest.mark.parametrize("function", [f for f in FUZZABLE_FIELD_COUNTS if f != "setup_communication"])
+    def test_render_matches_boofuzz(self, function):
+        request = getattr(S7CommunicationGenerator, function)([True] * FUZZABLE_FIELD_COUNTS[function])
+        template = compile_request(request)
+        expected = [request.render(MutationContext(mutations=m)) for m in request.get_mutations()]
+        assert template.num_mutations == request.num_mutations() == len(expected)
+        for index, data in enumerate(expected):
+            assert template.render_mutation(index) == data
+
+    def test_default_template(self):
+        template = compile_function("read_var")
+        assert template.template == S7CommunicationGenerator.read_var().render()
+
+    def test_download_data_length_fixup(self):
+        template = compile_function("download", [False] * 4 + [True])
+        field_index = template.field_index("unknown")
+        rendered = template.render(field_index, b"\x01" * 5)
+        # 首部的数据长度字段位于第 8、9 字节
+        assert rendered[8:10] == (5).to_bytes(2, "big")
+        assert rendered.endswith(b"\x01" * 5)
+
+    def test_index_out_of_range(self):
+        template = compile_function("read_var")
+        with pytest.raises(IndexError):
+            template.render_mutation(template.num_mutations)